@@ -0,0 +1,99 @@
+"""
+Throughput of the batch pantry API against searching the pantries one by one.
+
+    python batch_benchmark.py [--sources bbc,tasty] [--pantries 2000] [--limit 20] [--engine numpy]
+                              [--output results.json]
+
+Pantries are seeded random picks of common ingredients, multi-word ones included. Both
+ways are checked to rank the same recipes before their queries per second are printed.
+"""
+import argparse
+import json
+import random
+import time
+from models_bbc.bbc_parser import BBCParser
+from models_tasty.tasty_parser import TastyParser
+from models_common.query_cache import QueryCache
+from models_common.vector_scoring import default_engine
+
+PANTRY_INGREDIENTS = [
+    "egg", "milk", "flour", "butter", "sugar", "chicken", "rice", "onion", "garlic", "tomato",
+    "cheese", "potato", "lemon", "beef", "carrot", "pasta", "cream", "honey", "spinach", "salmon",
+    "olive oil", "plain flour", "double cream", "spring onion", "soy sauce", "red pepper",
+    "brown sugar", "chicken breast", "baking powder", "greek yogurt", "lime", "ginger",
+    "mushroom", "bacon", "coriander", "parsley", "basil", "chilli", "cinnamon", "vanilla extract",
+]
+
+
+def make_pantries(count, seed, min_size=3, max_size=8):
+    rng = random.Random(seed)
+    return [
+        rng.sample(PANTRY_INGREDIENTS, rng.randint(min_size, max_size))
+        for _ in range(count)
+    ]
+
+
+def result_names(source, matches):
+    if source == "bbc":
+        return [(match["name"], match["matched_ingredients"]) for match in matches]
+    return [(match[0], match[2]) for match in matches]
+
+
+def benchmark(source, parser, pantries, limit):
+    search = parser.find_matching_recipes if source == "bbc" else parser.get_matches
+    search_batch = parser.find_matching_recipes_batch if source == "bbc" else parser.get_matches_batch
+    parser.refresh_catalog()
+
+    # A cache of its own, so the pantries are searched as for the first time
+    parser.query_cache = QueryCache()
+    start = time.perf_counter()
+    one_by_one = [search(pantry, limit) for pantry in pantries]
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = search_batch(pantries, limit)
+    batch_seconds = time.perf_counter() - start
+
+    for pantry, single, batched in zip(pantries, one_by_one, batch):
+        if result_names(source, single) != result_names(source, batched):
+            raise AssertionError(f"The batch ranks {pantry} differently")
+    return {
+        "pantries": len(pantries),
+        "limit": limit,
+        "loop_s": round(loop_seconds, 3),
+        "batch_s": round(batch_seconds, 3),
+        "loop_queries_per_s": round(len(pantries) / loop_seconds, 1),
+        "batch_queries_per_s": round(len(pantries) / batch_seconds, 1),
+        "speedup": round(loop_seconds / batch_seconds, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares the batch pantry API with one search per pantry.")
+    parser.add_argument("--sources", default="bbc,tasty")
+    parser.add_argument("--pantries", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=["python", "numpy"], default=default_engine())
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    parsers = {"bbc": BBCParser, "tasty": TastyParser}
+    pantries = make_pantries(args.pantries, args.seed)
+    results = {}
+    for source in args.sources.split(","):
+        source_parser = parsers[source]()
+        source_parser.engine = args.engine
+        results[source] = stats = benchmark(source, source_parser, pantries, args.limit)
+        stats["engine"] = args.engine
+        print(
+            f"{source:<6} {args.engine:<6} {stats['pantries']} pantries  one by one {stats['loop_queries_per_s']} queries/s  "
+            f"batch {stats['batch_queries_per_s']} queries/s  ({stats['speedup']}x)"
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
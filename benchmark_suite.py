@@ -0,0 +1,285 @@
+"""
+Times the catalogs, searches and saved recipes on seeded synthetic catalogs.
+
+    python benchmark_suite.py [--sizes 1000,10000,100000] [--seed 0] [--sources bbc,tasty]
+                              [--queries 100] [--engine numpy] [--work-dir DIR]
+                              [--output results.json] [--compare previous.json]
+
+The catalogs of synthetic_catalog.py are written once per size and seed to the work
+directory and reused by the next runs. For every size and source the suite times loading
+the catalog from JSON and from its snapshot, searches of 1 to 10 ingredients, substitution
+lookups and name searches, then saving and deleting recipes as the log of a user grows.
+Results are written as JSON, --compare prints the timings of a former results file next
+to the new ones. Sizes up to 100k run in minutes, 1M recipes need several GB of memory.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from models_bbc.bbc_handler import BBCFileHandler
+from models_bbc.bbc_parser import BBCParser
+from models_tasty.tasty_handler import TastyHandler
+from models_tasty.tasty_parser import TastyParser
+from models_common.catalog import catalog_registry
+from models_common.query_cache import QueryCache
+from models_common.vector_scoring import default_engine, np, numpy_available
+from search_service import summarize_latencies
+from synthetic_catalog import SyntheticCatalog
+from users.saved_recipes import TASTY_SOURCE, SavedRecipeStore
+
+QUERY_SIZES = (1, 3, 5, 10)
+SAVED_RECIPE_COUNTS = (100, 1000, 10000)
+# Timings printed by --compare
+COMPARED_TIMINGS = ("_s", "mean_ms", "p50_ms", "p95_ms")
+
+
+def time_calls(function, arguments):
+    """Latencies in milliseconds of function called on every argument, see summarize_latencies."""
+    durations = []
+    for argument in arguments:
+        start = time.perf_counter()
+        function(argument)
+        durations.append(time.perf_counter() - start)
+    return summarize_latencies(durations)
+
+
+def prepare_catalog(work_dir, recipes, seed):
+    """Returns the paths of the synthetic catalog of this size and seed, written on the first run."""
+    catalog = SyntheticCatalog(recipes, seed)
+    catalog_dir = os.path.join(work_dir, f"catalog-{recipes}-seed{seed}")
+    marker_path = os.path.join(catalog_dir, "generated.json")
+    paths = {name: os.path.join(catalog_dir, name) for name in ("bbc.json", "tasty.json", "url.json", "subs.json")}
+    if not os.path.exists(marker_path):
+        start = time.perf_counter()
+        catalog.write(catalog_dir)
+        # Written last, a run interrupted while writing the catalog writes it again
+        with open(marker_path, "w", encoding="utf-8") as file:
+            json.dump({"recipes": recipes, "seed": seed, "seconds": round(time.perf_counter() - start, 3)}, file)
+    return catalog, catalog_dir, paths
+
+
+def open_parser(source, paths):
+    if source == "bbc":
+        return BBCParser(BBCFileHandler(paths["bbc.json"], paths["subs.json"], storage="json"))
+    return TastyParser(TastyHandler(paths["tasty.json"], paths["url.json"], paths["subs.json"], storage="json"))
+
+
+def benchmark_load(source, catalog_dir, paths):
+    """Opens the parser of the source twice, parsing the JSON files and then from their snapshots."""
+    shutil.rmtree(os.path.join(catalog_dir, "snapshots"), ignore_errors=True)
+    catalog_registry.invalidate()
+    start = time.perf_counter()
+    open_parser(source, paths)
+    json_seconds = time.perf_counter() - start
+    catalog_registry.invalidate()
+    start = time.perf_counter()
+    parser = open_parser(source, paths)
+    snapshot_seconds = time.perf_counter() - start
+    return parser, {"load_json_s": round(json_seconds, 3), "load_snapshot_s": round(snapshot_seconds, 3)}
+
+
+def make_queries(catalog, rng, count, size):
+    """Queries of size ingredients, drawn with the popularity of the ingredients of the catalog."""
+    return [catalog.ingredients(rng, 4 * size)[:size] for _ in range(count)]
+
+
+def benchmark_search(source, parser, catalog, rng, count, limit=20):
+    search = parser.find_matching_recipes if source == "bbc" else parser.get_matches
+    results = {}
+    if parser.engine == "numpy" and numpy_available():
+        # Timed on its first call, which builds and caches it, the first search would pay for it otherwise
+        start = time.perf_counter()
+        if parser.incidence_matrix() is not None:
+            results["matrix_build_s"] = round(time.perf_counter() - start, 3)
+    for size in QUERY_SIZES:
+        queries = make_queries(catalog, rng, count, size)
+        # A cache of its own, so every query is searched as for the first time
+        parser.query_cache = QueryCache()
+        results[f"search_{size}_ingredients"] = time_calls(lambda query: search(query, limit), queries)
+        if size == 3:
+            results["search_3_ingredients_cached"] = time_calls(lambda query: search(query, limit), queries)
+            results["search_3_ingredients_next_page"] = time_calls(
+                lambda query: search(query, limit, limit), queries
+            )
+    return results
+
+
+def benchmark_substitutions(source, parser, rng, count):
+    handler = parser.handler
+    if source == "bbc":
+        recipes = [handler.recipe_db[rng.randrange(len(handler.recipe_db))] for _ in range(count)]
+        ingredients = [rng.choice(recipe["ingredients"]) for recipe in recipes if recipe["ingredients"]]
+    else:
+        ingredient_names = handler.ingredient_index.ingredient_names
+        ingredients = [rng.choice(ingredient_names[rng.randrange(len(ingredient_names))]) for _ in range(count)]
+    return {"substitution_lookup": time_calls(handler.substitution_matcher.lookup, ingredients)}
+
+
+def benchmark_names(source, parser, rng, count):
+    handler = parser.handler
+    names = handler.recipe_names()
+    sampled_names = [names[rng.randrange(len(names))] for _ in range(count)]
+    fragments = []
+    for name in sampled_names:
+        length = rng.randint(4, 8)
+        start = rng.randrange(max(1, len(name) - length))
+        fragments.append(name[start:start + length])
+    find_by_name = parser.search_recipe_by_name if source == "bbc" else parser.search_recipe_by_name_tasty
+    results = {}
+    # The name index and the positions of the names are built on the first search
+    start = time.perf_counter()
+    handler.search_recipe_names(fragments[0])
+    results["name_index_build_s"] = round(time.perf_counter() - start, 3)
+    start = time.perf_counter()
+    find_by_name(sampled_names[0])
+    results["name_positions_build_s"] = round(time.perf_counter() - start, 3)
+    results["name_search"] = time_calls(handler.search_recipe_names, fragments)
+    results["recipe_by_name"] = time_calls(find_by_name, sampled_names)
+    return results
+
+
+def benchmark_saved_recipes(recipe_names, counts, operations):
+    """Times saving and deleting recipes as the log of one user grows to every count of saved recipes."""
+    results = {}
+    users_dir = tempfile.mkdtemp(prefix="saved-recipes-")
+    try:
+        store = SavedRecipeStore(users_dir)
+        saved = 0
+        for count in counts:
+            while saved < count:
+                store.save("benchmark", TASTY_SOURCE, recipe_names[saved % len(recipe_names)])
+                saved += 1
+            extra_names = [f"Extra recipe {count}-{number}" for number in range(operations)]
+            stats = {
+                "save": time_calls(lambda name: store.save("benchmark", TASTY_SOURCE, name), extra_names),
+                "delete": time_calls(
+                    lambda name: store.delete("benchmark", TASTY_SOURCE, name, first_only=True), extra_names
+                ),
+            }
+            # Read by a new instance, as after a start
+            start = time.perf_counter()
+            SavedRecipeStore(users_dir).recipes("benchmark")
+            stats["load_s"] = round(time.perf_counter() - start, 3)
+            stats["log_bytes"] = os.path.getsize(store.log_path("benchmark"))
+            results[str(count)] = stats
+    finally:
+        shutil.rmtree(users_dir, ignore_errors=True)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.realpath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes, seed=0, sources=("bbc", "tasty"), queries=100, engine="python", work_dir=None,
+              saved_counts=SAVED_RECIPE_COUNTS):
+    """Runs every benchmark and returns the results, as written to the output file."""
+    work_dir = work_dir or os.path.join(tempfile.gettempdir(), "recipe-finder-benchmarks")
+    results = {
+        "meta": {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__ if np is not None else None,
+            "engine": engine,
+            "seed": seed,
+            "sizes": list(sizes),
+            "queries": queries,
+        },
+        "catalogs": {},
+    }
+    recipe_names = []
+    for size in sizes:
+        catalog, catalog_dir, paths = prepare_catalog(work_dir, size, seed)
+        results["catalogs"][str(size)] = size_results = {}
+        for source in sources:
+            rng = random.Random(f"{source}-{size}-{seed}")
+            parser, stats = benchmark_load(source, catalog_dir, paths)
+            parser.engine = engine
+            stats.update(benchmark_search(source, parser, catalog, rng, queries))
+            stats.update(benchmark_substitutions(source, parser, rng, queries))
+            stats.update(benchmark_names(source, parser, rng, queries))
+            size_results[source] = stats
+            recipe_names = parser.handler.recipe_names()[:max(saved_counts, default=0)]
+            print(
+                f"{size:>8} {source:<6} load {stats['load_json_s']}s json, {stats['load_snapshot_s']}s snapshot  "
+                f"search p50 {stats['search_3_ingredients']['p50_ms']}ms (3 ingredients)  "
+                f"names p50 {stats['name_search']['p50_ms']}ms"
+            )
+        # Only one size is held in memory at a time
+        catalog_registry.invalidate()
+    results["saved_recipes"] = benchmark_saved_recipes(list(recipe_names) or ["Recipe"], saved_counts, queries)
+    for count, stats in results["saved_recipes"].items():
+        print(f"{count:>8} saved  save p50 {stats['save']['p50_ms']}ms  delete p50 {stats['delete']['p50_ms']}ms")
+    return results
+
+
+def flatten_timings(results, prefix=""):
+    timings = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            timings.update(flatten_timings(value, path + "."))
+        elif isinstance(value, (int, float)) and key.endswith(COMPARED_TIMINGS):
+            timings[path] = value
+    return timings
+
+
+def compare(previous, current):
+    """Prints the timings of two results files side by side, with the ratio of the current one to the previous one."""
+    previous_timings = flatten_timings(previous.get("catalogs", {}), "catalogs.")
+    previous_timings.update(flatten_timings(previous.get("saved_recipes", {}), "saved_recipes."))
+    current_timings = flatten_timings(current.get("catalogs", {}), "catalogs.")
+    current_timings.update(flatten_timings(current.get("saved_recipes", {}), "saved_recipes."))
+    for path, value in current_timings.items():
+        if path in previous_timings:
+            before = previous_timings[path]
+            ratio = f"{value / before:.2f}x" if before else "-"
+            print(f"{path:<70} {before:>10} {value:>10}  {ratio}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Times the recipe finder on seeded synthetic catalogs.")
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sources", default="bbc,tasty")
+    parser.add_argument("--queries", type=int, default=100, help="timed calls of every benchmark")
+    parser.add_argument("--saved", default=",".join(str(count) for count in SAVED_RECIPE_COUNTS))
+    parser.add_argument("--engine", choices=["python", "numpy"], default=default_engine())
+    parser.add_argument("--work-dir", help="where the synthetic catalogs are kept between runs")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="a former results file to compare the timings with")
+    args = parser.parse_args()
+
+    results = run_suite(
+        [int(size) for size in args.sizes.split(",")],
+        seed=args.seed,
+        sources=args.sources.split(","),
+        queries=args.queries,
+        engine=args.engine,
+        work_dir=args.work_dir,
+        saved_counts=[int(count) for count in args.saved.split(",")],
+    )
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=4)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            compare(json.load(file), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""
+Compiles the JSON catalogs of the res folder into the binary snapshots loaded at start-up.
+
+The application rebuilds an outdated snapshot by itself on its next start, running this
+after updating the catalogs only saves that first start the parsing.
+"""
+from models_bbc.bbc_handler import BBCFileHandler
+from models_tasty.tasty_handler import TastyHandler
+from models_common.snapshot import SNAPSHOT_DIR
+
+
+def main():
+    BBCFileHandler("bbc.json", "subs.json").build_snapshots()
+    TastyHandler("tasty.json", "url.json", "subs.json").build_snapshots()
+    print(f"Snapshots written to {SNAPSHOT_DIR}")
+
+
+if __name__ == "__main__":
+    main()
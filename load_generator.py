@@ -0,0 +1,159 @@
+"""
+Load generator for search_service.py.
+
+    python search_service.py &
+    python load_generator.py --concurrency 8 --duration 10 [--output results.json]
+
+Every client thread keeps one connection open and sends requests drawn from a seeded
+mix of ingredient searches, name searches and recipe details built from the catalog.
+Throughput and client-side latencies are printed per endpoint, followed by the
+latencies measured by the service itself (/stats).
+"""
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+from search_service import summarize_latencies
+
+INGREDIENTS = [
+    "egg", "milk", "flour", "butter", "sugar", "chicken", "rice", "onion", "garlic", "tomato",
+    "cheese", "potato", "lemon", "beef", "carrot", "pasta", "cream", "honey", "spinach", "salmon",
+]
+NAME_QUERIES = ["cake", "chicken", "soup", "pie", "salad", "chocolate", "bread", "curry", "ta", "co"]
+
+
+def build_requests(base_url, sources, count, seed):
+    """Seeded (endpoint, path) pairs, recipe names are taken from the service itself."""
+    rng = random.Random(seed)
+    recipe_names = {}
+    for source in sources:
+        status, response = request_json(base_url, "/names?" + urlencode({"source": source, "limit": 200}))
+        recipe_names[source] = response.get("names", []) if status == 200 else []
+    requests = []
+    for _ in range(count):
+        source = rng.choice(sources)
+        kind = rng.random()
+        if kind < 0.6:
+            ingredients = ",".join(rng.sample(INGREDIENTS, rng.randint(1, 5)))
+            requests.append(("GET /search", "/search?" + urlencode(
+                {"source": source, "ingredients": ingredients, "limit": 20}
+            )))
+        elif kind < 0.85 or not recipe_names[source]:
+            requests.append(("GET /names", "/names?" + urlencode(
+                {"source": source, "query": rng.choice(NAME_QUERIES)}
+            )))
+        else:
+            requests.append(("GET /recipe", "/recipe?" + urlencode(
+                {"source": source, "name": rng.choice(recipe_names[source])}
+            )))
+    return requests
+
+
+def request_json(base_url, path, connection=None):
+    url = urlsplit(base_url)
+    own_connection = connection is None
+    if own_connection:
+        connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+    try:
+        connection.request("GET", path)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        if own_connection:
+            connection.close()
+
+
+def run_client(base_url, requests, deadline, results, lock):
+    url = urlsplit(base_url)
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+    samples = {}
+    errors = {}
+    position = 0
+    try:
+        while time.perf_counter() < deadline:
+            endpoint, path = requests[position % len(requests)]
+            position += 1
+            start = time.perf_counter()
+            try:
+                connection.request("GET", path)
+                response = connection.getresponse()
+                response.read()
+                failed = response.status >= 400
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+                failed = True
+            samples.setdefault(endpoint, []).append(time.perf_counter() - start)
+            errors[endpoint] = errors.get(endpoint, 0) + failed
+    finally:
+        connection.close()
+    with lock:
+        for endpoint, durations in samples.items():
+            results["samples"].setdefault(endpoint, []).extend(durations)
+            results["errors"][endpoint] = results["errors"].get(endpoint, 0) + errors[endpoint]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sends concurrent requests to search_service.py.")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--sources", default="bbc,tasty")
+    parser.add_argument("--requests", type=int, default=2000, help="size of the request mix")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    requests = build_requests(args.url, args.sources.split(","), args.requests, args.seed)
+    results = {"samples": {}, "errors": {}}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    clients = [
+        threading.Thread(
+            target=run_client,
+            # Every client starts at its own place in the mix
+            args=(args.url, requests[i::args.concurrency] or requests, deadline, results, lock),
+        )
+        for i in range(args.concurrency)
+    ]
+    start = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - start
+
+    client_stats = {
+        endpoint: summarize_latencies(durations, errors=results["errors"][endpoint])
+        for endpoint, durations in sorted(results["samples"].items())
+    }
+    total = sum(stats["count"] for stats in client_stats.values())
+    _, server_stats = request_json(args.url, "/stats")
+    report = {
+        "concurrency": args.concurrency,
+        "duration_s": round(elapsed, 3),
+        "requests": total,
+        "requests_per_s": round(total / elapsed, 1),
+        "client": client_stats,
+        "server": server_stats,
+    }
+
+    print(f"{total} requests in {elapsed:.1f}s, {report['requests_per_s']} requests/s")
+    for endpoint, stats in client_stats.items():
+        print(
+            f"  {endpoint:<12} {stats['count']:>7} requests  {stats['errors']} errors  "
+            f"p50 {stats['p50_ms']} ms  p95 {stats['p95_ms']} ms  p99 {stats['p99_ms']} ms"
+        )
+    print("Server side:")
+    for endpoint, stats in sorted(server_stats.get("endpoints", {}).items()):
+        print(f"  {endpoint:<12} mean {stats['mean_ms']} ms  p95 {stats['p95_ms']} ms  max {stats['max_ms']} ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,198 @@
 import os
 import json
 from users.user_data import User
+from users.saved_recipes import BBC_SOURCE, SavedRecipeStore
+from models_common.catalog import catalog_registry
+from models_common.name_index import TrigramNameIndex
+from models_common.snapshot import CatalogSnapshot, describe_sources
+from models_common.sqlite_store import (
+    StoredRecipeList,
+    catalog_source,
+    default_storage,
+    open_catalog_store,
+)
+from models_common.streaming_loader import (
+    FileRecordList,
+    StreamingCatalogLoader,
+    iter_json_records,
+)
+from models_common.substitutions import load_substitutions_catalog
+from models_bbc.bbc_index import BBCIngredientIndex
 
 
 class BBCFileHandler:
-    def __init__(self, bbc_file_path, subs_file_path):
+    def __init__(self, bbc_file_path, subs_file_path, storage=None):
         self.users_dir = "users"
+        # "json" holds the recipes in memory, "sqlite" reads them from the catalog store when needed,
+        # "stream" loads bbc.json in the background and reads a recipe from the file when needed
+        self.storage = storage or default_storage()
+        # File names are looked up in the res folder, absolute paths are used as they are
         base_dir = os.path.dirname(os.path.realpath(__file__))
-        self.bbc_file_path = os.path.join(base_dir, '..', 'res', "bbc.json")
-        self.subs_file_path = os.path.join(base_dir, '..', 'res', "subs.json")
-        self.recipe_db = self.load_recipes_from_file(self.bbc_file_path)
-        self.substitutions_db = self._load_substitutions(self.subs_file_path)
+        self.bbc_file_path = os.path.join(base_dir, '..', 'res', bbc_file_path)
+        self.store_source = catalog_source("bbc", self.bbc_file_path)
+        self.subs_file_path = os.path.join(base_dir, '..', 'res', subs_file_path)
+        self._load_catalog()
         self.user = User()
+        self.saved_recipes = SavedRecipeStore(self.users_dir)
+
+    def _load_catalog(self):
+        self.catalog_version = self._catalog_signature()
+        catalog = self._load_bbc_catalog(self.bbc_file_path)
+        self.recipe_db = catalog["recipes"]
+        self.ingredient_index = catalog["ingredient_index"]
+        self.store = catalog.get("store")
+        self.loader = catalog.get("loader")
+        self._streamed_names = catalog.get("names")
+        substitutions = self._load_substitutions_catalog(self.subs_file_path)
+        self.substitutions_db = substitutions["substitutions"]
+        self.substitution_matcher = substitutions["matcher"]
+
+    def refresh_catalog(self):
+        """
+        Reloads the catalog if bbc.json or subs.json changed on disk.
+
+        Returns the catalog version, which changes every time the catalog is reloaded.
+        """
+        if self._catalog_signature() != self.catalog_version:
+            if self.loader is not None:
+                self.loader.cancel()
+            for file_path in (self.bbc_file_path, self.subs_file_path):
+                catalog_registry.refresh(file_path)
+            self._load_catalog()
+        if self.loader is not None and self.loader.loading:
+            # Searches see more recipes as the catalog loads, their results are not final yet
+            return (self.catalog_version, self.loader.count)
+        return self.catalog_version
+
+    def _catalog_signature(self):
+        return (
+            catalog_registry.file_signature(self.bbc_file_path),
+            catalog_registry.file_signature(self.subs_file_path),
+        )
+
+    def build_snapshots(self):
+        """Compiles bbc.json and subs.json into fresh snapshots, used by the next start."""
+        if self.store is not None:
+            # The recipes were imported into the store when the handler was created
+            self._bbc_index_snapshot(self.bbc_file_path).build(
+                lambda: BBCIngredientIndex(self.recipe_db)
+            )
+        else:
+            self._bbc_snapshot(self.bbc_file_path).build(
+                lambda: self._build_bbc_catalog(self.bbc_file_path)
+            )
+        load_substitutions_catalog(self.subs_file_path, self._read_substitutions_file, rebuild=True)
+
+    def shard_snapshot(self, start, end):
+        """Snapshot of the recipes [start:end] of bbc.json with their own index, see ShardedSearch."""
+        return CatalogSnapshot(f"bbc_shard_{start}_{end}", [self.bbc_file_path])
+
+    def catalog_arguments(self):
+        """Arguments of a BBCFileHandler reading the same files as this one, e.g. in a worker process."""
+        return (self.bbc_file_path, self.subs_file_path, self.storage)
+
+    def build_shard(self, start, end):
+        recipes = [self.recipe_db[position] for position in range(start, end)]
+        return {"recipes": recipes, "ingredient_index": BBCIngredientIndex(recipes)}
 
     def load_recipes_from_file(self, file_name):
+        return self._load_bbc_catalog(file_name)["recipes"]
+
+    def _load_bbc_catalog(self, file_name):
+        # Shared with every other handler and parser, the file is only read once per process
+        if self.storage == "sqlite":
+            return catalog_registry.get(
+                "bbc_sqlite_catalog", file_name, lambda: self._open_bbc_store(file_name)
+            )
+        if self.storage == "stream":
+            return catalog_registry.get(
+                "bbc_stream_catalog", file_name, lambda: self._stream_bbc_catalog(file_name)
+            )
+        return catalog_registry.get(
+            "bbc_catalog",
+            file_name,
+            lambda: self._bbc_snapshot(file_name).load_or_build(
+                lambda: self._build_bbc_catalog(file_name)
+            ),
+        )
+
+    def _bbc_snapshot(self, file_name):
+        return CatalogSnapshot("bbc", [file_name])
+
+    def _bbc_index_snapshot(self, file_name):
+        return CatalogSnapshot("bbc_index", [file_name])
+
+    def _build_bbc_catalog(self, file_name):
+        recipes = self._read_recipes_file(file_name)
+        return {"recipes": recipes, "ingredient_index": BBCIngredientIndex(recipes)}
+
+    def _open_bbc_store(self, file_name):
+        store = open_catalog_store()
+        source = catalog_source("bbc", file_name)
+        if not store.is_current(source, [file_name]):
+            description = describe_sources([file_name])
+            try:
+                # Streamed, the JSON file is never held in memory as a whole
+                store.import_recipes(
+                    source,
+                    description,
+                    (
+                        (recipe.get("name", ""), recipe)
+                        for _, recipe, _, _ in iter_json_records(file_name)
+                    ),
+                )
+            except (OSError, ValueError) as e:
+                print(f"Error importing {file_name}: {e}")
+        recipes = StoredRecipeList(store, source)
+        # Only the index stays in memory, it is snapshotted on its own
+        ingredient_index = self._bbc_index_snapshot(file_name).load_or_build(
+            lambda: BBCIngredientIndex(recipes)
+        )
+        return {"recipes": recipes, "ingredient_index": ingredient_index, "store": store}
+
+    def _stream_bbc_catalog(self, file_name):
+        recipes = FileRecordList(file_name)
+        names = []
+        ingredient_index = BBCIngredientIndex()
+
+        def add_recipe(_, recipe, offset, length):
+            # Only its position in the file is kept, the index and the names hold what searches need
+            recipes.append(offset, length)
+            names.append(recipe.get("name", "No Name"))
+            ingredient_index.add(recipe)
+
+        loader = StreamingCatalogLoader(file_name, add_recipe).start()
+        return {
+            "recipes": recipes,
+            "names": names,
+            "ingredient_index": ingredient_index,
+            "loader": loader,
+        }
+
+    def recipe_names(self):
+        """Names of the recipes, in catalog order."""
+        if self.store is not None:
+            return self.recipe_db.names()
+        if self._streamed_names is not None:
+            # Grows while the catalog is loading
+            return self._streamed_names
+        return catalog_registry.get(
+            "bbc_recipe_names",
+            self.bbc_file_path,
+            lambda: [recipe.get("name", "No Name") for recipe in self.recipe_db],
+        )
+
+    def search_recipe_names(self, query):
+        """Positions, in catalog order, of the recipes whose name contains the query, ignoring case."""
+        query = query.lower()
+        if self.store is not None:
+            return self.store.search_names(self.store_source, query)
+        name_index = catalog_registry.get("bbc_name_index", self.bbc_file_path, TrigramNameIndex)
+        # Catches up with the recipes loaded since the last search, when streaming
+        name_index.update(self.recipe_names())
+        return name_index.search(query)
+
+    def _read_recipes_file(self, file_name):
         try:
             with open(file_name, "r", encoding="utf-8") as file:
                 return json.load(file)
@@ -22,12 +201,22 @@ class BBCFileHandler:
             return []
         
     def _load_substitutions(self, filename):
+        return self._load_substitutions_catalog(filename)["substitutions"]
+
+    def _load_substitutions_catalog(self, filename):
+        return catalog_registry.get(
+            "substitutions_catalog",
+            filename,
+            lambda: load_substitutions_catalog(filename, self._read_substitutions_file),
+        )
+
+    def _read_substitutions_file(self, filename):
         with open(filename, "r", encoding="utf-8") as file:
             data = json.load(file)
             return {item["Item"].lower(): item["Substitutions"] for item in data}
 
     def load_bbc_recipes(self):
-        return self.load_recipes_from_file(self.bbc_file_path)
+        return self.recipe_db
 
     def _get_recipe_details(self, recipe):
         return {
@@ -35,45 +224,54 @@ class BBCFileHandler:
             "url": recipe.get("url", "URL not available"),
             "ingredients": recipe.get("ingredients", []),
             "steps": recipe.get("steps", []),
-            "source": "BBC Goodfood",
+            "source": BBC_SOURCE,
         }
 
-    def load_user_recipes(self, file_path, username=None):
-        try:
-            with open(file_path, "r", encoding="utf-8") as file:
-                data = json.load(file)
-        except (FileNotFoundError, json.JSONDecodeError):
-            data = {}
-
-        if username:
-            if username not in data:
-                data[username] = []
-        return data
-
-    def save_recipe_to_file(self, recipe, file_name="saved_recipes.json"):
+    def save_recipe_to_file(self, recipe):
         username = self.user.get_current_user()
         if not username:
             return "No user is currently logged in."
 
         recipe_details = self._get_recipe_details(recipe)
-        file_path = os.path.join(self.users_dir, file_name)
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-
-        all_user_recipes = self.load_user_recipes(file_path, username)
-        # Append the recipe to the username list in the dictionary of recipes
-        all_user_recipes[username].append(recipe_details)
-        self._write_user_recipes(all_user_recipes, file_path)
+        # Only a reference is saved, the recipe is read from the catalog when displayed
+        self.saved_recipes.save(username, BBC_SOURCE, recipe_details["name"])
         return f"Recipe '{recipe_details['name']}' has been saved successfully under user '{username}'."
 
-    def _write_user_recipes(self, all_user_recipes, file_name):
-        with open(file_name, "w", encoding="utf-8") as file:
-            json.dump(all_user_recipes, file, indent=4, ensure_ascii=False)
-
-    def view_saved_recipes(self, file_name="saved_recipes.json"):
+    def view_saved_recipes(self):
         username = self.user.get_current_user()
-        file_path = os.path.join(self.users_dir, file_name)
-        saved_recipes = self.load_user_recipes(file_path)
-        return self._format_saved_recipes(saved_recipes.get(username, []))
+        if not username:
+            return self._format_saved_recipes([])
+        saved_recipes = self.saved_recipes.recipes(username, BBC_SOURCE)
+        positions = self._saved_recipe_positions([saved_recipe["name"] for saved_recipe in saved_recipes])
+        return self._format_saved_recipes(
+            [
+                self._saved_recipe_details(saved_recipe["name"], positions.get(saved_recipe["name"]))
+                for saved_recipe in saved_recipes
+            ]
+        )
+
+    def _saved_recipe_positions(self, recipe_names):
+        """Positions of the first recipes named as the saved ones, by name, the missing ones are left out."""
+        if self.store is not None:
+            return {
+                recipe_name: self.store.find_position(self.store_source, recipe_name)
+                for recipe_name in recipe_names
+            }
+        # One pass over the catalog for all the saved recipes, stopped once they are all found
+        wanted = set(recipe_names)
+        positions = {}
+        for position, name in enumerate(self.recipe_names()):
+            if name in wanted and name not in positions:
+                positions[name] = position
+                if len(positions) == len(wanted):
+                    break
+        return positions
+
+    def _saved_recipe_details(self, recipe_name, position):
+        if position is None:
+            # No longer in the catalog
+            return {"name": recipe_name, "source": BBC_SOURCE}
+        return self._get_recipe_details(self.recipe_db[position])
 
     def _format_saved_recipes(self, user_recipes):
         if not user_recipes:
@@ -98,25 +296,10 @@ class BBCFileHandler:
         steps = "\n".join(recipe.get("steps", []))
         return f"Name: {recipe['name']}\nURL: {recipe.get('url', 'URL not available')}\nIngredients:\n{ingredients}\nSteps:\n{steps}\n"
 
-
-    def delete_recipe_by_name(self, recipe_name, file_name="saved_recipes.json"):
+    def delete_recipe_by_name(self, recipe_name):
         username = self.user.get_current_user()
-        file_path = os.path.join(self.users_dir, file_name)
-        all_user_recipes = self.load_user_recipes(file_path, username)
-        recipe_index = self._find_recipe_index(all_user_recipes[username], recipe_name)
-        if recipe_index is None:
+        if not username:
+            return "No user is currently logged in."
+        if not self.saved_recipes.delete(username, BBC_SOURCE, recipe_name, first_only=True):
             return f"Recipe '{recipe_name}' not found."
-        del all_user_recipes[username][recipe_index]
-        # Overwrite the file without the recipe that was selected to delete
-        self._write_user_recipes(all_user_recipes, file_path)
         return f"Recipe '{recipe_name}' has been deleted successfully under username {username}."
-
-    def _find_recipe_index(self, user_recipes, recipe_name):
-        return next(
-            (
-                i
-                for i, recipe in enumerate(user_recipes)
-                if recipe["name"] == recipe_name
-            ),
-            None,
-        )
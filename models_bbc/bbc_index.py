@@ -0,0 +1,59 @@
+import re
+
+# Same definition of a word as the \b boundaries used by BBCParser._create_ingredient_pattern
+TOKEN_PATTERN = re.compile(r"\w+")
+PLURAL_SUFFIXES = ("", "s", "es")
+
+
+class BBCIngredientIndex:
+    """
+    Inverted index from lowercase ingredient tokens to the positions of the recipes using them.
+
+    Built once per catalog, it lets a search look up the recipes sharing an ingredient
+    with the user's input instead of running a regex over every ingredient line.
+    """
+
+    def __init__(self, recipes=()):
+        self.postings = {}
+        self.total_ingredients = []
+        for recipe in recipes:
+            self.add(recipe)
+
+    def add(self, recipe):
+        """Indexes the next recipe of the catalog and returns its position."""
+        recipe_id = len(self.total_ingredients)
+        ingredients = recipe.get("ingredients", [])
+        self.total_ingredients.append(len(ingredients))
+        tokens = {
+            token
+            for ingredient in ingredients
+            for token in TOKEN_PATTERN.findall(ingredient.lower())
+        }
+        for token in tokens:
+            self.postings.setdefault(token, []).append(recipe_id)
+        return recipe_id
+
+    def candidates(self, ingredient):
+        """
+        Returns the positions of recipes that may match the lowercase ingredient.
+
+        The last word may carry the "s"/"es" plural, every other word must appear as is.
+        Returns None when the ingredient has no words to look up, in which case every
+        recipe is a candidate.
+        """
+        tokens = TOKEN_PATTERN.findall(ingredient)
+        if not tokens:
+            return None
+        *leading_tokens, last_token = tokens
+        recipe_ids = set()
+        for suffix in PLURAL_SUFFIXES:
+            recipe_ids.update(self.postings.get(last_token + suffix, ()))
+        for token in leading_tokens:
+            if not recipe_ids:
+                break
+            recipe_ids.intersection_update(self.postings.get(token, ()))
+        return recipe_ids
+
+    def is_single_token(self, ingredient):
+        """True when the candidates of the ingredient are exact matches and need no regex check."""
+        return TOKEN_PATTERN.fullmatch(ingredient) is not None
@@ -1,10 +1,39 @@
 import re
 from models_bbc.bbc_handler import BBCFileHandler
+from models_bbc.bbc_index import PLURAL_SUFFIXES
+from models_common.substitutions import LazySubstitutions
+from models_common.ranking import rank_page
+from models_common.match_result import MatchResult
+from models_common.incremental_search import IncrementalSearch
+from models_common.batch_search import rank_batch
+from models_common.sharded_search import ShardedSearch
+from models_common.vector_scoring import (
+    IncidenceMatrix,
+    default_engine,
+    numpy_available,
+    shared_matrix,
+    vector_ranking,
+)
+from models_common.sqlite_store import StoredRecipeList, normalize_recipe_name
+from models_common.query_cache import (
+    CachedRanking,
+    matched_in_query_order,
+    normalize_query,
+    query_cache,
+)
 
 
 class BBCParser:
-    def __init__(self):
-        self.handler = BBCFileHandler("bbc.json", "subs.json")
+    source_name = "bbc_goodfood"
+
+    def __init__(self, handler=None):
+        self.handler = handler or BBCFileHandler("bbc.json", "subs.json")
+        self.query_cache = query_cache
+        # "numpy" ranks on the IncidenceMatrix of the catalog, "python" on dicts of matches
+        self.engine = default_engine()
+        # Ranks the searches in worker processes once start_shards was called
+        self.shards = None
+        self._recipe_positions = None
 
     def parse_ingredients(self, food_input, spice_input):
         if "," not in (food_input + spice_input) or "." in (food_input + spice_input):
@@ -13,40 +42,202 @@ class BBCParser:
         ingredients = (food_input + "," + spice_input).split(",")
         return [ingredient.strip().lower() for ingredient in ingredients if ingredient]
 
-    def find_matching_recipes(self, user_ingredients):
-        """Finds and ranks recipes based on the number of matched ingredients."""
-        matches = self._gather_matches(user_ingredients)
-        return self._sort_matches(matches)
-
-    def _gather_matches(self, user_ingredients):
-        """Gather all matches based on user ingredients."""
-        matches = []
-        for recipe in self.handler.recipe_db:
-            score, matches_count, matched_ingredients, total_ingredients = self._calculate_score(recipe, user_ingredients)
-            updated_recipe = self._update_recipe_with_matches(recipe, matched_ingredients, total_ingredients)
-            self._add_substitutions(updated_recipe, recipe, matched_ingredients, user_ingredients)
-            matches.append(updated_recipe)
-        return matches
-
-    def _update_recipe_with_matches(self, recipe, matched_ingredients, total_ingredients):
-        """Updates the recipe dictionary with match details."""
-        updated_recipe = recipe.copy()
-        updated_recipe["matched_ingredients"] = matched_ingredients
-        updated_recipe["total_ingredients"] = total_ingredients
-        return updated_recipe
-
-    def _add_substitutions(self, updated_recipe, recipe, matched_ingredients, user_ingredients):
-        """Adds substitutions to the recipe if any are found."""
-        substitutions = self._get_substitutions(recipe.get("ingredients", []), matched_ingredients, user_ingredients)
-        if substitutions:
-            updated_recipe["substitutions"] = substitutions
-
-    def _sort_matches(self, matches):
-        """Sorts matches based on the proportion and number of matched ingredients."""
-        return sorted(
-            matches,
-            key=lambda x: (len(x["matched_ingredients"]) / x["total_ingredients"], len(x["matched_ingredients"])),
-            reverse=True
+    def find_matching_recipes(self, user_ingredients, limit=None, offset=0):
+        """
+        Finds and ranks the recipes sharing at least one ingredient with the user.
+
+        limit and offset select a page of the ranking, only the recipes on that page are built.
+        The ranking is kept in the query cache, so repeating a search or asking for its next
+        page does not match the ingredients again.
+        """
+        ranking = self.cached_ranking(user_ingredients)
+        return [
+            self._create_match_result(
+                recipe_id,
+                matched_in_query_order(ranking.matched_by_recipe[recipe_id], user_ingredients),
+                user_ingredients,
+            )
+            for recipe_id in ranking.page(limit, offset)
+        ]
+
+    def find_matching_recipes_batch(self, ingredient_lists, limit=None, offset=0):
+        """
+        Finds and ranks the recipes of many ingredient lists, as find_matching_recipes does for each.
+
+        Meant for bulk scoring: the ingredients shared by the lists are matched once for the
+        whole batch and the catalog is traversed once. Returns a list of matches per list.
+        """
+        ingredient_lists = list(ingredient_lists)
+        return [
+            [
+                self._create_match_result(
+                    recipe_id,
+                    matched_in_query_order(matched_by_recipe[recipe_id], user_ingredients),
+                    user_ingredients,
+                )
+                for recipe_id in recipe_ids
+            ]
+            for user_ingredients, (recipe_ids, matched_by_recipe) in zip(
+                ingredient_lists, rank_batch(self, ingredient_lists, limit, offset)
+            )
+        ]
+
+    def cached_ranking(self, user_ingredients):
+        """Returns the ranking of the ingredients, computed on the first search of the same set of ingredients."""
+        query = normalize_query(user_ingredients)
+        return self.query_cache.get(
+            self.source_name,
+            self.refresh_catalog(),
+            query,
+            lambda: self._rank_query(query),
+        )
+
+    def _rank_query(self, query):
+        if self.shards is not None:
+            return self.shards.ranking(query)
+        matrix = self.incidence_matrix()
+        if matrix is None:
+            return CachedRanking(self._lookup_matches(query), self.rank_matches)
+        return vector_ranking(matrix, query, self.term_rows(matrix, query))
+
+    def incidence_matrix(self):
+        """The IncidenceMatrix of the catalog with the numpy engine, None with the Python one or while the catalog loads."""
+        loader = self.handler.loader
+        if self.engine != "numpy" or not numpy_available() or (loader is not None and loader.loading):
+            return None
+        index = self.handler.ingredient_index
+        return shared_matrix(
+            index,
+            len(index.total_ingredients),
+            lambda: IncidenceMatrix(index.postings, index.total_ingredients, count_breaks_ties=True),
+        )
+
+    def term_rows(self, matrix, terms):
+        """Maps every lowercase term to the rows of the matrix of the recipes matching it, as match_terms does."""
+        index = self.handler.ingredient_index
+        rows_by_term = {}
+        for term in terms:
+            if index.is_single_token(term):
+                rows_by_term[term] = matrix.cached_rows(
+                    term, lambda: matrix.rows([term + suffix for suffix in PLURAL_SUFFIXES])
+                )
+            else:
+                rows_by_term[term] = matrix.cached_rows(term)
+        # The patterns of the other terms decide, checked in one pass over their candidates
+        other_terms = [term for term, rows in rows_by_term.items() if rows is None]
+        for term, recipe_ids in self.match_terms(other_terms).items():
+            rows_by_term[term] = matrix.cached_rows(term, lambda: matrix.as_rows(recipe_ids))
+        return rows_by_term
+
+    def start_shards(self, shard_count):
+        """Ranks the following searches in shard_count worker processes, see ShardedSearch."""
+        self.stop_shards()
+        self.shards = ShardedSearch(self, shard_count).start()
+
+    def stop_shards(self):
+        if self.shards is not None:
+            self.shards.close()
+            self.shards = None
+
+    def refresh_catalog(self):
+        """Reloads the catalog if its files changed and returns its version."""
+        return self.handler.refresh_catalog()
+
+    def start_incremental_search(self):
+        """Returns a search session that refines its previous results as ingredients are added or removed."""
+        return IncrementalSearch(self)
+
+    def rank_matches(self, matched_by_recipe, limit=None, offset=0):
+        """Returns the positions of the recipes ranked [offset:offset + limit]."""
+        return self.rank_match_counts(
+            {recipe_id: len(matched) for recipe_id, matched in matched_by_recipe.items()}, limit, offset
+        )
+
+    def rank_match_counts(self, match_counts, limit=None, offset=0):
+        """Same as rank_matches, given the number of ingredients matched by each recipe."""
+        return rank_page(match_counts, key=self.ranking_key(match_counts), limit=limit, offset=offset)
+
+    def ranking_key(self, match_counts):
+        """Sort key of the recipes of match_counts, a tuple ending with the position of the recipe."""
+        total_ingredients = self.handler.ingredient_index.total_ingredients
+        # By proportion and number of matched ingredients, then by position in the catalog
+        return lambda recipe_id: (
+            -(match_counts[recipe_id] / total_ingredients[recipe_id] if total_ingredients[recipe_id] else 0),
+            -match_counts[recipe_id],
+            recipe_id,
+        )
+
+    def build_matches(self, recipe_ids, matched_by_recipe, user_ingredients):
+        """Gather the matches of the given recipes based on user ingredients."""
+        return [
+            self._create_match_result(recipe_id, list(matched_by_recipe[recipe_id]), user_ingredients)
+            for recipe_id in recipe_ids
+        ]
+
+    def _lookup_matches(self, user_ingredients):
+        """
+        Maps the position of every recipe sharing an ingredient with the user
+        to the matched user ingredients, in the order they were entered.
+        """
+        matched_by_recipe = {}
+        user_ingredients_lower = [ingredient.lower() for ingredient in user_ingredients]
+
+        for user_ingredient in dict.fromkeys(user_ingredients_lower):
+            original_ingredient = user_ingredients[user_ingredients_lower.index(user_ingredient)]
+            for recipe_id in self.match_ingredient(user_ingredient):
+                matched_by_recipe.setdefault(recipe_id, []).append(original_ingredient)
+        return matched_by_recipe
+
+    def match_ingredient(self, user_ingredient):
+        """Returns the positions of the recipes with an ingredient line matching the user ingredient."""
+        ingredient = user_ingredient.lower()
+        return self.match_terms([ingredient])[ingredient]
+
+    def match_terms(self, terms):
+        """
+        Maps every lowercase term to the positions of the recipes with an ingredient line matching it.
+
+        Multi-word terms only narrow down their candidates in the index, the pattern decides
+        the match: the candidate recipes of all the terms are read and their ingredient lines
+        lowercased once, in catalog order, whatever the number of terms checked against them.
+        """
+        index = self.handler.ingredient_index
+        recipe_db = self.handler.recipe_db
+        recipe_ids_by_term = {}
+        patterns_by_recipe = {}
+        for term in terms:
+            candidates = index.candidates(term)
+            if candidates is not None and index.is_single_token(term):
+                recipe_ids_by_term[term] = candidates
+                continue
+            recipe_ids_by_term[term] = set()
+            if candidates is None:
+                candidates = range(len(recipe_db))
+            ingredient_pattern = self._create_ingredient_pattern(term)
+            for recipe_id in candidates:
+                patterns_by_recipe.setdefault(recipe_id, []).append((term, ingredient_pattern))
+
+        for recipe_id in sorted(patterns_by_recipe):
+            recipe_ingredients = [
+                recipe_ingredient.lower() for recipe_ingredient in recipe_db[recipe_id].get("ingredients", [])
+            ]
+            for term, ingredient_pattern in patterns_by_recipe[recipe_id]:
+                if any(ingredient_pattern.search(recipe_ingredient) for recipe_ingredient in recipe_ingredients):
+                    recipe_ids_by_term[term].add(recipe_id)
+        return recipe_ids_by_term
+
+    def _create_match_result(self, recipe_id, matched_ingredients, user_ingredients):
+        """Wraps the catalog recipe with its match details, substitutions are only looked up once it is displayed."""
+        recipe = self.handler.recipe_db[recipe_id]
+        substitutions = LazySubstitutions(
+            self._get_substitutions, recipe.get("ingredients", []), matched_ingredients, user_ingredients
+        )
+        return MatchResult(
+            recipe_id,
+            recipe,
+            matched_ingredients,
+            self.handler.ingredient_index.total_ingredients[recipe_id],
+            substitutions,
         )
 
     def _calculate_score(self, recipe, user_ingredients):
@@ -116,25 +307,35 @@ class BBCParser:
 
         substitutions = {}
         for ingredient in relevant_ingredients:
-            # For key, value in the json substitutions file:
-            for sub, sub_list in self.handler.substitutions_db.items():
-                if sub in ingredient or ingredient in sub:
-                    substitutions[ingredient] = sub_list
-                    break
+            # First entry of the json substitutions file contained in the ingredient or containing it
+            sub_list = self.handler.substitution_matcher.lookup(ingredient)
+            if sub_list is not None:
+                substitutions[ingredient] = sub_list
 
         return substitutions
 
     def search_recipe_by_name(self, recipe_name):
-        normalized_recipe_name = recipe_name.strip().lower()
-        for recipe in self.handler.recipe_db:
-            db_recipe_name = recipe.get("name", "").strip().lower()
-            if normalized_recipe_name == db_recipe_name:
-                return recipe
+        position = self._find_recipe_position(recipe_name)
+        if position is not None:
+            return self.handler.recipe_db[position]
         return {"message": f"Recipe '{recipe_name}' not found in the database."}
 
+    def _find_recipe_position(self, recipe_name):
+        """Position of the first recipe named recipe_name, ignoring case and surrounding spaces, or None."""
+        recipe_db = self.handler.recipe_db
+        if isinstance(recipe_db, StoredRecipeList):
+            return recipe_db.store.find_position_by_key(recipe_db.source, recipe_name)
+        # Built on the first lookup in an in-memory catalog, then reused until the catalog is reloaded
+        if self._recipe_positions is None or self._recipe_positions[0] is not recipe_db:
+            positions = {}
+            for position, recipe in enumerate(recipe_db):
+                positions.setdefault(normalize_recipe_name(recipe.get("name", "")), position)
+            self._recipe_positions = (recipe_db, positions)
+        return self._recipe_positions[1].get(normalize_recipe_name(recipe_name))
+
     def run(self, food_input, spice_input):
         user_ingredients = self.parse_ingredients(food_input, spice_input)
-        recipes = self.find_matching_recipes(user_ingredients)
+        recipes = self.find_matching_recipes(user_ingredients, limit=1)
         if recipes:
             first_recipe = recipes[0]
             save_message = self.handler.save_recipe_to_file(first_recipe)
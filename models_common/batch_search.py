@@ -0,0 +1,58 @@
+from collections import Counter
+from models_common.query_cache import normalize_query
+from models_common.vector_scoring import MatchedTerms
+
+
+def rank_batch(parser, ingredient_lists, limit=None, offset=0):
+    """
+    Ranks the recipes of many ingredient lists, as the parser's cached_ranking would one by one.
+
+    Returns, for every list, the positions of its recipes ranked [offset:offset + limit] and a
+    map from those positions to the matched normalized ingredients. Every distinct ingredient
+    of the batch is normalized and matched once, by parser.match_terms, and lists with the
+    same ingredients are ranked once. Recipes are ranked on their number of matches, the
+    matched ingredients are only listed for the page. The query cache is left out, a bulk
+    scoring run would only evict the searches of the interactive users from it.
+
+    With the numpy engine of the parser, the lists are scored together on its incidence matrix.
+    With its shards started, every worker process ranks the whole batch on its shard.
+
+    Works with any parser providing match_terms, rank_match_counts, incidence_matrix,
+    term_rows, shards and refresh_catalog.
+    """
+    parser.refresh_catalog()
+    queries = [normalize_query(user_ingredients) for user_ingredients in ingredient_lists]
+    if parser.shards is not None:
+        return parser.shards.rank_batch(queries, limit, offset)
+    terms = list(dict.fromkeys(term for query in queries for term in query))
+    matrix = parser.incidence_matrix()
+    if matrix is not None:
+        return _rank_batch_on_matrix(matrix, queries, parser.term_rows(matrix, terms), limit, offset)
+
+    recipe_ids_by_term = parser.match_terms(terms)
+    rankings = {}
+    for query in dict.fromkeys(queries):
+        match_counts = Counter()
+        for term in query:
+            match_counts.update(recipe_ids_by_term[term])
+        recipe_ids = parser.rank_match_counts(match_counts, limit, offset)
+        rankings[query] = (
+            recipe_ids,
+            {
+                recipe_id: [term for term in query if recipe_id in recipe_ids_by_term[term]]
+                for recipe_id in recipe_ids
+            },
+        )
+    return [rankings[query] for query in queries]
+
+
+def _rank_batch_on_matrix(matrix, queries, rows_by_term, limit, offset):
+    distinct_queries = list(dict.fromkeys(queries))
+    queries_term_rows = [[rows_by_term[term] for term in query] for query in distinct_queries]
+    rankings = {}
+    for query, term_rows, (recipe_ids, counts) in zip(
+        distinct_queries, queries_term_rows, matrix.score_batch(queries_term_rows)
+    ):
+        page = matrix.rank(recipe_ids, counts, limit, offset)
+        rankings[query] = (page, MatchedTerms(query, term_rows).look_up(page))
+    return [rankings[query] for query in queries]
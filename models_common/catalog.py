@@ -0,0 +1,67 @@
+import os
+import threading
+
+
+class CatalogRegistry:
+    """
+    Process-wide store for the catalogs loaded from the res folder.
+
+    Every source file is loaded once per process and the same object is handed out
+    to every handler and parser, so callers must treat the returned data as read-only.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._signatures = {}
+        self._lock = threading.RLock()
+
+    def get(self, kind, file_path, loader):
+        """
+        Returns the cached entry for (kind, file_path), calling loader on the first request.
+
+        The kind separates different views of the same file, e.g. the raw recipes and
+        an index built from them.
+        """
+        real_path = os.path.realpath(file_path)
+        key = (kind, real_path)
+        with self._lock:
+            if key not in self._entries:
+                # Taken before loading, a change made while loading is picked up by the next refresh
+                self._signatures.setdefault(real_path, self.file_signature(real_path))
+                self._entries[key] = loader()
+            return self._entries[key]
+
+    def invalidate(self, file_path=None):
+        """Drops every entry built from file_path, or all entries if no path is given."""
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+                self._signatures.clear()
+                return
+            real_path = os.path.realpath(file_path)
+            for key in [key for key in self._entries if key[1] == real_path]:
+                del self._entries[key]
+            self._signatures.pop(real_path, None)
+
+    def refresh(self, file_path):
+        """Drops the entries built from file_path if it changed on disk since they were loaded."""
+        real_path = os.path.realpath(file_path)
+        with self._lock:
+            if real_path not in self._signatures:
+                return False
+            if self._signatures[real_path] == self.file_signature(real_path):
+                return False
+            self.invalidate(real_path)
+            return True
+
+    @staticmethod
+    def file_signature(file_path):
+        """Modification time and size of the file, None if it does not exist."""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+
+catalog_registry = CatalogRegistry()
@@ -0,0 +1,130 @@
+from collections import Counter
+from collections.abc import Mapping
+from models_common.query_cache import (
+    CachedRanking,
+    matched_in_query_order,
+    normalize_ingredient,
+)
+
+
+class IncrementalSearch:
+    """
+    Search session that keeps the candidates and scores of its previous query.
+
+    Each update only looks up the ingredients that were added and takes back the
+    contribution of the ones that were removed, so typing one more ingredient costs
+    one index lookup instead of a search over the whole catalog.
+
+    Rankings are shared with the parser's query cache, a query that was already searched,
+    in this session or not, is not ranked again.
+
+    Works with any parser providing match_ingredient, rank_match_counts, build_matches,
+    refresh_catalog, source_name and query_cache.
+    """
+
+    def __init__(self, parser):
+        self.parser = parser
+        self.user_ingredients = []
+        self.matched_by_recipe = {}
+        self.catalog_version = None
+        self._recipes_by_ingredient = {}
+
+    def update(self, user_ingredients):
+        """Refines the candidates for the new list of ingredients."""
+        catalog_version = self.parser.refresh_catalog()
+        if catalog_version != self.catalog_version:
+            # Positions of the previous catalog are meaningless in the new one
+            self.matched_by_recipe = {}
+            self._recipes_by_ingredient = {}
+            self.catalog_version = catalog_version
+
+        self.user_ingredients = list(user_ingredients)
+        terms = list(dict.fromkeys(normalize_ingredient(i) for i in user_ingredients))
+        for ingredient in set(self._recipes_by_ingredient) - set(terms):
+            self._remove_ingredient(ingredient)
+        for ingredient in terms:
+            if ingredient not in self._recipes_by_ingredient:
+                self._add_ingredient(ingredient)
+
+    def _add_ingredient(self, ingredient):
+        recipe_ids = self.parser.match_ingredient(ingredient)
+        self._recipes_by_ingredient[ingredient] = recipe_ids
+        for recipe_id in recipe_ids:
+            self.matched_by_recipe.setdefault(recipe_id, set()).add(ingredient)
+
+    def _remove_ingredient(self, ingredient):
+        for recipe_id in self._recipes_by_ingredient.pop(ingredient):
+            matched_ingredients = self.matched_by_recipe[recipe_id]
+            matched_ingredients.discard(ingredient)
+            if not matched_ingredients:
+                del self.matched_by_recipe[recipe_id]
+
+    def results(self, limit=None, offset=0):
+        """Returns the results ranked [offset:offset + limit], like the parser's find_matching_recipes."""
+        ranking = self.parser.query_cache.get(
+            self.parser.source_name,
+            self.catalog_version,
+            tuple(sorted(self._recipes_by_ingredient)),
+            self._snapshot_ranking,
+        )
+        recipe_ids = ranking.page(limit, offset)
+        # Matched ingredients are listed in the order they were entered, as in a full search
+        page_matches = {
+            recipe_id: matched_in_query_order(
+                ranking.matched_by_recipe[recipe_id], self.user_ingredients
+            )
+            for recipe_id in recipe_ids
+        }
+        return self.parser.build_matches(recipe_ids, page_matches, self.user_ingredients)
+
+    def _snapshot_ranking(self):
+        # The cached ranking outlives this state, it keeps the recipes of the current ingredients
+        # only, which later updates replace rather than modify
+        return CachedRanking(
+            MatchedIngredients(self._recipes_by_ingredient),
+            lambda matched_by_recipe, limit=None, offset=0: self.parser.rank_match_counts(
+                matched_by_recipe.match_counts(), limit, offset
+            ),
+        )
+
+    def search(self, user_ingredients, limit=None, offset=0):
+        self.update(user_ingredients)
+        return self.results(limit, offset)
+
+
+class MatchedIngredients(Mapping):
+    """
+    Maps the position of every matched recipe to its matched ingredients, worked out on access.
+
+    Built from the recipes of every ingredient, which are never modified, so taking it costs
+    the number of ingredients rather than the number of candidates. The number of matches
+    of every recipe is only counted when the ranking asks for it.
+    """
+
+    def __init__(self, recipes_by_ingredient):
+        self._recipes_by_ingredient = dict(recipes_by_ingredient)
+        self._match_counts = None
+
+    def match_counts(self):
+        if self._match_counts is None:
+            match_counts = Counter()
+            for recipe_ids in self._recipes_by_ingredient.values():
+                match_counts.update(recipe_ids)
+            self._match_counts = match_counts
+        return self._match_counts
+
+    def __getitem__(self, recipe_id):
+        matched_ingredients = frozenset(
+            ingredient
+            for ingredient, recipe_ids in self._recipes_by_ingredient.items()
+            if recipe_id in recipe_ids
+        )
+        if not matched_ingredients:
+            raise KeyError(recipe_id)
+        return matched_ingredients
+
+    def __iter__(self):
+        return iter(self.match_counts())
+
+    def __len__(self):
+        return len(self.match_counts())
@@ -0,0 +1,46 @@
+MATCH_FIELDS = ("matched_ingredients", "total_ingredients", "substitutions")
+
+
+class MatchResult:
+    """
+    A recipe matched by a search, referencing the shared catalog entry instead of copying it.
+
+    Recipe fields are read through it the same way as from the recipe dict, e.g. result["name"]
+    or result.get("steps", []). The match details are available under the keys that used to be
+    added to the copied recipe: matched_ingredients, total_ingredients and substitutions.
+    """
+
+    __slots__ = ("recipe_id", "recipe", "matched_ingredients", "total_ingredients", "substitutions")
+
+    def __init__(self, recipe_id, recipe, matched_ingredients, total_ingredients, substitutions=None):
+        self.recipe_id = recipe_id
+        self.recipe = recipe
+        self.matched_ingredients = matched_ingredients
+        self.total_ingredients = total_ingredients
+        self.substitutions = substitutions if substitutions is not None else {}
+
+    @property
+    def name(self):
+        return self.recipe.get("name")
+
+    @property
+    def proportion(self):
+        if not self.total_ingredients:
+            return 0
+        return len(self.matched_ingredients) / self.total_ingredients
+
+    def __getitem__(self, key):
+        if key in MATCH_FIELDS:
+            return getattr(self, key)
+        return self.recipe[key]
+
+    def __contains__(self, key):
+        return key in MATCH_FIELDS or key in self.recipe
+
+    def get(self, key, default=None):
+        if key in MATCH_FIELDS:
+            return getattr(self, key)
+        return self.recipe.get(key, default)
+
+    def __repr__(self):
+        return f"MatchResult({self.name!r}, {len(self.matched_ingredients)}/{self.total_ingredients})"
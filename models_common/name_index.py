@@ -0,0 +1,74 @@
+import threading
+from array import array
+
+GRAM_SIZE = 3
+
+
+def name_trigrams(name):
+    return {name[i:i + GRAM_SIZE] for i in range(len(name) - GRAM_SIZE + 1)}
+
+
+class TrigramNameIndex:
+    """
+    Substring search over recipe names through their trigrams.
+
+    Every trigram of every lowercase name maps to the positions of the names containing it,
+    in catalog order. A query of three characters or more intersects the posting lists of
+    its trigrams, rarest first, and only the remaining candidates are checked for the whole
+    query. A query extending the previous one, as when typing, only filters its results.
+    """
+
+    def __init__(self, names=()):
+        self.names = []
+        self.postings = {}
+        self._last_search = None
+        self._lock = threading.Lock()
+        self.update(names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def update(self, names):
+        """Indexes the names past the ones already indexed, for a catalog that grows while loading."""
+        with self._lock:
+            for name in names[len(self.names):]:
+                self._add(name)
+
+    def _add(self, name):
+        position = len(self.names)
+        name = name.lower()
+        self.names.append(name)
+        for trigram in name_trigrams(name):
+            if trigram not in self.postings:
+                self.postings[trigram] = array("i")
+            self.postings[trigram].append(position)
+        self._last_search = None
+
+    def search(self, query):
+        """Positions, in catalog order, of the names containing the query, ignoring case."""
+        query = query.lower()
+        with self._lock:
+            if not query:
+                return list(range(len(self.names)))
+            last_search = self._last_search
+            if last_search is not None and last_search[0] in query:
+                candidates = last_search[1]
+            elif len(query) < GRAM_SIZE:
+                candidates = range(len(self.names))
+            else:
+                candidates = self._trigram_candidates(query)
+            result = [position for position in candidates if query in self.names[position]]
+            self._last_search = (query, result)
+            return result
+
+    def _trigram_candidates(self, query):
+        posting_lists = sorted(
+            (self.postings.get(trigram, ()) for trigram in name_trigrams(query)), key=len
+        )
+        candidates = set(posting_lists[0])
+        for posting_list in posting_lists[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(posting_list)
+        return sorted(candidates)
+
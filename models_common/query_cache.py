@@ -0,0 +1,122 @@
+import threading
+from collections import OrderedDict
+
+
+def normalize_ingredient(ingredient):
+    """Form of an ingredient used for matching and as part of the cache key."""
+    return ingredient.strip().lower()
+
+
+def normalize_query(user_ingredients):
+    """Cache key of a list of ingredients: sorted, without duplicates, case and surrounding spaces."""
+    return tuple(sorted({normalize_ingredient(ingredient) for ingredient in user_ingredients}))
+
+
+def matched_in_query_order(matched_terms, user_ingredients):
+    """Lists the user ingredients whose normalized form was matched, in the order they were entered."""
+    matched_ingredients = {}
+    for ingredient in user_ingredients:
+        term = normalize_ingredient(ingredient)
+        if term in matched_terms and term not in matched_ingredients:
+            matched_ingredients[term] = ingredient
+    return list(matched_ingredients.values())
+
+
+class CachedRanking:
+    """
+    Matches of a query with the part of their ranking computed so far.
+
+    The ranking is extended on demand, doubling the ranked prefix each time, so scrolling
+    through pages does not rank the whole candidate set up front.
+    """
+
+    def __init__(self, matched_by_recipe, rank_matches):
+        self.matched_by_recipe = matched_by_recipe
+        self._rank_matches = rank_matches
+        self._ranked_recipe_ids = []
+        self._complete = False
+        self._lock = threading.Lock()
+
+    def page(self, limit=None, offset=0):
+        """Returns the positions of the recipes ranked [offset:offset + limit]."""
+        end = None if limit is None else offset + max(limit, 0)
+        with self._lock:
+            if not self._complete and (end is None or end > len(self._ranked_recipe_ids)):
+                wanted = None if end is None else max(end, 2 * len(self._ranked_recipe_ids))
+                self._ranked_recipe_ids = self._rank_matches(self.matched_by_recipe, wanted, 0)
+                self._complete = wanted is None or len(self._ranked_recipe_ids) < wanted
+            return self._ranked_recipe_ids[offset:end]
+
+
+class QueryCache:
+    """
+    Least recently used cache of search rankings, shared by the parsers.
+
+    Entries are keyed by source and normalized query. Each source also passes the version of
+    its catalog, and all of its entries are dropped as soon as that version changes.
+    """
+
+    def __init__(self, max_size=128):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, source, version, query, compute):
+        """Returns the cached value for the query, calling compute() and storing its result on a miss."""
+        key = (source, query)
+        with self._lock:
+            if self._versions.get(source, version) != version:
+                self._drop_source(source)
+            self._versions[source] = version
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self.misses += 1
+
+        # Computed outside the lock, concurrent misses for the same query may both compute it
+        value = compute()
+        with self._lock:
+            if self._versions.get(source) == version:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                self._evict()
+        return value
+
+    def resize(self, max_size):
+        with self._lock:
+            self.max_size = max_size
+            self._evict()
+
+    def invalidate(self, source=None):
+        """Drops the entries of a source, or every entry if no source is given."""
+        with self._lock:
+            if source is None:
+                self._entries.clear()
+                self._versions.clear()
+            else:
+                self._drop_source(source)
+                self._versions.pop(source, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _drop_source(self, source):
+        for key in [key for key in self._entries if key[0] == source]:
+            del self._entries[key]
+
+    def _evict(self):
+        while len(self._entries) > max(self.max_size, 0):
+            self._entries.popitem(last=False)
+
+
+query_cache = QueryCache()
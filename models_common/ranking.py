@@ -0,0 +1,16 @@
+import heapq
+
+
+def rank_page(candidates, key, limit=None, offset=0):
+    """
+    Returns the candidates ranked [offset:offset + limit] when ordered by key.
+
+    With a limit only the best offset + limit candidates are kept on a heap, so the cost
+    grows with the page rather than with the number of candidates. Keys must be unique
+    (end them with the catalog position) for pages to line up with the full ranking.
+    """
+    if limit is None:
+        return sorted(candidates, key=key)[offset:]
+    if limit <= 0:
+        return []
+    return heapq.nsmallest(offset + limit, candidates, key=key)[offset:]
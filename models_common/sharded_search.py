@@ -0,0 +1,187 @@
+import heapq
+import itertools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+from models_common.batch_search import rank_batch
+from models_common.query_cache import CachedRanking
+
+# Parser searching the shard of the current worker process and the position of its first recipe
+_shard = None
+
+
+def shard_bounds(size, shard_count):
+    """Splits the positions of a catalog of size recipes into shard_count contiguous [start, end) ranges."""
+    return [(size * shard // shard_count, size * (shard + 1) // shard_count) for shard in range(shard_count)]
+
+
+class ShardCatalog:
+    """Stands in for the handler of a parser searching one shard of a catalog in a worker process."""
+
+    loader = None
+
+    def __init__(self, catalog):
+        self.recipe_db = catalog.get("recipes")
+        self.ingredient_index = catalog["ingredient_index"]
+
+    def refresh_catalog(self):
+        # A shard never changes, the ShardedSearch starts new workers when the catalog does
+        return 0
+
+
+def _start_shard(parser_class, snapshot, start, end, engine, handler_class, catalog_arguments):
+    global _shard
+    catalog = snapshot.load()
+    if catalog is None:
+        # Outdated since the ShardedSearch compiled it, the catalog is loaded again from the files of the handler
+        catalog = snapshot.build(lambda: handler_class(*catalog_arguments).build_shard(start, end))
+    parser = parser_class(ShardCatalog(catalog))
+    parser.engine = engine
+    _shard = (parser, start)
+
+
+def _shard_started():
+    return _shard is not None
+
+
+def _rank_shard(queries, end):
+    """The end best recipes of the shard for every query, as (ranking key, matched terms) in catalog positions."""
+    parser, start = _shard
+    if len(queries) == 1:
+        ranking = parser.cached_ranking(queries[0])
+        rankings = [(ranking.page(end), ranking.matched_by_recipe)]
+    else:
+        # The ingredients of the batch are matched once
+        rankings = rank_batch(parser, queries, end)
+    shard_rankings = []
+    for recipe_ids, matched_by_recipe in rankings:
+        matched_terms = [matched_by_recipe[recipe_id] for recipe_id in recipe_ids]
+        key = parser.ranking_key(
+            {recipe_id: len(terms) for recipe_id, terms in zip(recipe_ids, matched_terms)}
+        )
+        shard_rankings.append([
+            (key(recipe_id)[:-1] + (start + recipe_id,), terms)
+            for recipe_id, terms in zip(recipe_ids, matched_terms)
+        ])
+    return shard_rankings
+
+
+class ShardedSearch:
+    """
+    Ranks the searches of a parser in worker processes, each searching a shard of the catalog.
+
+    The catalog is split into shard_count contiguous ranges of recipes. Every shard is
+    compiled once into a snapshot of its own recipes and index, so a worker only unpickles
+    its shard instead of parsing the JSON source, and workers are spawned rather than forked
+    so they do not hold a copy of the whole catalog. A query is ranked by every worker at
+    once, each returning its best offset + limit recipes with their ranking keys, and the
+    shard rankings are merged on those keys. Keys end with the position of the recipe in the
+    catalog, so the merged ranking is the one the parser would compute in a single process.
+
+    Workers are started again on the new catalog when it changes on disk. The handler of the
+    parser provides shard_snapshot(start, end), build_shard(start, end) and catalog_arguments(),
+    with which a worker opens a handler of the same files to build an outdated shard again.
+    """
+
+    def __init__(self, parser, shard_count):
+        if shard_count < 1:
+            raise ValueError("A sharded search needs at least one shard")
+        self.parser = parser
+        self.shard_count = shard_count
+        self.version = None
+        self._workers = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Starts one worker per shard on the current catalog, compiling the snapshots of the shards first if needed."""
+        with self._lock:
+            self._start()
+        return self
+
+    def close(self):
+        with self._lock:
+            self._stop()
+
+    def _start(self):
+        handler = self.parser.handler
+        if handler.loader is not None:
+            # Shards are ranges of the whole catalog
+            handler.loader.wait()
+        self.version = self.parser.refresh_catalog()
+        context = multiprocessing.get_context("spawn")
+        bounds = shard_bounds(len(handler.recipe_db), self.shard_count)
+        for start, end in bounds:
+            snapshot = handler.shard_snapshot(start, end)
+            if not snapshot.is_current():
+                snapshot.build(lambda: handler.build_shard(start, end))
+            self._workers.append(
+                ProcessPoolExecutor(
+                    max_workers=1,
+                    mp_context=context,
+                    initializer=_start_shard,
+                    initargs=(
+                        type(self.parser),
+                        snapshot,
+                        start,
+                        end,
+                        self.parser.engine,
+                        type(handler),
+                        handler.catalog_arguments(),
+                    ),
+                )
+            )
+        # Waits for every worker to load its shard, so the first searches are not slowed down by it
+        for started in [worker.submit(_shard_started) for worker in self._workers]:
+            started.result()
+
+    def _stop(self):
+        for worker in self._workers:
+            worker.shutdown()
+        self._workers = []
+
+    def _current_workers(self):
+        with self._lock:
+            if self.parser.refresh_catalog() != self.version:
+                self._stop()
+                self._start()
+            return self._workers
+
+    def rank(self, queries, end=None):
+        """
+        Ranks normalized queries [0:end] on the shards.
+
+        Returns, for every query, the positions of its recipes and a map from those positions
+        to the matched terms.
+        """
+        rankings = [worker.submit(_rank_shard, queries, end) for worker in self._current_workers()]
+        shard_rankings = [ranking.result() for ranking in rankings]
+        merged_rankings = []
+        for query_rankings in zip(*shard_rankings):
+            merged = list(itertools.islice(heapq.merge(*query_rankings, key=itemgetter(0)), end))
+            merged_rankings.append((
+                [key[-1] for key, _ in merged],
+                {key[-1]: matched_terms for key, matched_terms in merged},
+            ))
+        return merged_rankings
+
+    def ranking(self, query):
+        """CachedRanking of a normalized query, its pages are ranked on the shards as they are requested."""
+        matched_by_recipe = {}
+
+        def rank(_, limit=None, offset=0):
+            recipe_ids, matched_terms = self.rank([query], None if limit is None else offset + limit)[0]
+            matched_by_recipe.update(matched_terms)
+            return recipe_ids[offset:]
+
+        return CachedRanking(matched_by_recipe, rank)
+
+    def rank_batch(self, queries, limit=None, offset=0):
+        """Same as rank_batch of batch_search, every shard ranks the distinct queries of the batch in one go."""
+        distinct_queries = list(dict.fromkeys(queries))
+        end = None if limit is None else offset + max(limit, 0)
+        rankings = {}
+        for query, (recipe_ids, matched_terms) in zip(distinct_queries, self.rank(distinct_queries, end)):
+            page = recipe_ids[offset:]
+            rankings[query] = (page, {recipe_id: matched_terms[recipe_id] for recipe_id in page})
+        return [rankings[query] for query in queries]
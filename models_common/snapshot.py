@@ -0,0 +1,136 @@
+import hashlib
+import os
+import pickle
+import tempfile
+
+# Bumped whenever the layout of the snapshot data or of the pickled index classes changes
+SNAPSHOT_FORMAT = 4
+SNAPSHOT_DIR = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "res", "snapshots")
+)
+
+
+def stat_source(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def hash_source(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def describe_source(path):
+    """Modification time, size and content hash of a source, None if it does not exist."""
+    stat = stat_source(path)
+    if stat is None:
+        return None
+    return {"mtime_ns": stat[0], "size": stat[1], "sha256": hash_source(path)}
+
+
+def describe_sources(source_paths):
+    return {os.path.realpath(path): describe_source(path) for path in source_paths}
+
+
+def sources_match(sources, source_paths):
+    """
+    True when the sources described by describe_sources are unchanged.
+
+    A source whose time changed but whose content hashes the same, e.g. after a checkout, still matches.
+    """
+    if set(sources) != {os.path.realpath(path) for path in source_paths}:
+        return False
+    for path, recorded in sources.items():
+        current = stat_source(path)
+        if recorded is None or current is None:
+            if recorded is not current:
+                return False
+        elif current != (recorded["mtime_ns"], recorded["size"]):
+            if current[1] != recorded["size"] or _hash_or_none(path) != recorded["sha256"]:
+                return False
+    return True
+
+
+def _hash_or_none(path):
+    try:
+        return hash_source(path)
+    except OSError:
+        return None
+
+
+class CatalogSnapshot:
+    """
+    Binary copy of a catalog compiled from its JSON source files.
+
+    The snapshot holds the normalized catalog together with the indexes built from it, so
+    a start only unpickles one file instead of parsing the JSON and indexing it again. It
+    records the modification time, size and sha256 of every source, see sources_match, in
+    a header pickled ahead of the data so is_current can check it without loading the rest.
+
+    Snapshots are only ever written by this class, they are trusted like the rest of res.
+    """
+
+    def __init__(self, name, source_paths, snapshot_dir=None):
+        if snapshot_dir is None:
+            # Next to the sources, res/snapshots for the catalogs of the res folder
+            snapshot_dir = os.path.join(os.path.dirname(os.path.realpath(source_paths[0])), "snapshots")
+        self.path = os.path.join(snapshot_dir, f"{name}.pickle")
+        self.source_paths = source_paths
+
+    def load(self):
+        """Returns the data of the snapshot, None if it is missing, unreadable or outdated."""
+        return self._read(header_only=False)
+
+    def is_current(self):
+        """True when the snapshot exists and was built from the current sources, its data is not loaded."""
+        return self._read(header_only=True) is not None
+
+    def _read(self, header_only):
+        try:
+            with open(self.path, "rb") as file:
+                header = pickle.load(file)
+                if not isinstance(header, dict) or header.get("format") != SNAPSHOT_FORMAT:
+                    return None
+                if not sources_match(header.get("sources", {}), self.source_paths):
+                    return None
+                return header if header_only else pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return None
+
+    def build(self, build_data):
+        """Calls build_data() and stores its result as the snapshot of the current sources."""
+        # Described before building, a source changed meanwhile makes the snapshot outdated
+        sources = describe_sources(self.source_paths)
+        data = build_data()
+        try:
+            self._write({"format": SNAPSHOT_FORMAT, "sources": sources}, data)
+        except (OSError, pickle.PicklingError) as e:
+            # Not being able to cache the catalog only costs start-up time
+            print(f"Error writing snapshot {self.path}: {e}")
+        return data
+
+    def load_or_build(self, build_data):
+        data = self.load()
+        return self.build(build_data) if data is None else data
+
+    def _write(self, header, data):
+        snapshot_dir = os.path.dirname(self.path)
+        os.makedirs(snapshot_dir, exist_ok=True)
+        # Written aside and swapped in, so a reader never sees a half written snapshot
+        descriptor, temp_path = tempfile.mkstemp(dir=snapshot_dir, suffix=".tmp")
+        try:
+            # mkstemp creates the file readable by its owner only
+            os.chmod(temp_path, 0o644)
+            with os.fdopen(descriptor, "wb") as file:
+                pickle.dump(header, file, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(data, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
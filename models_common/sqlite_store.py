@@ -0,0 +1,279 @@
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from collections.abc import ItemsView, Mapping, Sequence
+from models_common.catalog import catalog_registry
+from models_common.snapshot import sources_match
+
+# "json" keeps the catalogs in memory, "sqlite" keeps them in SQLITE_CATALOG_PATH
+STORAGE_ENV_VAR = "RECIPE_FINDER_STORAGE"
+SQLITE_CATALOG_PATH = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "res", "catalog.sqlite3")
+)
+
+
+def default_storage():
+    return os.environ.get(STORAGE_ENV_VAR, "json").strip().lower()
+
+
+def normalize_recipe_name(name):
+    return name.strip().lower()
+
+
+def catalog_source(kind, file_path):
+    """Source of the catalog of kind read from file_path in the store, catalogs of other files do not share it."""
+    return f"{kind}:{os.path.normcase(os.path.realpath(file_path))}"
+
+
+def open_catalog_store(db_path=SQLITE_CATALOG_PATH):
+    """Returns the store of db_path, opened once per process."""
+    return catalog_registry.get("sqlite_store", db_path, lambda: SQLiteCatalogStore(db_path))
+
+
+class SQLiteCatalogStore:
+    """
+    Catalogs kept in a SQLite database instead of in memory.
+
+    Recipes are stored per source in catalog order with their JSON body, which is only
+    parsed when the recipe is accessed, and are indexed by normalized name. Names are also
+    indexed by an FTS5 trigram table, which answers the substring searches of the recipe
+    lists; without FTS5 support in the sqlite3 library, LIKE scans are used instead.
+
+    One connection is shared by all threads, queries are serialized by a lock.
+    """
+
+    def __init__(self, db_path=SQLITE_CATALOG_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.has_name_index = False
+        self._create_schema()
+
+    def _create_schema(self):
+        with self._lock, self._connection:
+            self._connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS recipes (
+                    id INTEGER PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    name_key TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    UNIQUE (source, position)
+                );
+                CREATE INDEX IF NOT EXISTS recipes_by_name ON recipes (source, name);
+                CREATE INDEX IF NOT EXISTS recipes_by_name_key ON recipes (source, name_key);
+                CREATE TABLE IF NOT EXISTS catalog_sources (
+                    source TEXT PRIMARY KEY,
+                    description TEXT NOT NULL
+                );
+                """
+            )
+            try:
+                self._connection.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS recipe_names USING fts5("
+                    "name_key, content='recipes', content_rowid='id', tokenize='trigram')"
+                )
+                self.has_name_index = True
+            except sqlite3.OperationalError:
+                # sqlite3 built without FTS5 or older than 3.34, which added the trigram tokenizer
+                self.has_name_index = False
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def is_current(self, source, source_paths):
+        """True when the source was imported from the current content of source_paths."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT description FROM catalog_sources WHERE source = ?", (source,)
+            ).fetchone()
+        return row is not None and sources_match(json.loads(row[0]), source_paths)
+
+    def import_recipes(self, source, description, records):
+        """
+        Replaces the recipes of a source by records, an iterable of (name, body) pairs in catalog order.
+
+        description comes from describe_sources and is what is_current checks later on.
+        """
+        rows = (
+            (source, position, name, normalize_recipe_name(name), json.dumps(body, ensure_ascii=False))
+            for position, (name, body) in enumerate(records)
+        )
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM recipes WHERE source = ?", (source,))
+            self._connection.executemany(
+                "INSERT INTO recipes (source, position, name, name_key, body) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            if self.has_name_index:
+                self._connection.execute("INSERT INTO recipe_names (recipe_names) VALUES ('rebuild')")
+            self._connection.execute(
+                "INSERT OR REPLACE INTO catalog_sources (source, description) VALUES (?, ?)",
+                (source, json.dumps(description)),
+            )
+
+    def count(self, source):
+        return self._fetch_value("SELECT COUNT(*) FROM recipes WHERE source = ?", (source,))
+
+    def names(self, source):
+        """Names of the recipes of a source, in catalog order."""
+        return [
+            name
+            for (name,) in self._fetch_all(
+                "SELECT name FROM recipes WHERE source = ? ORDER BY position", (source,)
+            )
+        ]
+
+    def body(self, source, position):
+        body = self._fetch_value(
+            "SELECT body FROM recipes WHERE source = ? AND position = ?", (source, position)
+        )
+        if body is None:
+            raise IndexError(position)
+        return json.loads(body)
+
+    def iter_bodies(self, source, batch_size=1000):
+        """Yields the bodies of a source in catalog order, reading batch_size rows at a time."""
+        position = 0
+        while True:
+            rows = self._fetch_all(
+                "SELECT body FROM recipes WHERE source = ? AND position >= ? "
+                "ORDER BY position LIMIT ?",
+                (source, position, batch_size),
+            )
+            for (body,) in rows:
+                yield json.loads(body)
+            if len(rows) < batch_size:
+                return
+            position += batch_size
+
+    def find_position(self, source, name):
+        """Position of the first recipe with exactly this name, or None."""
+        return self._fetch_value(
+            "SELECT MIN(position) FROM recipes WHERE source = ? AND name = ?", (source, name)
+        )
+
+    def find_position_by_key(self, source, name):
+        """Position of the first recipe with this name, ignoring case and surrounding spaces, or None."""
+        return self._fetch_value(
+            "SELECT MIN(position) FROM recipes WHERE source = ? AND name_key = ?",
+            (source, normalize_recipe_name(name)),
+        )
+
+    def search_names(self, source, query):
+        """Positions, in catalog order, of the recipes whose lowercase name contains the lowercase query."""
+        query = query.lower()
+        if not query:
+            sql, parameters = "SELECT position FROM recipes WHERE source = ?", (source,)
+        elif self.has_name_index and len(query) >= 3:
+            # Trigram MATCH of a quoted string is a substring search
+            sql = (
+                "SELECT recipes.position FROM recipe_names "
+                "JOIN recipes ON recipes.id = recipe_names.rowid "
+                "WHERE recipe_names MATCH ? AND recipes.source = ?"
+            )
+            parameters = ('"' + query.replace('"', '""') + '"', source)
+        else:
+            escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            sql = "SELECT position FROM recipes WHERE source = ? AND name_key LIKE ? ESCAPE '\\'"
+            parameters = (source, f"%{escaped}%")
+        return sorted(position for (position,) in self._fetch_all(sql, parameters))
+
+    def _fetch_value(self, sql, parameters):
+        with self._lock:
+            row = self._connection.execute(sql, parameters).fetchone()
+        return None if row is None else row[0]
+
+    def _fetch_all(self, sql, parameters):
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+
+class StoredRecipeList(Sequence):
+    """
+    Recipes of a source, in catalog order, read from the store when they are accessed.
+
+    Stands in for the in-memory list of recipes. The most recently read bodies are kept,
+    with_name adds the recipe name to every body like TastyHandler.load_tasty_recipes does.
+    """
+
+    cache_size = 256
+
+    def __init__(self, store, source, with_name=False):
+        self.store = store
+        self.source = source
+        self.with_name = with_name
+        self._length = store.count(source)
+        self._names = None
+        self._bodies = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(self._length))]
+        if position < 0:
+            position += self._length
+        if not 0 <= position < self._length:
+            raise IndexError(position)
+        with self._lock:
+            if position in self._bodies:
+                self._bodies.move_to_end(position)
+                return self._bodies[position]
+        body = self._with_name(position, self.store.body(self.source, position))
+        with self._lock:
+            self._bodies[position] = body
+            if len(self._bodies) > self.cache_size:
+                self._bodies.popitem(last=False)
+        return body
+
+    def __iter__(self):
+        # Streamed in batches instead of one query per recipe
+        for position, body in enumerate(self.store.iter_bodies(self.source)):
+            yield self._with_name(position, body)
+
+    def names(self):
+        if self._names is None:
+            self._names = self.store.names(self.source)
+        return self._names
+
+    def _with_name(self, position, body):
+        if self.with_name:
+            return {"name": self.names()[position], **body}
+        return body
+
+
+class StoredRecipeMapping(Mapping):
+    """Recipes of a source by name, in catalog order, read from the store when they are accessed."""
+
+    def __init__(self, store, source):
+        self.recipes = StoredRecipeList(store, source)
+
+    def __getitem__(self, name):
+        position = self.recipes.store.find_position(self.recipes.source, name)
+        if position is None:
+            raise KeyError(name)
+        return self.recipes[position]
+
+    def __iter__(self):
+        return iter(self.recipes.names())
+
+    def __len__(self):
+        return len(self.recipes)
+
+    def items(self):
+        return StoredRecipeItems(self)
+
+
+class StoredRecipeItems(ItemsView):
+    def __iter__(self):
+        # Streams the bodies instead of looking every recipe up by name
+        return zip(self._mapping.recipes.names(), self._mapping.recipes)
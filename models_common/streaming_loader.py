@@ -0,0 +1,294 @@
+import codecs
+import json
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+
+CHUNK_SIZE = 1 << 16
+JSON_WHITESPACE = " \t\n\r"
+
+
+def iter_json_records(file_path, chunk_size=CHUNK_SIZE):
+    """
+    Yields (key, value, offset, length) for every record of a catalog file, parsing it a chunk at a time.
+
+    The items of a JSON array come with key None, the members of a JSON object with their
+    name, and a JSON Lines file (.jsonl) has one item per line. offset and length locate
+    the value in the file in bytes, read_json_record parses it again from there.
+    """
+    with open(file_path, "rb") as file:
+        if file_path.endswith(".jsonl"):
+            yield from _iter_json_lines(file)
+        else:
+            yield from _iter_json_document(_JSONStream(file, chunk_size))
+
+
+def read_json_record(file, offset, length):
+    file.seek(offset)
+    return json.loads(file.read(length))
+
+
+def _iter_json_lines(file):
+    offset = 0
+    for line in file:
+        if line.strip():
+            yield None, json.loads(line), offset, len(line)
+        offset += len(line)
+
+
+def _iter_json_document(stream):
+    opening = stream.peek()
+    if opening not in ("[", "{"):
+        raise ValueError("A catalog must be a JSON array or object")
+    closing = "]" if opening == "[" else "}"
+    stream.skip()
+    if stream.peek() == closing:
+        return
+    while True:
+        key = None
+        if opening == "{":
+            key, _, _ = stream.value()
+            stream.expect(":")
+        value, offset, length = stream.value()
+        yield key, value, offset, length
+        separator = stream.peek()
+        if separator == closing:
+            return
+        stream.expect(",")
+
+
+class _JSONStream:
+    """Text of a JSON file decoded chunk by chunk, with the byte offset of what was consumed."""
+
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.position = 0
+        self.offset = 0
+        self.eof = False
+
+    def peek(self):
+        """Skips whitespace and returns the next character, "" at the end of the file."""
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in JSON_WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._fill():
+                return ""
+
+    def skip(self):
+        self.position += 1
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} at byte {self._byte_offset()}, found {found!r}")
+        self.skip()
+
+    def value(self):
+        """Decodes the next value and returns it with its offset and length in bytes."""
+        self.peek()
+        self._compact()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                # Most likely cut by the end of the chunk, a real error resurfaces at the end of the file
+                if not self._fill():
+                    raise
+                continue
+            if end == len(self.buffer) and self._fill():
+                # A number may go on in the next chunk
+                continue
+            break
+        length = len(self.buffer[self.position:end].encode("utf-8"))
+        offset = self._byte_offset()
+        self.position = end
+        return value, offset, length
+
+    def _byte_offset(self):
+        return self.offset + len(self.buffer[: self.position].encode("utf-8"))
+
+    def _compact(self):
+        # Drops the consumed text, so the buffer only ever holds about one record and one chunk
+        if self.position:
+            self.offset = self._byte_offset()
+            self.buffer = self.buffer[self.position:]
+            self.position = 0
+
+    def _fill(self):
+        if self.eof:
+            return False
+        self._compact()
+        chunk = self.file.read(self.chunk_size)
+        self.eof = not chunk
+        if not self.offset and not self.buffer and chunk.startswith(codecs.BOM_UTF8):
+            # Not part of the text, but counted in the offsets
+            self.offset = len(codecs.BOM_UTF8)
+            chunk = chunk[len(codecs.BOM_UTF8):]
+        self.buffer += self._utf8.decode(chunk, final=self.eof)
+        return not self.eof
+
+
+class FileRecordList(Sequence):
+    """
+    Records of a catalog file in file order, read again from the file when they are accessed.
+
+    Only the byte offset and length of every record are held, the most recently read records
+    are kept.
+    """
+
+    cache_size = 256
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._offsets = array("q")
+        self._lengths = array("q")
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+        self._file = None
+
+    def append(self, offset, length):
+        """Adds the next record of the file and returns its position."""
+        # Appending length last, a reader never sees a position without its length
+        self._offsets.append(offset)
+        self._lengths.append(length)
+        return len(self._lengths) - 1
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        with self._lock:
+            if position in self._records:
+                self._records.move_to_end(position)
+                return self._records[position]
+            if self._file is None:
+                self._file = open(self.file_path, "rb")
+            record = read_json_record(self._file, self._offsets[position], self._lengths[position])
+            self._records[position] = record
+            if len(self._records) > self.cache_size:
+                self._records.popitem(last=False)
+            return record
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class FileRecordMapping(Mapping):
+    """Records of a catalog file by name, in file order, read again from the file when accessed."""
+
+    def __init__(self, file_path):
+        self.records = FileRecordList(file_path)
+        self.names = []
+        self._positions = {}
+
+    def add(self, name, offset, length):
+        position = self.records.append(offset, length)
+        self.names.append(name)
+        # The last of duplicated names wins, as with json.load
+        self._positions[name] = position
+        return position
+
+    def __getitem__(self, name):
+        position = self._positions.get(name)
+        if position is None:
+            raise KeyError(name)
+        return self.records[position]
+
+    def __iter__(self):
+        # Copied, the loader may be adding names meanwhile
+        return iter(self.names[:])
+
+    def __len__(self):
+        return len(self.names)
+
+
+class NamedRecordList(Sequence):
+    """
+    Records of a FileRecordMapping in file order, each with its name added under "name".
+
+    A view of the mapping, it grows with it while the catalog loads, and duplicated names
+    keep a row each, at the positions of the index.
+    """
+
+    def __init__(self, records):
+        self.records = records
+
+    def __len__(self):
+        # Names are added after the records, a position of a name always has its record
+        return len(self.records.names)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        return {"name": self.records.names[position], **self.records.records[position]}
+
+
+class StreamingCatalogLoader:
+    """
+    Reads a catalog file record by record on a background thread.
+
+    Each record yielded by read_records(file_path), iter_json_records by default, is handed
+    to on_record(key, value, offset, length) as soon as it is parsed, so the part of the
+    catalog indexed so far can be searched while the rest is loading. count is the number
+    of records loaded, it only grows.
+    """
+
+    def __init__(self, file_path, on_record, read_records=iter_json_records):
+        self.file_path = file_path
+        self.on_record = on_record
+        self.read_records = read_records
+        self.count = 0
+        self.error = None
+        self._done = threading.Event()
+        self._cancelled = False
+        self._thread = None
+
+    @property
+    def loading(self):
+        return not self._done.is_set()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="catalog-loader", daemon=True)
+        self._thread.start()
+        return self
+
+    def run(self):
+        try:
+            for record in self.read_records(self.file_path):
+                if self._cancelled:
+                    break
+                self.on_record(*record)
+                self.count += 1
+        except (OSError, ValueError) as e:
+            self.error = e
+            print(f"Error loading {self.file_path}: {e}")
+        finally:
+            self._done.set()
+
+    def wait(self, timeout=None):
+        """Blocks until the whole catalog is loaded, returns False if the timeout expired first."""
+        return self._done.wait(timeout)
+
+    def cancel(self):
+        self._cancelled = True
@@ -0,0 +1,160 @@
+from collections.abc import Mapping
+from models_common.snapshot import CatalogSnapshot
+
+
+def load_substitutions_catalog(subs_file_path, read_substitutions, rebuild=False):
+    """
+    Returns the substitutions table of subs.json and its matcher, from the snapshot when it is up to date.
+
+    read_substitutions(subs_file_path) parses the JSON file when the snapshot is rebuilt.
+    """
+
+    def build():
+        substitutions_db = read_substitutions(subs_file_path)
+        return {"substitutions": substitutions_db, "matcher": SubstitutionMatcher(substitutions_db)}
+
+    snapshot = CatalogSnapshot("subs", [subs_file_path])
+    return snapshot.build(build) if rebuild else snapshot.load_or_build(build)
+
+
+class LazySubstitutions(Mapping):
+    """
+    Substitutions of a search result, worked out the first time they are read.
+
+    Searches attach one to every result but only the recipe opened in the details view
+    pays for the lookup. Reading it like a dict resolves it, the result is then memoized.
+    """
+
+    def __init__(self, compute, *args):
+        self._compute = compute
+        self._args = args
+        self._substitutions = None
+
+    def resolve(self):
+        if self._substitutions is None:
+            self._substitutions = self._compute(*self._args)
+            # The inputs are not needed anymore, let them be garbage collected
+            self._compute = self._args = None
+        return self._substitutions
+
+    @property
+    def resolved(self):
+        return self._substitutions is not None
+
+    def __getitem__(self, ingredient):
+        return self.resolve()[ingredient]
+
+    def __iter__(self):
+        return iter(self.resolve())
+
+    def __len__(self):
+        return len(self.resolve())
+
+    def __repr__(self):
+        if not self.resolved:
+            return "LazySubstitutions(<unresolved>)"
+        return f"LazySubstitutions({self._substitutions!r})"
+
+
+class SubstitutionMatcher:
+    """
+    Looks up ingredient substitutions from subs.json without scanning the whole table.
+
+    An entry applies to an ingredient when its item is contained in the ingredient or the
+    ingredient is contained in the item, and the first applicable entry in file order wins.
+    An Aho-Corasick automaton over the items answers the first case in one pass over the
+    ingredient. For the second, the items holding the rarest character of the ingredient
+    are shortlisted and checked in file order.
+    """
+
+    max_cached_lookups = 4096
+
+    def __init__(self, substitutions_db):
+        self.entries = list(substitutions_db.items())
+        self._build_automaton()
+        self._build_item_characters()
+        self._cache = {}
+
+    def _build_automaton(self):
+        # Every state keeps the first entry among the items ending there or on its failure chain
+        self._transitions = [{}]
+        self._first_entry = [None]
+        for position, (item, _) in enumerate(self.entries):
+            state = 0
+            for char in item:
+                next_state = self._transitions[state].get(char)
+                if next_state is None:
+                    next_state = len(self._transitions)
+                    self._transitions.append({})
+                    self._first_entry.append(None)
+                    self._transitions[state][char] = next_state
+                state = next_state
+            self._first_entry[state] = self._earliest(self._first_entry[state], position)
+
+        self._failure = [0] * len(self._transitions)
+        queue = list(self._transitions[0].values())
+        for state in queue:
+            for char, next_state in self._transitions[state].items():
+                failure = self._failure[state]
+                while failure and char not in self._transitions[failure]:
+                    failure = self._failure[failure]
+                if state and char in self._transitions[failure]:
+                    failure = self._transitions[failure][char]
+                self._failure[next_state] = failure
+                self._first_entry[next_state] = self._earliest(
+                    self._first_entry[next_state], self._first_entry[failure]
+                )
+                queue.append(next_state)
+
+    def _build_item_characters(self):
+        # Positions, in file order, of the items holding every character
+        self._items_by_character = {}
+        for position, (item, _) in enumerate(self.entries):
+            for char in set(item):
+                self._items_by_character.setdefault(char, []).append(position)
+
+    def _earliest(self, first, second):
+        if first is None:
+            return second
+        if second is None:
+            return first
+        return min(first, second)
+
+    def _first_item_in(self, ingredient):
+        """Position of the first entry whose item occurs in the ingredient."""
+        state = 0
+        first = self._first_entry[0]
+        for char in ingredient:
+            while state and char not in self._transitions[state]:
+                state = self._failure[state]
+            state = self._transitions[state].get(char, 0)
+            first = self._earliest(first, self._first_entry[state])
+        return first
+
+    def _first_item_containing(self, ingredient, before):
+        """Position of the first entry, before the given one, whose item contains the ingredient."""
+        if not ingredient:
+            return 0 if self.entries else None
+        shortlist = min(
+            (self._items_by_character.get(char, ()) for char in set(ingredient)), key=len
+        )
+        for position in shortlist:
+            if before is not None and position >= before:
+                break
+            if ingredient in self.entries[position][0]:
+                return position
+        return None
+
+    def find(self, ingredient):
+        """Returns the position in the table of the first entry applying to the ingredient, or None."""
+        if ingredient not in self._cache:
+            if len(self._cache) >= self.max_cached_lookups:
+                self._cache.clear()
+            first = self._first_item_in(ingredient)
+            self._cache[ingredient] = self._earliest(first, self._first_item_containing(ingredient, first))
+        return self._cache[ingredient]
+
+    def lookup(self, ingredient):
+        """Returns the substitutions of the first entry applying to the ingredient, or None."""
+        position = self.find(ingredient)
+        return None if position is None else self.entries[position][1]
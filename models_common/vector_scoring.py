@@ -0,0 +1,208 @@
+import itertools
+import os
+import threading
+import weakref
+from models_common.query_cache import CachedRanking
+
+try:
+    import numpy as np
+except ImportError:
+    # Optional, searches are ranked in Python without it
+    np = None
+
+ENGINE_ENV_VAR = "RECIPE_FINDER_ENGINE"
+
+_matrices = weakref.WeakKeyDictionary()
+_matrices_lock = threading.Lock()
+
+
+def numpy_available():
+    return np is not None
+
+
+def default_engine():
+    """"numpy" when RECIPE_FINDER_ENGINE asks for it and numpy is installed, "python" otherwise."""
+    engine = os.environ.get(ENGINE_ENV_VAR, "python").strip().lower()
+    return "numpy" if engine == "numpy" and numpy_available() else "python"
+
+
+def shared_matrix(index, size, build):
+    """
+    Returns the IncidenceMatrix of an ingredient index, calling build() the first time.
+
+    The matrix is shared by every parser searching the same index and built again if the
+    index grew past size since, it is dropped along with the index.
+    """
+    with _matrices_lock:
+        entry = _matrices.get(index)
+        if entry is None or entry[0] != size:
+            entry = _matrices[index] = (size, build())
+        return entry[1]
+
+
+def vector_ranking(matrix, query, rows_by_term):
+    """CachedRanking of a normalized query scored on the matrix, given the rows of its terms."""
+    term_rows = [rows_by_term[term] for term in query]
+    recipe_ids, counts = matrix.score(term_rows)
+    matched_terms = MatchedTerms(query, term_rows)
+
+    def rank(matched_by_recipe, limit=None, offset=0):
+        ranked = matrix.rank(recipe_ids, counts, limit, offset)
+        # The page is about to be listed, its matched terms are looked up together
+        matched_terms.look_up(ranked)
+        return ranked
+
+    return CachedRanking(matched_terms, rank)
+
+
+class IncidenceMatrix:
+    """
+    Recipes × ingredient vocabulary of a catalog, built once from its index.
+
+    Held in compressed sparse column form: the positions of the recipes using each word or
+    name of the vocabulary are stored in ascending order, column after column, in one int32
+    array. A query is scored for the whole catalog at once by adding up the rows of its
+    ingredients and dividing by the number of ingredients of every recipe, then ranked with
+    argpartition. Rankings are the parsers' own: by proportion of matched ingredients, then
+    by number of them when count_breaks_ties, then by position in the catalog.
+    """
+
+    max_cached_rows = 1024
+    # Counts computed at once by score_batch, as queries × recipes
+    batch_cells = 1 << 24
+
+    def __init__(self, postings, total_ingredients, count_breaks_ties=False):
+        self.vocabulary = list(postings)
+        self.columns = {term: column for column, term in enumerate(self.vocabulary)}
+        lengths = np.fromiter((len(postings[term]) for term in self.vocabulary), dtype=np.int64, count=len(postings))
+        self.indptr = np.zeros(len(postings) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.indptr[1:])
+        self.indices = np.fromiter(
+            itertools.chain.from_iterable(postings[term] for term in self.vocabulary),
+            dtype=np.int32,
+            count=int(self.indptr[-1]),
+        )
+        self.total_ingredients = np.asarray(total_ingredients, dtype=np.float64)
+        self.count_breaks_ties = count_breaks_ties
+        self._rows_cache = {}
+
+    def __len__(self):
+        return len(self.total_ingredients)
+
+    def column(self, term):
+        """Positions, in ascending order, of the recipes using a term of the vocabulary."""
+        column = self.columns.get(term)
+        if column is None:
+            return self.indices[:0]
+        return self.indices[self.indptr[column]:self.indptr[column + 1]]
+
+    def rows(self, terms):
+        """Positions, in ascending order, of the recipes using any of the terms."""
+        columns = [self.column(term) for term in terms if term in self.columns]
+        if not columns:
+            return self.indices[:0]
+        if len(columns) == 1:
+            return columns[0]
+        return np.unique(np.concatenate(columns))
+
+    def matching_terms(self, pattern):
+        """Terms of the vocabulary searched successfully by a regular expression."""
+        return [term for term in self.vocabulary if pattern.search(term)]
+
+    def cached_rows(self, key, compute=None):
+        """Returns the rows of key, calling compute() on the first request, None if no compute is given."""
+        rows = self._rows_cache.get(key)
+        if rows is None and compute is not None:
+            rows = compute()
+            if len(self._rows_cache) >= self.max_cached_rows:
+                self._rows_cache.clear()
+            self._rows_cache[key] = rows
+        return rows
+
+    @staticmethod
+    def as_rows(recipe_ids):
+        return np.array(sorted(recipe_ids), dtype=np.int32)
+
+    def score(self, term_rows):
+        """Positions of the recipes matching any of the terms, given their rows, and their numbers of matches."""
+        if not term_rows:
+            return self.indices[:0], self.indices[:0]
+        counts = np.bincount(np.concatenate(term_rows), minlength=len(self))
+        recipe_ids = np.flatnonzero(counts)
+        return recipe_ids, counts[recipe_ids]
+
+    def score_batch(self, queries_term_rows):
+        """
+        Same as score for many queries, as the product of the queries × terms and terms × recipes matrices.
+
+        Queries are scored a chunk at a time, with one bincount over the rows of the chunk
+        shifted by the position of their query times the number of recipes.
+        """
+        recipe_count = max(len(self), 1)
+        chunk_size = max(1, self.batch_cells // recipe_count)
+        scored = []
+        for start in range(0, len(queries_term_rows), chunk_size):
+            chunk = queries_term_rows[start:start + chunk_size]
+            shifted = [
+                rows + query * recipe_count
+                for query, term_rows in enumerate(chunk)
+                for rows in term_rows
+            ]
+            if not shifted:
+                scored.extend((self.indices[:0], self.indices[:0]) for _ in chunk)
+                continue
+            counts = np.bincount(
+                np.concatenate(shifted), minlength=len(chunk) * recipe_count
+            ).reshape(len(chunk), recipe_count)
+            for query_counts in counts:
+                recipe_ids = np.flatnonzero(query_counts)
+                scored.append((recipe_ids, query_counts[recipe_ids]))
+        return scored
+
+    def rank(self, recipe_ids, counts, limit=None, offset=0):
+        """Returns the positions of the scored recipes ranked [offset:offset + limit]."""
+        end = len(recipe_ids) if limit is None else min(offset + max(limit, 0), len(recipe_ids))
+        if offset >= end:
+            return []
+        totals = self.total_ingredients[recipe_ids]
+        proportions = np.divide(counts, totals, out=np.zeros(len(recipe_ids)), where=totals > 0)
+        if end < len(recipe_ids):
+            # Only the recipes at least as good as the end-th best proportion can make the page,
+            # all of those tied with it are kept for the other keys to order
+            threshold = proportions[np.argpartition(-proportions, end - 1)[end - 1]]
+            selected = np.flatnonzero(proportions >= threshold)
+            recipe_ids, counts, proportions = recipe_ids[selected], counts[selected], proportions[selected]
+        if self.count_breaks_ties:
+            order = np.lexsort((recipe_ids, -counts, -proportions))
+        else:
+            order = np.lexsort((recipe_ids, -proportions))
+        return recipe_ids[order[offset:end]].tolist()
+
+
+class MatchedTerms:
+    """Maps the position of a scored recipe to the terms of the query it matched, looked up on demand."""
+
+    def __init__(self, query, term_rows):
+        self.query = query
+        self.term_rows = term_rows
+        self._matched = {}
+
+    def __getitem__(self, recipe_id):
+        matched_terms = self._matched.get(recipe_id)
+        if matched_terms is None:
+            matched_terms = self.look_up([recipe_id])[recipe_id]
+        return matched_terms
+
+    def look_up(self, recipe_ids):
+        """Returns the matched terms of many recipes, with one binary search of the rows of each term for all of them."""
+        matched = {recipe_id: [] for recipe_id in recipe_ids}
+        if matched:
+            recipe_ids = np.fromiter(matched, dtype=np.int64, count=len(matched))
+            for term, rows in zip(self.query, self.term_rows):
+                positions = rows.searchsorted(recipe_ids)
+                found = positions < len(rows)
+                found[found] = rows[positions[found]] == recipe_ids[found]
+                for recipe_id in recipe_ids[found].tolist():
+                    matched[recipe_id].append(term)
+            self._matched.update(matched)
+        return matched
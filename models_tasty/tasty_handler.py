@@ -1,6 +1,26 @@
 import os
 import json
+from collections.abc import Mapping
 from users.user_data import User
+from users.saved_recipes import TASTY_SOURCE, SavedRecipeStore
+from models_common.catalog import catalog_registry
+from models_common.name_index import TrigramNameIndex
+from models_common.snapshot import CatalogSnapshot, describe_sources
+from models_common.sqlite_store import (
+    StoredRecipeList,
+    StoredRecipeMapping,
+    catalog_source,
+    default_storage,
+    open_catalog_store,
+)
+from models_common.streaming_loader import (
+    FileRecordMapping,
+    NamedRecordList,
+    StreamingCatalogLoader,
+    iter_json_records,
+)
+from models_common.substitutions import load_substitutions_catalog
+from models_tasty.tasty_index import TastyIngredientIndex
 
 
 class TastyHandler:
@@ -9,21 +29,186 @@ class TastyHandler:
         tasty_file_path,
         videos_file_path,
         subs_file_path,
+        storage=None,
     ):
+        # "json" holds the recipes in memory, "sqlite" reads them from the catalog store when needed,
+        # "stream" loads tasty.json in the background and reads a recipe from the file when needed
+        self.storage = storage or default_storage()
         self.display_callback = None
         self.details_callback = None
         self.all_recipes = []
         self.users_dir = "users"
-        base_dir = "res"
+        # File names are looked up in the res folder, absolute paths are used as they are
         base_dir = os.path.dirname(os.path.realpath(__file__))
-        self.tasty_file_path = os.path.join(base_dir, "..", "res", "tasty.json")
-        self.videos_file_path = os.path.join(base_dir, "..", "res", "url.json")
-        self.subs_file_path = os.path.join(base_dir, "..", "res", "subs.json")
-
-        self.recipe_db = self.load_json(self.tasty_file_path)
-        self.video_db = self.load_video_json(self.videos_file_path)
-        self.substitutions_db = self.load_substitutions(self.subs_file_path)
+        self.tasty_file_path = os.path.join(base_dir, "..", "res", tasty_file_path)
+        self.store_source = catalog_source("tasty", self.tasty_file_path)
+        self.videos_file_path = os.path.join(base_dir, "..", "res", videos_file_path)
+        self.subs_file_path = os.path.join(base_dir, "..", "res", subs_file_path)
+        self._load_catalog()
         self.user = User()
+        self.saved_recipes = SavedRecipeStore(self.users_dir)
+
+    def _load_catalog(self):
+        # Catalog data is shared process-wide through the registry, so it is only loaded once,
+        # from the snapshots of the JSON files when they are up to date
+        self.catalog_version = self._catalog_signature()
+        if self.storage == "sqlite":
+            catalog = catalog_registry.get(
+                "tasty_sqlite_catalog", self.tasty_file_path, self._open_tasty_store
+            )
+        elif self.storage == "stream":
+            catalog = catalog_registry.get(
+                "tasty_stream_catalog", self.tasty_file_path, self._stream_tasty_catalog
+            )
+        else:
+            catalog = catalog_registry.get(
+                "tasty_catalog",
+                self.tasty_file_path,
+                lambda: self._tasty_snapshot().load_or_build(self._build_tasty_catalog),
+            )
+        self.recipe_db = catalog["recipes"]
+        self.ingredient_index = catalog["ingredient_index"]
+        self.store = catalog.get("store")
+        self.loader = catalog.get("loader")
+        self.video_db = catalog_registry.get(
+            "tasty_videos",
+            self.videos_file_path,
+            lambda: self._videos_snapshot().load_or_build(
+                lambda: self.load_video_json(self.videos_file_path)
+            ),
+        )
+        substitutions = catalog_registry.get(
+            "substitutions_catalog",
+            self.subs_file_path,
+            lambda: load_substitutions_catalog(self.subs_file_path, self.load_substitutions),
+        )
+        self.substitutions_db = substitutions["substitutions"]
+        self.substitution_matcher = substitutions["matcher"]
+
+    def build_snapshots(self):
+        """Compiles tasty.json, url.json and subs.json into fresh snapshots, used by the next start."""
+        if self.store is not None:
+            # The recipes were imported into the store when the handler was created
+            self._tasty_index_snapshot().build(lambda: TastyIngredientIndex(self.recipe_db))
+        else:
+            self._tasty_snapshot().build(self._build_tasty_catalog)
+        self._videos_snapshot().build(lambda: self.load_video_json(self.videos_file_path))
+        load_substitutions_catalog(self.subs_file_path, self.load_substitutions, rebuild=True)
+
+    def shard_snapshot(self, start, end):
+        """Snapshot of the index of the recipes [start:end] of tasty.json, see ShardedSearch."""
+        return CatalogSnapshot(f"tasty_shard_{start}_{end}", [self.tasty_file_path])
+
+    def catalog_arguments(self):
+        """Arguments of a TastyHandler reading the same files as this one, e.g. in a worker process."""
+        return (self.tasty_file_path, self.videos_file_path, self.subs_file_path, self.storage)
+
+    def build_shard(self, start, end):
+        # Searches only read the index, the recipes stay with the handler. Copied by position,
+        # duplicated names of a streamed or stored catalog keep a row each
+        index = self.ingredient_index
+        shard_index = TastyIngredientIndex()
+        for position in range(start, end):
+            shard_index.add_ingredient_names(index.recipe_names[position], index.ingredient_names[position])
+        return {"ingredient_index": shard_index}
+
+    def _tasty_snapshot(self):
+        return CatalogSnapshot("tasty", [self.tasty_file_path])
+
+    def _tasty_index_snapshot(self):
+        return CatalogSnapshot("tasty_index", [self.tasty_file_path])
+
+    def _videos_snapshot(self):
+        return CatalogSnapshot("tasty_videos", [self.videos_file_path])
+
+    def _build_tasty_catalog(self):
+        recipes = self.load_json(self.tasty_file_path)
+        return {"recipes": recipes, "ingredient_index": TastyIngredientIndex(recipes)}
+
+    def _open_tasty_store(self):
+        store = open_catalog_store()
+        if not store.is_current(self.store_source, [self.tasty_file_path]):
+            description = describe_sources([self.tasty_file_path])
+            try:
+                # Streamed, the JSON file is never held in memory as a whole
+                store.import_recipes(
+                    self.store_source,
+                    description,
+                    (
+                        (name, recipe)
+                        for name, recipe, _, _ in self._iter_tasty_records(self.tasty_file_path)
+                    ),
+                )
+            except (OSError, ValueError) as e:
+                print(f"Error importing {self.tasty_file_path}: {e}")
+        recipes = StoredRecipeMapping(store, self.store_source)
+        # Only the index, which holds the names used by the search, stays in memory
+        ingredient_index = self._tasty_index_snapshot().load_or_build(
+            lambda: TastyIngredientIndex(recipes)
+        )
+        return {"recipes": recipes, "ingredient_index": ingredient_index, "store": store}
+
+    def _stream_tasty_catalog(self):
+        recipes = FileRecordMapping(self.tasty_file_path)
+        ingredient_index = TastyIngredientIndex()
+
+        def add_recipe(name, recipe, offset, length):
+            # Only its position in the file is kept, the index holds the names and ingredients
+            recipes.add(name, offset, length)
+            ingredient_index.add(name, recipe)
+
+        loader = StreamingCatalogLoader(
+            self.tasty_file_path, add_recipe, read_records=self._iter_tasty_records
+        ).start()
+        return {"recipes": recipes, "ingredient_index": ingredient_index, "loader": loader}
+
+    def _iter_tasty_records(self, file_name):
+        """
+        Yields (name, recipe, offset, length) for the recipes of tasty.json, read one at a time.
+
+        tasty.json maps names to recipes, in JSON Lines every recipe carries its "name" instead.
+        """
+        for key, recipe, offset, length in iter_json_records(file_name):
+            name = key if key is not None else recipe.get("name")
+            if name is not None:
+                yield name, recipe, offset, length
+
+    def recipe_names(self):
+        """Names of the recipes, in catalog order."""
+        return self.ingredient_index.recipe_names
+
+    def search_recipe_names(self, query):
+        """Positions, in catalog order, of the recipes whose name contains the query, ignoring case."""
+        query = query.lower()
+        if self.store is not None:
+            return self.store.search_names(self.store_source, query)
+        name_index = catalog_registry.get("tasty_name_index", self.tasty_file_path, TrigramNameIndex)
+        # Catches up with the recipes loaded since the last search, when streaming
+        name_index.update(self.recipe_names())
+        return name_index.search(query)
+
+    def refresh_catalog(self):
+        """
+        Reloads the catalog if tasty.json, url.json or subs.json changed on disk.
+
+        Returns the catalog version, which changes every time the catalog is reloaded.
+        """
+        if self._catalog_signature() != self.catalog_version:
+            if self.loader is not None:
+                self.loader.cancel()
+            for file_path in self._catalog_files():
+                catalog_registry.refresh(file_path)
+            self._load_catalog()
+        if self.loader is not None and self.loader.loading:
+            # Searches see more recipes as the catalog loads, their results are not final yet
+            return (self.catalog_version, self.loader.count)
+        return self.catalog_version
+
+    def _catalog_files(self):
+        return (self.tasty_file_path, self.videos_file_path, self.subs_file_path)
+
+    def _catalog_signature(self):
+        return tuple(catalog_registry.file_signature(file_path) for file_path in self._catalog_files())
 
     def load_json(self, filename):
         try:
@@ -44,7 +229,7 @@ class TastyHandler:
         data = self.load_json(filename)
         return {item["Item"].lower(): item["Substitutions"] for item in data}
 
-    def save_recipe_to_file_tasty(self, recipe_name, file_name="saved_recipes.json"):
+    def save_recipe_to_file_tasty(self, recipe_name):
         username = self.user.get_current_user()
         if not username:
             return "No user is currently logged in."
@@ -53,11 +238,22 @@ class TastyHandler:
         if not recipe:
             return f"Recipe '{recipe_name}' not found."
 
+        # Only a reference is saved, the recipe is read from the catalog when displayed
+        self.saved_recipes.save(username, TASTY_SOURCE, recipe_name)
+        return f"Recipe '{recipe_name}' has been saved successfully under user '{username}'."
+
+    def saved_recipe_details(self, username):
+        """Details of the Tasty recipes saved by a user, as construct_recipe_details builds them."""
+        saved_recipes = self.saved_recipes.recipes(username, TASTY_SOURCE)
+        return [self._saved_recipe_details(saved_recipe["name"]) for saved_recipe in saved_recipes]
+
+    def _saved_recipe_details(self, recipe_name):
+        recipe = self.recipe_db.get(recipe_name)
+        if recipe is None:
+            # No longer in the catalog
+            return {"name": recipe_name, "source": TASTY_SOURCE}
         video_url = self.resolve_video_url(recipe_name)
-        recipe_details = self.construct_recipe_details(recipe, recipe_name, video_url)
-        return self.save_recipe_details(
-            username, recipe_details, file_name, recipe_name
-        )
+        return self.construct_recipe_details(recipe, recipe_name, video_url)
 
     def resolve_video_url(self, recipe_name):
         video_url = self.video_db.get(recipe_name)
@@ -87,99 +283,52 @@ class TastyHandler:
             "url": video_url,
             "ingredients": ingredients,
             "instructions": instructions,
-            "source": "Tasty",
+            "source": TASTY_SOURCE,
         }
 
-    def save_recipe_details(self, username, recipe_details, file_name, recipe_name):
-        file_path = os.path.join(self.users_dir, file_name)
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        try:
-            with open(file_path, "r+", encoding="utf-8") as file:
-                all_user_recipes = self.load_json_data(file_name)
-                if username not in all_user_recipes:
-                    all_user_recipes[username] = []
-                all_user_recipes[username].append(recipe_details)
-                self.update_recipe_file(file_name, all_user_recipes)
-        except FileNotFoundError:
-            with open(file_path, "w", encoding="utf-8") as file:
-                json.dump({username: [recipe_details]}, file, indent=4, ensure_ascii=False)
-        return f"Recipe '{recipe_name}' has been saved successfully under user '{username}'."
-
-    def update_recipe_file(self, file_name, all_user_recipes):
-        file_path = os.path.join(self.users_dir, file_name)
-        try:
-            with open(file_path, "r+", encoding="utf-8") as file:
-                file.seek(0)
-                file.truncate()
-                json.dump(all_user_recipes, file, indent=4, ensure_ascii=False)
-        except FileNotFoundError:
-            with open(file_path, "w", encoding="utf-8") as file:
-                json.dump(all_user_recipes, file, indent=4, ensure_ascii=False)
-
-    def load_json_data(self, file_name):
-        """
-        Attempts to load and return JSON data from a specified file.
-        Returns an empty dictionary if the file cannot be read or found.
-        """
-        file_path = os.path.join(self.users_dir, file_name)
-        try:
-            with open(file_path, "r", encoding="utf-8") as file:
-                return json.load(file)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
-        
     def normalize_name(self, name):
         return name.strip().lower()
 
     def load_tasty_recipes(self):
         """
         This method is used in the all_ui.py file specifically, for loading recipe details in a different GUI format.
+        The list is built once from the shared recipe_db and reused on every call.
         """
+        if self.store is not None:
+            return catalog_registry.get(
+                "tasty_sqlite_recipe_list",
+                self.tasty_file_path,
+                lambda: StoredRecipeList(self.store, self.store_source, with_name=True),
+            )
+        return catalog_registry.get(
+            "tasty_recipe_list", self.tasty_file_path, self._build_tasty_recipe_list
+        )
+
+    def _build_tasty_recipe_list(self):
         try:
-            with open(self.tasty_file_path, "r", encoding="utf-8") as file:
-                data = json.load(file)
-                if isinstance(data, dict):
-                    # Unpack each dictionary into the list with the recipe name and recipe details as other key value pairs
-                    return [{"name": name, **details} for name, details in data.items()]
-                else:
-                    raise ValueError(
-                        "Tasty recipes data is not in the expected dictionary format."
-                    )
-        except (FileNotFoundError, json.JSONDecodeError, ValueError) as e:
+            if isinstance(self.recipe_db, FileRecordMapping):
+                # Read from tasty.json by position, the list grows with the catalog while it loads
+                return NamedRecordList(self.recipe_db)
+            if isinstance(self.recipe_db, Mapping):
+                # Unpack each dictionary into the list with the recipe name and recipe details as other key value pairs
+                return [{"name": name, **details} for name, details in self.recipe_db.items()]
+            else:
+                raise ValueError(
+                    "Tasty recipes data is not in the expected dictionary format."
+                )
+        except ValueError as e:
             print(f"Error loading or processing {self.tasty_file_path}: {e}")
             return []
 
 
-    def delete_recipe_by_name_tasty(self, recipe_name, file_name="saved_recipes.json"):
+    def delete_recipe_by_name_tasty(self, recipe_name):
         username = self.user.get_current_user()
         if not username:
             return "No user is currently logged in."
 
-        all_user_recipes = self.load_json_data(file_name)
-        if not all_user_recipes or username not in all_user_recipes:
-            return "Error reading saved recipes file or user not found."
-
-        user_recipes = all_user_recipes.get(username, [])
-        if recipe_name not in [recipe["name"] for recipe in user_recipes]:
+        if not self.saved_recipes.delete(username, TASTY_SOURCE, recipe_name):
             return f"Tasty recipe '{recipe_name}' not found under user '{username}'."
-
-        updated_recipes = [recipe for recipe in user_recipes if recipe["name"] != recipe_name]
-        all_user_recipes[username] = updated_recipes
-
-        save_status = self.save_updated_recipes(file_name, all_user_recipes)
-        return save_status if save_status != "Recipes updated successfully." else f"Tasty recipe '{recipe_name}' has been deleted successfully for username {username}."
-
-    def save_updated_recipes(self, file_name, all_user_recipes):
-        file_path = os.path.join(self.users_dir, file_name)
-        try:
-            with open(file_path, "r+", encoding="utf-8") as file:
-                file.seek(0)
-                file.truncate()
-                json.dump(all_user_recipes, file, indent=4, ensure_ascii=False)
-        except FileNotFoundError:
-            return "Error saving recipes file."
-
-        return f"Recipes updated successfully."
+        return f"Tasty recipe '{recipe_name}' has been deleted successfully for username {username}."
 
     def set_display_callback(self, callback):
         self.display_callback = callback
@@ -0,0 +1,91 @@
+from collections.abc import Mapping
+
+
+def extract_ingredient_names(recipe_data):
+    return [
+        ingredient_data["name"].lower()
+        for section in recipe_data.get("ingredient_sections", [])
+        for ingredient_data in section.get("ingredients", [])
+        if ingredient_data.get("name")
+    ]
+
+
+class TastyIngredientIndex:
+    """
+    Ingredient names of the Tasty catalog, normalized once at load time.
+
+    Recipes are referred to by their position in recipe_db. Every distinct ingredient name
+    maps to the recipes using it, so a user ingredient is matched against the vocabulary of
+    names once instead of against the ingredient list of every recipe.
+    """
+
+    max_cached_patterns = 1024
+
+    def __init__(self, recipe_db=None):
+        self.recipe_names = []
+        self.ingredient_names = []
+        self.postings = {}
+        # Counts the recipes added, a catalog loaded in the background grows while it is searched
+        self.additions = 0
+        self._pattern_cache = {}
+        if isinstance(recipe_db, Mapping):
+            for recipe_name, recipe_data in recipe_db.items():
+                self.add(recipe_name, recipe_data)
+
+    def add(self, recipe_name, recipe_data):
+        """Indexes the next recipe of the catalog and returns its position."""
+        return self.add_ingredient_names(recipe_name, extract_ingredient_names(recipe_data))
+
+    def add_ingredient_names(self, recipe_name, ingredient_names):
+        """Same as add, for a recipe whose ingredient names were already extracted."""
+        recipe_id = len(self.recipe_names)
+        self.recipe_names.append(recipe_name)
+        self.ingredient_names.append(ingredient_names)
+        for ingredient_name in dict.fromkeys(ingredient_names):
+            self.postings.setdefault(ingredient_name, []).append(recipe_id)
+        self.additions += 1
+        self._pattern_cache.clear()
+        return recipe_id
+
+    def find_recipes(self, ingredient_pattern):
+        """Returns the positions of the recipes with an ingredient name matched by the pattern."""
+        key = (ingredient_pattern.pattern, ingredient_pattern.flags)
+        recipe_ids = self._pattern_cache.get(key)
+        if recipe_ids is None:
+            additions = self.additions
+            recipe_ids = frozenset(
+                recipe_id
+                for ingredient_name, name_recipe_ids in list(self.postings.items())
+                if ingredient_pattern.search(ingredient_name)
+                for recipe_id in name_recipe_ids
+            )
+            self._cache_recipes(key, recipe_ids, additions)
+        return recipe_ids
+
+    def find_recipes_batch(self, ingredient_patterns):
+        """
+        Same as find_recipes for every pattern.
+
+        The ingredient names are traversed once for all the patterns that are not cached.
+        """
+        keys = [(pattern.pattern, pattern.flags) for pattern in ingredient_patterns]
+        found = {key: self._pattern_cache.get(key) for key in keys}
+        missing = {key: pattern for key, pattern in zip(keys, ingredient_patterns) if found[key] is None}
+        if missing:
+            additions = self.additions
+            matched = {key: set() for key in missing}
+            for ingredient_name, name_recipe_ids in list(self.postings.items()):
+                for key, ingredient_pattern in missing.items():
+                    if ingredient_pattern.search(ingredient_name):
+                        matched[key].update(name_recipe_ids)
+            for key, recipe_ids in matched.items():
+                found[key] = frozenset(recipe_ids)
+                self._cache_recipes(key, found[key], additions)
+        return [found[key] for key in keys]
+
+    def _cache_recipes(self, key, recipe_ids, additions):
+        # Not cached if recipes were added while the names were searched
+        if additions == self.additions:
+            if len(self._pattern_cache) >= self.max_cached_patterns:
+                self._pattern_cache.clear()
+            self._pattern_cache[key] = recipe_ids
@@ -1,13 +1,38 @@
-import json
 import re
-import os
 from models_tasty.tasty_handler import TastyHandler
+from models_tasty.tasty_index import extract_ingredient_names
+from models_common.substitutions import LazySubstitutions
+from models_common.ranking import rank_page
+from models_common.incremental_search import IncrementalSearch
+from models_common.batch_search import rank_batch
+from models_common.sharded_search import ShardedSearch
+from models_common.vector_scoring import (
+    IncidenceMatrix,
+    default_engine,
+    numpy_available,
+    shared_matrix,
+    vector_ranking,
+)
+from models_common.query_cache import (
+    CachedRanking,
+    matched_in_query_order,
+    normalize_query,
+    query_cache,
+)
 
 
 class TastyParser:
-    def __init__(self):
-        self.handler = TastyHandler("tasty.json", "url.json", "subs.json")
+    source_name = "tasty"
+
+    def __init__(self, handler=None):
+        self.handler = handler or TastyHandler("tasty.json", "url.json", "subs.json")
         self.users_dir = "users"
+        self.query_cache = query_cache
+        # "numpy" ranks on the IncidenceMatrix of the catalog, "python" on dicts of matches
+        self.engine = default_engine()
+        # Ranks the searches in worker processes once start_shards was called
+        self.shards = None
+        self._recipe_positions = None
 
     def parse_ingredients(self, food_input, spice_input):
         if ',' not in (food_input + spice_input) and '.' not in (food_input + spice_input):
@@ -21,30 +46,194 @@ class TastyParser:
                 ]
         return []
 
-    def find_matching_recipes(self, user_ingredients):
-        matches = self.get_matches(user_ingredients)
+    def find_matching_recipes(self, user_ingredients, limit=None, offset=0):
+        matches = self.get_matches(user_ingredients, limit, offset)
         return [self.prepare_match_for_display(m) for m in matches] if matches else []
 
-    def get_matches(self, user_ingredients):
-        # Calls evaluate_match for each recipe
-        matches = [
-            self.evaluate_match(rn, rd, user_ingredients)
-            for rn, rd in self.handler.recipe_db.items()
-            if self.evaluate_match(rn, rd, user_ingredients)
-            is not None
+    def get_matches(self, user_ingredients, limit=None, offset=0):
+        """
+        Returns the tuples of the recipes ranked [offset:offset + limit] by proportion of matched ingredients.
+
+        Only recipes sharing an ingredient with the user are scored, each of them once,
+        and tuples are only built for the requested page. The ranking is kept in the query
+        cache for the next search of the same ingredients.
+        """
+        ranking = self.cached_ranking(user_ingredients)
+        return [
+            self.build_match(
+                recipe_id,
+                matched_in_query_order(ranking.matched_by_recipe[recipe_id], user_ingredients),
+                user_ingredients,
+            )
+            for recipe_id in ranking.page(limit, offset)
+        ]
+
+    def find_matching_recipes_batch(self, ingredient_lists, limit=None, offset=0):
+        """Display tuples of many ingredient lists, as find_matching_recipes returns for each."""
+        return [
+            [self.prepare_match_for_display(match) for match in matches]
+            for matches in self.get_matches_batch(ingredient_lists, limit, offset)
+        ]
+
+    def get_matches_batch(self, ingredient_lists, limit=None, offset=0):
+        """
+        Returns the tuples of many ingredient lists, as get_matches does for each.
+
+        Meant for bulk scoring: the ingredients shared by the lists are matched once for the
+        whole batch, in a single pass over the ingredient names of the catalog.
+        """
+        ingredient_lists = list(ingredient_lists)
+        return [
+            [
+                self.build_match(
+                    recipe_id,
+                    matched_in_query_order(matched_by_recipe[recipe_id], user_ingredients),
+                    user_ingredients,
+                )
+                for recipe_id in recipe_ids
+            ]
+            for user_ingredients, (recipe_ids, matched_by_recipe) in zip(
+                ingredient_lists, rank_batch(self, ingredient_lists, limit, offset)
+            )
+        ]
+
+    def cached_ranking(self, user_ingredients):
+        """Returns the ranking of the ingredients, computed on the first search of the same set of ingredients."""
+        query = normalize_query(user_ingredients)
+        return self.query_cache.get(
+            self.source_name,
+            self.refresh_catalog(),
+            query,
+            lambda: self._rank_query(query),
+        )
+
+    def _rank_query(self, query):
+        if self.shards is not None:
+            return self.shards.ranking(query)
+        matrix = self.incidence_matrix()
+        if matrix is None:
+            return CachedRanking(self.match_ingredients(query), self.rank_matches)
+        return vector_ranking(matrix, query, self.term_rows(matrix, query))
+
+    def incidence_matrix(self):
+        """The IncidenceMatrix of the catalog with the numpy engine, None with the Python one or while the catalog loads."""
+        loader = self.handler.loader
+        if self.engine != "numpy" or not numpy_available() or (loader is not None and loader.loading):
+            return None
+        index = self.handler.ingredient_index
+        return shared_matrix(
+            index,
+            index.additions,
+            lambda: IncidenceMatrix(
+                index.postings, [len(ingredient_names) for ingredient_names in index.ingredient_names]
+            ),
+        )
+
+    def term_rows(self, matrix, terms):
+        """Maps every term to the rows of the matrix of the recipes with an ingredient name matching it."""
+        return {
+            term: matrix.cached_rows(
+                term, lambda: matrix.rows(matrix.matching_terms(self.get_ingredient_pattern(term)))
+            )
+            for term in terms
+        }
+
+    def start_shards(self, shard_count):
+        """Ranks the following searches in shard_count worker processes, see ShardedSearch."""
+        self.stop_shards()
+        self.shards = ShardedSearch(self, shard_count).start()
+
+    def stop_shards(self):
+        if self.shards is not None:
+            self.shards.close()
+            self.shards = None
+
+    def refresh_catalog(self):
+        """Reloads the catalog if its files changed and returns its version."""
+        return self.handler.refresh_catalog()
+
+    def start_incremental_search(self):
+        """Returns a search session that refines its previous results as ingredients are added or removed."""
+        return IncrementalSearch(self)
+
+    def rank_matches(self, matched_by_recipe, limit=None, offset=0):
+        """Returns the positions of the recipes ranked [offset:offset + limit]."""
+        return self.rank_match_counts(
+            {recipe_id: len(matched) for recipe_id, matched in matched_by_recipe.items()}, limit, offset
+        )
+
+    def rank_match_counts(self, match_counts, limit=None, offset=0):
+        """Same as rank_matches, given the number of ingredients matched by each recipe."""
+        return rank_page(match_counts, key=self.ranking_key(match_counts), limit=limit, offset=offset)
+
+    def ranking_key(self, match_counts):
+        """Sort key of the recipes of match_counts, a tuple ending with the position of the recipe."""
+        ingredient_names = self.handler.ingredient_index.ingredient_names
+        # Ties keep the catalog order
+        return lambda recipe_id: (
+            -match_counts[recipe_id] / len(ingredient_names[recipe_id]),
+            recipe_id,
+        )
+
+    def build_matches(self, recipe_ids, matched_by_recipe, user_ingredients):
+        """Returns the display tuples of the given recipes, as find_matching_recipes does."""
+        return [
+            self.prepare_match_for_display(
+                self.build_match(recipe_id, matched_by_recipe[recipe_id], user_ingredients)
+            )
+            for recipe_id in recipe_ids
         ]
-        # Returns a sorted list of tuples
-        return sorted(matches, key=lambda x: x[1], reverse=True)
-    
+
+    def match_ingredients(self, user_ingredients):
+        """
+        Maps the position of every recipe sharing an ingredient with the user
+        to the matched user ingredients, in the order they were entered.
+        """
+        matched_by_recipe = {}
+        for user_ingredient in dict.fromkeys(user_ingredients):
+            for recipe_id in self.match_ingredient(user_ingredient):
+                matched_by_recipe.setdefault(recipe_id, []).append(user_ingredient)
+        return matched_by_recipe
+
+    def match_ingredient(self, user_ingredient):
+        """Returns the positions of the recipes with an ingredient name matching the user ingredient."""
+        ingredient_pattern = self.get_ingredient_pattern(user_ingredient)
+        return self.handler.ingredient_index.find_recipes(ingredient_pattern)
+
+    def match_terms(self, terms):
+        """Maps every term to the positions of the recipes with an ingredient name matching it."""
+        patterns = [self.get_ingredient_pattern(term) for term in terms]
+        return dict(zip(terms, self.handler.ingredient_index.find_recipes_batch(patterns)))
+
+    def build_match(self, recipe_id, matched_ingredients, user_ingredients):
+        index = self.handler.ingredient_index
+        ingredient_names = index.ingredient_names[recipe_id]
+        total_ingredients = len(ingredient_names)
+        # Worked out only when the details view displays this recipe
+        substitutions = LazySubstitutions(
+            self.find_substitutions_for_names,
+            matched_ingredients,
+            ingredient_names,
+            user_ingredients,
+        )
+        return (
+            index.recipe_names[recipe_id],
+            len(matched_ingredients) / total_ingredients,
+            matched_ingredients,
+            substitutions,
+            total_ingredients,
+        )
+
     def evaluate_match(self, recipe_name, recipe_data, user_ingredients):
-        score, matches_count, matched_ingredients = self.calculate_score(
-            recipe_data, user_ingredients
+        ingredient_names = self.extract_ingredient_names(recipe_data)
+        score, matches_count, matched_ingredients = self.score_ingredient_names(
+            ingredient_names, user_ingredients
         )
-        total_ingredients = len(self.extract_ingredient_names(recipe_data))
+        total_ingredients = len(ingredient_names)
 
         if matches_count > 0:
-            substitutions = self.find_substitutions(
-                matched_ingredients, recipe_data, user_ingredients
+            substitutions = self.find_substitutions_for_names(
+                matched_ingredients, ingredient_names, user_ingredients
             )
             return (
                 recipe_name,
@@ -55,24 +244,23 @@ class TastyParser:
             )
 
     def extract_ingredient_names(self, recipe_data):
-        return [
-            ingredient_data["name"].lower()
-            for section in recipe_data.get("ingredient_sections", [])
-            for ingredient_data in section.get("ingredients", [])
-            if ingredient_data.get("name")
-        ]
+        return extract_ingredient_names(recipe_data)
 
     def calculate_score(self, recipe_data, user_ingredients):
+        return self.score_ingredient_names(
+            self.extract_ingredient_names(recipe_data), user_ingredients
+        )
+
+    def score_ingredient_names(self, ingredient_names, user_ingredients):
         score = 0
-        matched_ingredients = set()
+        matched_ingredients = []
         for user_ingredient in user_ingredients:
             ingredient_pattern = self.get_ingredient_pattern(user_ingredient)
-            for ingredient_name in self.extract_ingredient_names(recipe_data):
-                if ingredient_pattern.search(ingredient_name):
-                    matched_ingredients.add(user_ingredient)
-                    score += 1
-                    break
-        return score, len(matched_ingredients), list(matched_ingredients)
+            if any(ingredient_pattern.search(name) for name in ingredient_names):
+                if user_ingredient not in matched_ingredients:
+                    matched_ingredients.append(user_ingredient)
+                score += 1
+        return score, len(matched_ingredients), matched_ingredients
 
     def get_ingredient_pattern(self, user_ingredient):
         # Checks if a match starts at a word boundary or after a non-digit character
@@ -89,11 +277,18 @@ class TastyParser:
         return {
             ing: self.find_ingredient_substitution(ing) for ing in relevant_ingredients
         }
+
+    def find_substitutions_for_names(self, matched_ingredients, ingredient_names, user_ingredients):
+        # Same as find_substitutions, for ingredient names that are already extracted
+        relevant_ingredients = self.filter_relevant_ingredients(
+            ingredient_names, matched_ingredients, user_ingredients
+        )
+        return {
+            ing: self.find_ingredient_substitution(ing) for ing in relevant_ingredients
+        }
         
     def find_ingredient_substitution(self, ingredient):
-        for sub, sub_list in self.handler.substitutions_db.items():
-            if sub in ingredient or ingredient in sub:
-                return sub_list
+        return self.handler.substitution_matcher.lookup(ingredient)
             
     def get_relevant_ingredients(
         self, recipe_data, matched_ingredients, user_ingredients
@@ -106,6 +301,13 @@ class TastyParser:
             set: A set of ingredient names from the recipe that require substitutions.
         """
         recipe_ingredient_names = self.extract_ingredient_names(recipe_data)
+        return self.filter_relevant_ingredients(
+            recipe_ingredient_names, matched_ingredients, user_ingredients
+        )
+
+    def filter_relevant_ingredients(
+        self, recipe_ingredient_names, matched_ingredients, user_ingredients
+    ):
         user_ingredients_lower = {ing.lower() for ing in user_ingredients}
         matched_ingredients_lower = {ing.lower() for ing in matched_ingredients}
         return {
@@ -131,17 +333,26 @@ class TastyParser:
 
 
     def search_recipe_by_name_tasty(self, recipe_name):
-        normalized_recipe_name = self.handler.normalize_name(recipe_name)
-
-        for current_recipe_name, recipe_data in self.handler.recipe_db.items():
-            normalized_current_name = self.handler.normalize_name(current_recipe_name)
-            if normalized_current_name == normalized_recipe_name:
-                return {
-                    "name": current_recipe_name,
-                    "data": self.get_recipe_content(recipe_data),
-                }
+        position = self._find_recipe_position(recipe_name)
+        if position is not None:
+            current_recipe_name = self.handler.ingredient_index.recipe_names[position]
+            return {
+                "name": current_recipe_name,
+                "data": self.get_recipe_content(self.handler.recipe_db[current_recipe_name]),
+            }
         return {"message": f"Recipe '{recipe_name}' not found in the database."}
 
+    def _find_recipe_position(self, recipe_name):
+        """Position of the first recipe named recipe_name, ignoring case and surrounding spaces, or None."""
+        # The names are held by the ingredient index, whichever storage the recipes are in
+        index = self.handler.ingredient_index
+        if self._recipe_positions is None or self._recipe_positions[0] is not index:
+            positions = {}
+            for position, name in enumerate(index.recipe_names):
+                positions.setdefault(self.handler.normalize_name(name), position)
+            self._recipe_positions = (index, positions)
+        return self._recipe_positions[1].get(self.handler.normalize_name(recipe_name))
+
     def get_recipe_content(self, recipe):
         ingredients = [
             ingredient["name"]
@@ -156,32 +367,17 @@ class TastyParser:
 
         return ingredients, instructions
 
-    def get_saved_recipes_for_display(self, username, file_name="saved_recipes.json"):
+    def get_saved_recipes_for_display(self, username):
         """
-        Retrieves and formats saved recipes for a specific user from a JSON file.
+        Retrieves and formats the Tasty recipes saved by a user.
         """
-        file_path = os.path.join(self.users_dir, file_name)
-        all_user_recipes = self.load_user_recipes(file_path)
-        if not all_user_recipes:
-            return "No saved recipes found in the specified file."
-
-        user_recipes = all_user_recipes.get(username, [])
+        user_recipes = self.handler.saved_recipe_details(username) if username else []
         if not user_recipes:
             return "No saved recipes found."
 
         tasty_recipes = self.filter_and_format_tasty_recipes(user_recipes)
         return "\n\n".join(tasty_recipes) if tasty_recipes else "No Tasty recipes found for this user."
 
-    def load_user_recipes(self, file_path):
-        """
-        Attempts to load and return the recipes from the given file path.
-        """
-        try:
-            with open(file_path, "r", encoding="utf-8") as file:
-                return json.load(file)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
-
     def filter_and_format_tasty_recipes(self, user_recipes):
         """
         Filters recipes that are from 'Tasty' and formats them for display.
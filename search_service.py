@@ -0,0 +1,409 @@
+"""
+Headless JSON service answering recipe searches over HTTP from one warm process.
+
+    python search_service.py [--host 127.0.0.1] [--port 8080] [--shards 4] [--allow-remote]
+
+The catalogs and their indexes are loaded once at start-up and shared by the threads
+serving the requests. source is "bbc" or "tasty" in every endpoint:
+
+    GET    /search?source=bbc&ingredients=egg,milk&limit=20&offset=0
+    GET    /names?source=bbc&query=cake&limit=20
+    GET    /recipe?source=bbc&name=Classic pancakes
+    GET    /saved
+    POST   /saved                {"source": "bbc", "name": "Classic pancakes"}
+    DELETE /saved?source=bbc&name=Classic pancakes
+    GET    /stats                latency of every endpoint since start-up
+
+The /saved endpoints act on the recipes of the user whose username and password, those of
+an account of the application, come in a Basic Authorization header. The service speaks
+plain HTTP, without TLS, so passwords travel in clear: it only binds loopback addresses
+unless --allow-remote is given, e.g. behind a reverse proxy terminating TLS. The other
+endpoints only read the catalogs and need no authentication.
+
+With --shards, the searches of each source are ranked in worker processes holding a shard
+of its catalog, see ShardedSearch. load_generator.py measures the service under concurrent
+clients.
+"""
+import argparse
+import base64
+import binascii
+import ipaddress
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from models_bbc.bbc_parser import BBCParser
+from models_tasty.tasty_parser import TastyParser
+from users.saved_recipes import BBC_SOURCE, TASTY_SOURCE, SavedRecipeStore
+from users.user_data import User
+
+SAVED_SOURCES = {"bbc": BBC_SOURCE, "tasty": TASTY_SOURCE}
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 500
+
+
+class ServiceError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class LatencyStats:
+    """Request count, errors and latency percentiles of every endpoint, over its last samples."""
+
+    max_samples = 10000
+
+    def __init__(self):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds, error=False):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = {
+                    "count": 0, "errors": 0, "total": 0.0, "max": 0.0,
+                    "samples": deque(maxlen=self.max_samples),
+                }
+            stats["count"] += 1
+            stats["errors"] += error
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+            stats["samples"].append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                endpoint: summarize_latencies(
+                    stats["samples"], count=stats["count"], errors=stats["errors"],
+                    mean=stats["total"] / stats["count"], maximum=stats["max"],
+                )
+                for endpoint, stats in self._endpoints.items()
+            }
+
+
+def summarize_latencies(samples, count=None, errors=0, mean=None, maximum=None):
+    """Count, errors and latencies in milliseconds of a list of durations in seconds."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0, "errors": errors}
+
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    return {
+        "count": len(ordered) if count is None else count,
+        "errors": errors,
+        "mean_ms": round(1000 * (sum(ordered) / len(ordered) if mean is None else mean), 3),
+        "p50_ms": round(1000 * percentile(0.50), 3),
+        "p95_ms": round(1000 * percentile(0.95), 3),
+        "p99_ms": round(1000 * percentile(0.99), 3),
+        "max_ms": round(1000 * (ordered[-1] if maximum is None else maximum), 3),
+    }
+
+
+class RecipeSearchService:
+    """The endpoints of the service over the parsers, their handlers and the saved recipes."""
+
+    def __init__(self, bbc_parser=None, tasty_parser=None, saved_recipes=None, accounts=None):
+        self.parsers = {
+            "bbc": bbc_parser or BBCParser(),
+            "tasty": tasty_parser or TastyParser(),
+        }
+        self.saved_recipes = saved_recipes or SavedRecipeStore()
+        # The accounts of the application, users log in to the service as they do in the app
+        self.accounts = accounts or User().accounts
+        self.latency = LatencyStats()
+
+    def authenticate(self, username, password):
+        """Returns username if password is that of its account."""
+        if not self.accounts.check_login(username, password):
+            raise ServiceError(401, "Invalid username or password")
+        return username
+
+    def parser(self, source):
+        parser = self.parsers.get(source)
+        if parser is None:
+            raise ServiceError(400, f"Unknown source {source!r}, expected one of {sorted(self.parsers)}")
+        return parser
+
+    def search(self, source, ingredients, limit=DEFAULT_LIMIT, offset=0):
+        """Recipes ranked [offset:offset + limit] by proportion of matched ingredients."""
+        parser = self.parser(source)
+        user_ingredients = [
+            ingredient.strip().lower() for ingredient in ingredients.split(",") if ingredient.strip()
+        ]
+        if not user_ingredients:
+            raise ServiceError(400, "No ingredients given")
+        if source == "bbc":
+            results = [
+                {
+                    "name": match["name"],
+                    "url": match.get("url"),
+                    "matched_ingredients": match["matched_ingredients"],
+                    "total_ingredients": match["total_ingredients"],
+                }
+                for match in parser.find_matching_recipes(user_ingredients, limit, offset)
+            ]
+        else:
+            handler = parser.handler
+            results = [
+                {
+                    "name": recipe_name,
+                    "url": handler.video_db.get(handler.normalize_name(recipe_name)),
+                    "matched_ingredients": matched_ingredients,
+                    "total_ingredients": total_ingredients,
+                }
+                for recipe_name, _, matched_ingredients, _, total_ingredients in parser.get_matches(
+                    user_ingredients, limit, offset
+                )
+            ]
+        return {"source": source, "ingredients": user_ingredients, "offset": offset, "results": results}
+
+    def names(self, source, query, limit=DEFAULT_LIMIT):
+        """Names, in catalog order, of the recipes whose name contains the query."""
+        handler = self.parser(source).handler
+        positions = handler.search_recipe_names(query)
+        recipe_names = handler.recipe_names()
+        return {
+            "source": source,
+            "count": len(positions),
+            "names": [recipe_names[position] for position in positions[:limit]],
+        }
+
+    def recipe(self, source, name):
+        parser = self.parser(source)
+        if source == "bbc":
+            recipe = parser.search_recipe_by_name(name)
+            if "message" in recipe:
+                raise ServiceError(404, recipe["message"])
+            return dict(recipe)
+        found = parser.search_recipe_by_name_tasty(name)
+        if "message" in found:
+            raise ServiceError(404, found["message"])
+        handler = parser.handler
+        return {
+            "name": found["name"],
+            "url": handler.video_db.get(handler.normalize_name(found["name"])),
+            **handler.recipe_db[found["name"]],
+        }
+
+    def saved(self, user):
+        sources = {saved_source: source for source, saved_source in SAVED_SOURCES.items()}
+        return {
+            "user": user,
+            "recipes": [
+                {"source": sources.get(recipe["source"], recipe["source"]), "name": recipe["name"]}
+                for recipe in self.saved_recipes.recipes(user)
+            ],
+        }
+
+    def save(self, user, source, name):
+        # Saved under the name of the catalog, as the handlers do
+        name = self.recipe(source, name)["name"]
+        self.saved_recipes.save(user, SAVED_SOURCES[source], name)
+        return {"user": user, "source": source, "name": name}
+
+    def delete(self, user, source, name):
+        self.parser(source)
+        deleted = self.saved_recipes.delete(user, SAVED_SOURCES[source], name)
+        if not deleted:
+            raise ServiceError(404, f"Recipe '{name}' is not saved by user '{user}'.")
+        return {"user": user, "source": source, "name": name, "deleted": deleted}
+
+    def stats(self):
+        return {"endpoints": self.latency.snapshot(), "query_cache": self.parsers["bbc"].query_cache.stats()}
+
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    """Routes the requests to the RecipeSearchService of the server and times them."""
+
+    # Keeps the connections of the clients open between requests
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, Nagle's algorithm would hold the body back
+    disable_nagle_algorithm = True
+
+    routes = {
+        ("GET", "/search"): lambda service, params, body, user: service.search(
+            params.required("source"), params.required("ingredients"),
+            params.integer("limit", DEFAULT_LIMIT, MAX_LIMIT), params.integer("offset", 0),
+        ),
+        ("GET", "/names"): lambda service, params, body, user: service.names(
+            params.required("source"), params.get("query", ""), params.integer("limit", DEFAULT_LIMIT, MAX_LIMIT)
+        ),
+        ("GET", "/recipe"): lambda service, params, body, user: service.recipe(
+            params.required("source"), params.required("name")
+        ),
+        ("GET", "/saved"): lambda service, params, body, user: service.saved(user),
+        ("POST", "/saved"): lambda service, params, body, user: service.save(
+            user, body.required("source"), body.required("name")
+        ),
+        ("DELETE", "/saved"): lambda service, params, body, user: service.delete(
+            user, params.required("source"), params.required("name")
+        ),
+        ("GET", "/stats"): lambda service, params, body, user: service.stats(),
+    }
+    # Routes acting on the data of a user, who has to log in
+    authenticated_routes = {("GET", "/saved"), ("POST", "/saved"), ("DELETE", "/saved")}
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    def dispatch(self, method):
+        start = time.perf_counter()
+        url = urlsplit(self.path)
+        endpoint = f"{method} {url.path}"
+        try:
+            # Read first, a request refused early must not leave its body on the kept-alive connection
+            data = self.read_body()
+            route = self.routes.get((method, url.path))
+            if route is None:
+                raise ServiceError(404, f"No endpoint {endpoint}")
+            user = self.authenticated_user() if (method, url.path) in self.authenticated_routes else None
+            params = Parameters({key: values[-1] for key, values in parse_qs(url.query).items()})
+            status, response = 200, route(self.server.service, params, self.parse_body(data), user)
+        except ServiceError as e:
+            status, response = e.status, {"error": str(e)}
+        except Exception as e:
+            status, response = 500, {"error": f"{type(e).__name__}: {e}"}
+        headers = {"WWW-Authenticate": 'Basic realm="recipes", charset="UTF-8"'} if status == 401 else {}
+        self.send_json(status, response, headers)
+        if url.path != "/stats":
+            self.server.service.latency.record(endpoint, time.perf_counter() - start, error=status >= 400)
+
+    def authenticated_user(self):
+        """Username of the Basic Authorization header of the request, once its password is checked."""
+        scheme, _, credentials = self.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() != "basic" or not credentials.strip():
+            raise ServiceError(401, "Log in with a Basic Authorization header")
+        try:
+            decoded = base64.b64decode(credentials.strip(), validate=True).decode("utf-8")
+        except (binascii.Error, UnicodeDecodeError):
+            raise ServiceError(401, "Malformed Basic Authorization header")
+        username, separator, password = decoded.partition(":")
+        if not separator:
+            raise ServiceError(401, "Malformed Basic Authorization header")
+        return self.server.service.authenticate(username, password)
+
+    def read_body(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # Where the body ends is unknown, the connection cannot serve another request
+            self.close_connection = True
+            raise ServiceError(400, "Content-Length must be a non-negative integer")
+        return self.rfile.read(length) if length else b""
+
+    def parse_body(self, data):
+        if not data:
+            return Parameters({})
+        try:
+            body = json.loads(data)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise ServiceError(400, "The body is not valid JSON")
+        if not isinstance(body, dict):
+            raise ServiceError(400, "The body must be a JSON object")
+        return Parameters(body)
+
+    def send_json(self, status, response, headers=None):
+        body = json.dumps(response, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Latencies are reported by /stats instead of a line per request
+        pass
+
+
+class Parameters(dict):
+    def required(self, name):
+        value = self.get(name)
+        if value in (None, ""):
+            raise ServiceError(400, f"Missing parameter {name!r}")
+        return value
+
+    def integer(self, name, default, maximum=None):
+        try:
+            value = int(self.get(name, default))
+        except (TypeError, ValueError):
+            raise ServiceError(400, f"Parameter {name!r} must be an integer")
+        if value < 0:
+            raise ServiceError(400, f"Parameter {name!r} must not be negative")
+        return value if maximum is None else min(value, maximum)
+
+
+def is_loopback(host):
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == "localhost"
+
+
+def make_server(service, host="127.0.0.1", port=8080, allow_remote=False):
+    """
+    Returns the server of the service, serve_forever() answers every connection on its own thread.
+
+    Passwords are sent in clear over plain HTTP, only loopback addresses are bound unless allow_remote.
+    """
+    if not allow_remote and not is_loopback(host):
+        raise ValueError(
+            f"Refusing to serve on {host!r}: passwords would be sent in clear to a non-loopback address, "
+            "put the service behind a TLS proxy and allow remote clients explicitly"
+        )
+    server = ThreadingHTTPServer((host, port), SearchRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serves recipe searches as JSON over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--shards", type=int, default=0, help="rank the searches of each source in this many worker processes"
+    )
+    parser.add_argument(
+        "--allow-remote",
+        action="store_true",
+        help="bind a non-loopback host, passwords are sent in clear unless a proxy adds TLS",
+    )
+    args = parser.parse_args()
+    if not args.allow_remote and not is_loopback(args.host):
+        parser.error(f"--host {args.host} is not a loopback address, pass --allow-remote to serve it anyway")
+
+    start = time.perf_counter()
+    service = RecipeSearchService()
+    if args.shards:
+        for source_parser in service.parsers.values():
+            source_parser.start_shards(args.shards)
+    print(f"Catalogs loaded in {time.perf_counter() - start:.2f}s")
+    server = make_server(service, args.host, args.port, args.allow_remote)
+    print(f"Serving on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for source_parser in service.parsers.values():
+            source_parser.stop_shards()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Search throughput of the sharded worker processes against a single process.
+
+    python shard_benchmark.py [--sources bbc,tasty] [--shards 1,2,4] [--pantries 1000] [--clients 8]
+                              [--limit 20] [--engine numpy] [--output results.json]
+
+The pantries of batch_benchmark.py are searched one by one by concurrent client threads,
+then as one batch, first in this process and then with every number of shards. Sharded
+searches are checked to rank the same recipes before their queries per second are printed.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from batch_benchmark import make_pantries, result_names
+from models_bbc.bbc_parser import BBCParser
+from models_tasty.tasty_parser import TastyParser
+from models_common.query_cache import QueryCache
+from models_common.vector_scoring import default_engine
+
+
+def measure(source, parser, pantries, limit, clients):
+    search = parser.find_matching_recipes if source == "bbc" else parser.get_matches
+    search_batch = parser.find_matching_recipes_batch if source == "bbc" else parser.get_matches_batch
+    parser.refresh_catalog()
+
+    # A cache of its own, so the pantries are searched as for the first time
+    parser.query_cache = QueryCache()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        one_by_one = list(executor.map(lambda pantry: search(pantry, limit), pantries))
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = search_batch(pantries, limit)
+    batch_seconds = time.perf_counter() - start
+
+    results = [result_names(source, matches) for matches in one_by_one]
+    if results != [result_names(source, matches) for matches in batch]:
+        raise AssertionError("The batch ranks the pantries differently")
+    return results, {
+        "queries_per_s": round(len(pantries) / loop_seconds, 1),
+        "batch_queries_per_s": round(len(pantries) / batch_seconds, 1),
+    }
+
+
+def benchmark(source, parser, pantries, limit, clients, shard_counts):
+    expected, single = measure(source, parser, pantries, limit, clients)
+    runs = {"single_process": single}
+    for shard_count in shard_counts:
+        start = time.perf_counter()
+        parser.start_shards(shard_count)
+        start_seconds = time.perf_counter() - start
+        try:
+            results, stats = measure(source, parser, pantries, limit, clients)
+        finally:
+            parser.stop_shards()
+        if results != expected:
+            raise AssertionError(f"{shard_count} shards rank the pantries differently")
+        stats["start_s"] = round(start_seconds, 3)
+        stats["speedup"] = round(stats["queries_per_s"] / single["queries_per_s"], 2)
+        stats["batch_speedup"] = round(stats["batch_queries_per_s"] / single["batch_queries_per_s"], 2)
+        runs[f"{shard_count}_shards"] = stats
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares sharded searches with searches in a single process.")
+    parser.add_argument("--sources", default="bbc,tasty")
+    parser.add_argument("--shards", default=",".join(str(count) for count in (1, 2, 4)))
+    parser.add_argument("--pantries", type=int, default=1000)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=["python", "numpy"], default=default_engine())
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    parsers = {"bbc": BBCParser, "tasty": TastyParser}
+    shard_counts = [int(count) for count in args.shards.split(",")]
+    pantries = make_pantries(args.pantries, args.seed)
+    results = {"cpu_count": os.cpu_count(), "engine": args.engine}
+    for source in args.sources.split(","):
+        source_parser = parsers[source]()
+        source_parser.engine = args.engine
+        results[source] = runs = benchmark(source, source_parser, pantries, args.limit, args.clients, shard_counts)
+        for name, stats in runs.items():
+            speedup = f"  ({stats['speedup']}x, batch {stats['batch_speedup']}x)" if "speedup" in stats else ""
+            print(
+                f"{source:<6} {name:<15} {stats['queries_per_s']} queries/s  "
+                f"batch {stats['batch_queries_per_s']} queries/s{speedup}"
+            )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
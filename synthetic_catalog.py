@@ -0,0 +1,195 @@
+"""
+Seeded generator of synthetic catalogs shaped like the files of the res folder.
+
+    python synthetic_catalog.py --recipes 100000 [--seed 0] --output-dir /tmp/catalog-100000
+
+Writes bbc.json, tasty.json, url.json and subs.json. Ingredients are drawn from a fixed
+vocabulary of common foods, qualified ones included ("plain flour", "red pepper"), and a
+tail of rarer made-up foods growing with the square root of the catalog, with a Zipf-like
+popularity, so the postings of the indexes are as skewed as in real catalogs. The same
+recipes count and seed always write the same files. Recipes are written as they are
+generated, a million of them fit in memory only once loaded by the handlers.
+"""
+import argparse
+import json
+import os
+import random
+
+FOODS = [
+    "egg", "milk", "flour", "butter", "sugar", "chicken", "rice", "onion", "garlic", "tomato",
+    "cheese", "potato", "lemon", "beef", "carrot", "pasta", "cream", "honey", "spinach", "salmon",
+    "oil", "lime", "ginger", "mushroom", "bacon", "coriander", "parsley", "basil", "chilli",
+    "cinnamon", "vanilla extract", "yogurt", "pepper", "salt", "stock", "wine", "vinegar",
+    "mustard", "soy sauce", "chickpeas", "lentils", "beans", "peas", "courgette", "aubergine",
+    "broccoli", "cabbage", "kale", "leek", "celery", "cucumber", "avocado", "apple", "banana",
+    "orange", "strawberries", "raspberries", "blueberries", "almonds", "walnuts", "oats",
+    "chocolate", "cocoa", "coconut milk", "prawns", "cod", "tuna", "lamb", "pork", "sausages",
+    "ham", "turkey", "tofu", "noodles", "bread", "tortillas", "feta", "mozzarella", "parmesan",
+    "cheddar", "ricotta", "mayonnaise", "ketchup", "paprika", "cumin", "turmeric", "thyme",
+    "rosemary", "oregano", "mint", "dill", "nutmeg", "cloves", "cardamom", "maple syrup",
+    "breadcrumbs", "cornflour", "yeast", "baking powder", "bicarbonate of soda", "quinoa",
+]
+QUALIFIERS = {
+    "flour": ["plain", "self-raising", "strong white", "wholemeal"],
+    "sugar": ["caster", "brown", "icing", "light muscovado"],
+    "cream": ["double", "single", "soured"],
+    "oil": ["olive", "vegetable", "sesame", "rapeseed"],
+    "onion": ["red", "spring", "white"],
+    "pepper": ["red", "green", "black", "yellow"],
+    "chicken": ["chicken breast", "chicken thighs"],
+    "yogurt": ["greek", "natural"],
+    "stock": ["chicken", "vegetable", "beef"],
+    "wine": ["red", "white"],
+    "vinegar": ["balsamic", "red wine", "cider"],
+    "beans": ["black", "kidney", "green", "butter"],
+    "chocolate": ["dark", "milk", "white"],
+    "rice": ["basmati", "risotto", "jasmine"],
+}
+QUANTITIES = ["1", "2", "3", "4", "½", "100g", "200g", "250g", "400g", "1 tbsp", "2 tbsp", "1 tsp", "½ tsp", "150ml", "300ml", "1 pack", "a pinch of"]
+PREPARATIONS = ["", "", "", ", finely chopped", ", sliced", ", grated", ", crushed", ", diced", ", to serve", ", softened"]
+ADJECTIVES = ["Easy", "Classic", "Quick", "Healthy", "Spicy", "Smoky", "Creamy", "Crispy", "Vegan", "Summer", "Winter", "One-pot", "Slow cooker", "Air fryer", "Family"]
+DISHES = ["traybake", "curry", "salad", "soup", "stew", "pie", "pasta bake", "stir-fry", "risotto", "tacos", "burgers", "cake", "muffins", "pancakes", "omelette", "noodles", "skewers", "frittata", "gratin", "crumble"]
+METHODS = ["Heat", "Mix", "Whisk", "Fry", "Roast", "Simmer", "Bake", "Stir", "Season", "Serve"]
+SYLLABLES = ["ka", "lo", "mi", "ran", "te", "su", "bo", "vel", "ni", "quo", "da", "shi", "por", "en", "tu", "gra"]
+UNITS = ["cup", "tbsp", "tsp", "g", "ml"]
+
+
+def ingredient_vocabulary(recipes, rng):
+    """Ingredient names, from the most to the least popular."""
+    vocabulary = []
+    for food in FOODS:
+        vocabulary.append(food)
+        for qualifier in QUALIFIERS.get(food, ()):
+            vocabulary.append(qualifier if food in qualifier else f"{qualifier} {food}")
+    rare = dict.fromkeys(vocabulary)
+    while len(rare) < len(vocabulary) + int(4 * recipes ** 0.5):
+        rare.setdefault("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return list(rare)
+
+
+class SyntheticCatalog:
+    """Recipes of a seeded synthetic catalog, generated on demand in the same order every time."""
+
+    def __init__(self, recipes, seed=0):
+        self.recipes = recipes
+        self.seed = seed
+        self.vocabulary = ingredient_vocabulary(recipes, random.Random(seed))
+        # Zipf-like popularity, the i-th ingredient is used about 1 / (i + 1) as often as the first
+        self._cumulative_weights = []
+        total = 0.0
+        for rank in range(len(self.vocabulary)):
+            total += 1.0 / (rank + 1)
+            self._cumulative_weights.append(total)
+
+    def ingredients(self, rng, count):
+        return list(dict.fromkeys(rng.choices(self.vocabulary, cum_weights=self._cumulative_weights, k=count)))
+
+    def names(self, rng):
+        """Unique recipe names, as many as the recipes of the catalog."""
+        seen = set()
+        for position in range(self.recipes):
+            name = f"{rng.choice(ADJECTIVES)} {rng.choice(FOODS)} {rng.choice(DISHES)}"
+            if name in seen:
+                name = f"{name} {position}"
+            seen.add(name)
+            yield name
+
+    def steps(self, rng, ingredients):
+        return [
+            f"{rng.choice(METHODS)} the {' and '.join(rng.sample(ingredients, min(2, len(ingredients))))} for {rng.randint(2, 40)} mins."
+            for _ in range(rng.randint(2, 6))
+        ]
+
+    def bbc_recipes(self):
+        rng = random.Random(f"bbc-{self.seed}")
+        for position, name in enumerate(self.names(rng)):
+            ingredients = self.ingredients(rng, rng.randint(3, 15))
+            yield {
+                "id": f"{rng.getrandbits(128):032x}",
+                "url": f"https://www.example.com/recipes/{position}",
+                "name": name,
+                "description": f"A {name.lower()} with {ingredients[0]}",
+                "author": f"Cook {rng.randint(1, 500)}",
+                "ingredients": [
+                    f"{rng.choice(QUANTITIES)} {ingredient}{rng.choice(PREPARATIONS)}" for ingredient in ingredients
+                ],
+                "steps": self.steps(rng, ingredients),
+            }
+
+    def tasty_recipes(self):
+        rng = random.Random(f"tasty-{self.seed}")
+        for name in self.names(rng):
+            ingredients = self.ingredients(rng, rng.randint(3, 15))
+            split = rng.randint(1, len(ingredients))
+            sections = [section for section in (ingredients[:split], ingredients[split:]) if section]
+            yield name, {
+                "ingredient_sections": [
+                    {
+                        "ingredients": [
+                            {
+                                "name": ingredient,
+                                "primary_unit": {"quantity": str(rng.randint(1, 4)), "display": rng.choice(UNITS)},
+                            }
+                            for ingredient in section
+                        ]
+                    }
+                    for section in sections
+                ],
+                "instructions": [{"display_text": step} for step in self.steps(rng, ingredients)],
+            }
+
+    def videos(self, tasty_names):
+        """Entries of url.json, for every third Tasty recipe."""
+        return [
+            {"name": name.lower(), "video_url": f"http://v/{position}"}
+            for position, name in enumerate(tasty_names)
+            if position % 3 == 0
+        ]
+
+    def substitutions(self):
+        """Entries of subs.json, for the popular ingredients and some of the rarer ones."""
+        rng = random.Random(f"subs-{self.seed}")
+        items = self.vocabulary[:80] + rng.sample(self.vocabulary[80:], min(len(self.vocabulary) - 80, self.recipes // 1000))
+        return [
+            {
+                "Item": item.title(),
+                "Substitutions": [other.title() for other in rng.sample([food for food in FOODS if food != item], 2)],
+            }
+            for item in items
+        ]
+
+    def write(self, output_dir):
+        """Writes the four files of the catalog to output_dir and returns their paths by file name."""
+        os.makedirs(output_dir, exist_ok=True)
+        paths = {name: os.path.join(output_dir, name) for name in ("bbc.json", "tasty.json", "url.json", "subs.json")}
+        with open(paths["bbc.json"], "w", encoding="utf-8") as file:
+            file.write("[\n")
+            for position, recipe in enumerate(self.bbc_recipes()):
+                file.write((",\n" if position else "") + json.dumps(recipe))
+            file.write("\n]\n")
+        tasty_names = []
+        with open(paths["tasty.json"], "w", encoding="utf-8") as file:
+            file.write("{\n")
+            for position, (name, recipe) in enumerate(self.tasty_recipes()):
+                tasty_names.append(name)
+                file.write((",\n" if position else "") + f"{json.dumps(name)}: {json.dumps(recipe)}")
+            file.write("\n}\n")
+        with open(paths["url.json"], "w", encoding="utf-8") as file:
+            json.dump(self.videos(tasty_names), file)
+        with open(paths["subs.json"], "w", encoding="utf-8") as file:
+            json.dump(self.substitutions(), file, indent=4)
+        return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Writes a seeded synthetic BBC, Tasty and substitutions catalog.")
+    parser.add_argument("--recipes", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", required=True)
+    args = parser.parse_args()
+    for path in SyntheticCatalog(args.recipes, args.seed).write(args.output_dir).values():
+        print(f"Wrote {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
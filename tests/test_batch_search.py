@@ -0,0 +1,100 @@
+import unittest
+from unittest.mock import MagicMock
+from models_bbc.bbc_parser import BBCParser
+from models_bbc.bbc_index import BBCIngredientIndex
+from models_tasty.tasty_parser import TastyParser
+from models_tasty.tasty_index import TastyIngredientIndex
+from models_common.substitutions import SubstitutionMatcher
+from models_common.query_cache import QueryCache
+
+PANTRIES = [
+    ["egg", "olive oil"],
+    ["Olive Oil", "egg", "egg"],
+    ["tomato", "plain flour", "milk"],
+    ["rice"],
+    [],
+    ["salt", "eggs", "milk", "tomato"],
+]
+
+
+class TestBBCBatchSearch(unittest.TestCase):
+    def setUp(self):
+        self.bbc_parser = BBCParser()
+        self.bbc_parser.handler = MagicMock()
+        self.bbc_parser.query_cache = QueryCache()
+        self.bbc_parser.handler.recipe_db = [
+            {"name": "pancakes", "ingredients": ["200g plain flour", "2 eggs", "milk"]},
+            {"name": "salad", "ingredients": ["2 tomatoes", "olive oil"]},
+            {"name": "omelette", "ingredients": ["3 eggs", "salt", "olive oil"]},
+            {"name": "flatbread", "ingredients": ["flour", "oil", "salt"]},
+        ]
+        self.bbc_parser.handler.substitution_matcher = SubstitutionMatcher({})
+        self.bbc_parser.handler.ingredient_index = BBCIngredientIndex(self.bbc_parser.handler.recipe_db)
+
+    def results(self, matches):
+        return [(match["name"], match["matched_ingredients"], match["total_ingredients"]) for match in matches]
+
+    def test_same_results_as_one_search_per_pantry(self):
+        for limit, offset in ((None, 0), (1, 1)):
+            batch = self.bbc_parser.find_matching_recipes_batch(PANTRIES, limit, offset)
+            self.assertEqual(len(batch), len(PANTRIES))
+            for pantry, matches in zip(PANTRIES, batch):
+                self.assertListEqual(
+                    self.results(matches),
+                    self.results(self.bbc_parser.find_matching_recipes(pantry, limit, offset)),
+                )
+
+    def test_every_ingredient_is_matched_once(self):
+        self.bbc_parser.match_terms = MagicMock(wraps=self.bbc_parser.match_terms)
+        self.bbc_parser.find_matching_recipes_batch(PANTRIES)
+        self.bbc_parser.match_terms.assert_called_once_with(
+            ["egg", "olive oil", "milk", "plain flour", "tomato", "rice", "eggs", "salt"]
+        )
+
+    def test_batch_leaves_the_query_cache_alone(self):
+        self.bbc_parser.find_matching_recipes_batch(PANTRIES)
+        self.assertEqual(self.bbc_parser.query_cache.stats()["size"], 0)
+
+
+class TestTastyBatchSearch(unittest.TestCase):
+    def setUp(self):
+        self.tasty_parser = TastyParser()
+        self.tasty_parser.handler = MagicMock()
+        self.tasty_parser.query_cache = QueryCache()
+        recipe_db = {
+            "pancakes": {
+                "ingredient_sections": [
+                    {"ingredients": [{"name": "Flour"}, {"name": "eggs"}, {"name": "milk"}]}
+                ]
+            },
+            "omelette": {"ingredient_sections": [{"ingredients": [{"name": "egg"}, {"name": "salt"}]}]},
+            "salad": {"ingredient_sections": [{"ingredients": [{"name": "tomato"}, {"name": "olive oil"}]}]},
+        }
+        self.tasty_parser.handler.recipe_db = recipe_db
+        self.tasty_parser.handler.ingredient_index = TastyIngredientIndex(recipe_db)
+
+    def results(self, matches):
+        return [(match[0], match[1], match[2], match[4]) for match in matches]
+
+    def test_same_results_as_one_search_per_pantry(self):
+        for limit, offset in ((None, 0), (1, 1)):
+            batch = self.tasty_parser.get_matches_batch(PANTRIES, limit, offset)
+            for pantry, matches in zip(PANTRIES, batch):
+                self.assertListEqual(
+                    self.results(matches),
+                    self.results(self.tasty_parser.get_matches(pantry, limit, offset)),
+                )
+
+    def test_names_are_traversed_once_for_the_batch(self):
+        index = self.tasty_parser.handler.ingredient_index
+        recipe_ids = index.find_recipes_batch(
+            [self.tasty_parser.get_ingredient_pattern(term) for term in ("egg", "oil", "rice")]
+        )
+        self.assertListEqual(recipe_ids, [frozenset({0, 1}), frozenset({2}), frozenset()])
+        # Cached for the searches of single ingredients
+        self.assertEqual(index.find_recipes(self.tasty_parser.get_ingredient_pattern("oil")), frozenset({2}))
+        self.assertEqual(len(index._pattern_cache), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
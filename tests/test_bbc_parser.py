@@ -1,11 +1,15 @@
 import unittest
 from unittest.mock import MagicMock
 from models_bbc.bbc_parser import BBCParser
+from models_bbc.bbc_index import BBCIngredientIndex
+from models_common.substitutions import SubstitutionMatcher
+from models_common.query_cache import QueryCache
 
 class TestBBCParser(unittest.TestCase):
     def setUp(self):
         self.bbc_recipes = BBCParser()
         self.bbc_recipes.handler = MagicMock()
+        self.bbc_recipes.query_cache = QueryCache()
         self.bbc_recipes.handler.recipe_db = [
             {"name": "pizza", "ingredients": ["flour", "tomato", "cheese"]}
         ]
@@ -32,6 +36,75 @@ class TestBBCParser(unittest.TestCase):
         expected_result = {"message": "Recipe 'tacos' not found in the database."}
         self.assertDictEqual(result, expected_result)
 
+    def test_find_matching_recipes_uses_index(self):
+        self.bbc_recipes.handler.recipe_db = [
+            {"name": "pancakes", "ingredients": ["200g plain flour", "2 eggs", "milk"]},
+            {"name": "salad", "ingredients": ["2 tomatoes", "olive oil"]},
+            {"name": "bread", "ingredients": ["500g strong white flour", "7g yeast", "salt"]},
+        ]
+        self.bbc_recipes.handler.substitution_matcher = SubstitutionMatcher({})
+        self.bbc_recipes.handler.ingredient_index = BBCIngredientIndex(
+            self.bbc_recipes.handler.recipe_db
+        )
+
+        result = self.bbc_recipes.find_matching_recipes(["flour", "egg", "olive oil"])
+        self.assertListEqual(
+            [recipe["name"] for recipe in result], ["pancakes", "salad", "bread"]
+        )
+        self.assertSetEqual(set(result[0]["matched_ingredients"]), {"flour", "egg"})
+        self.assertListEqual(result[1]["matched_ingredients"], ["olive oil"])
+
+        result = self.bbc_recipes.find_matching_recipes(["tomato", "white flour"])
+        self.assertListEqual([recipe["name"] for recipe in result], ["salad", "bread"])
+        # Results reference the catalog entries instead of copying them
+        self.assertIs(result[0].recipe, self.bbc_recipes.handler.recipe_db[1])
+        self.assertEqual(result[0].get("total_ingredients"), 2)
+        self.assertListEqual(result[1].get("steps", []), [])
+
+    def test_find_matching_recipes_pages(self):
+        self.bbc_recipes.handler.recipe_db = [
+            {"name": f"recipe {i}", "ingredients": ["flour"] + ["water"] * (i % 4)}
+            for i in range(20)
+        ] + [{"name": "empty", "ingredients": []}]
+        self.bbc_recipes.handler.substitution_matcher = SubstitutionMatcher({})
+        self.bbc_recipes.handler.ingredient_index = BBCIngredientIndex(
+            self.bbc_recipes.handler.recipe_db
+        )
+
+        ranking = self.bbc_recipes.find_matching_recipes(["flour", "salt"])
+        self.assertEqual(len(ranking), 20)
+        pages = []
+        for offset in range(0, 20, 6):
+            pages += self.bbc_recipes.find_matching_recipes(["flour", "salt"], limit=6, offset=offset)
+        self.assertListEqual(
+            [recipe["name"] for recipe in pages], [recipe["name"] for recipe in ranking]
+        )
+        self.assertListEqual(
+            [recipe["name"] for recipe in ranking[:3]], ["recipe 0", "recipe 4", "recipe 8"]
+        )
+
+    def test_find_matching_recipes_reuses_cached_ranking(self):
+        self.bbc_recipes.handler.recipe_db = [
+            {"name": "pancakes", "ingredients": ["200g plain flour", "2 eggs", "milk"]},
+            {"name": "omelette", "ingredients": ["3 eggs", "salt"]},
+        ]
+        self.bbc_recipes.handler.substitution_matcher = SubstitutionMatcher({})
+        self.bbc_recipes.handler.ingredient_index = BBCIngredientIndex(
+            self.bbc_recipes.handler.recipe_db
+        )
+        self.bbc_recipes.match_ingredient = MagicMock(wraps=self.bbc_recipes.match_ingredient)
+
+        first = self.bbc_recipes.find_matching_recipes(["egg", "milk"])
+        second = self.bbc_recipes.find_matching_recipes(["Milk", "egg"])
+        self.assertEqual(self.bbc_recipes.match_ingredient.call_count, 2)
+        self.assertListEqual([r["name"] for r in first], [r["name"] for r in second])
+        # Matched ingredients are still reported as the caller entered them
+        self.assertListEqual(second[0]["matched_ingredients"], ["Milk", "egg"])
+
+        self.bbc_recipes.handler.refresh_catalog.return_value = "reloaded"
+        self.bbc_recipes.find_matching_recipes(["egg", "milk"])
+        self.assertEqual(self.bbc_recipes.match_ingredient.call_count, 4)
+
     def test_calculate_score(self):
         recipe = {"ingredients": ["flour", "sugar", "tomato", "cheese"]}
 
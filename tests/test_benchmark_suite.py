@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+from benchmark_suite import flatten_timings, open_parser, prepare_catalog, run_suite
+from synthetic_catalog import SyntheticCatalog
+from models_common.catalog import catalog_registry
+from models_common.vector_scoring import numpy_available
+
+
+class TestSyntheticCatalog(unittest.TestCase):
+    def test_same_seed_same_catalog(self):
+        first = SyntheticCatalog(50, seed=1)
+        self.assertListEqual(list(first.bbc_recipes()), list(SyntheticCatalog(50, seed=1).bbc_recipes()))
+        self.assertNotEqual(list(first.bbc_recipes()), list(SyntheticCatalog(50, seed=2).bbc_recipes()))
+        self.assertEqual(len(dict(first.tasty_recipes())), 50)
+
+    def test_substitutions_are_ingredients_of_the_catalog(self):
+        catalog = SyntheticCatalog(50)
+        for entry in catalog.substitutions():
+            self.assertIn(entry["Item"].lower(), catalog.vocabulary)
+            self.assertNotIn(entry["Item"], entry["Substitutions"])
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        catalog_registry.invalidate()
+        self.temp_dir.cleanup()
+
+    def test_handlers_load_the_catalog_and_snapshot_it_aside(self):
+        _, catalog_dir, paths = prepare_catalog(self.temp_dir.name, 100, 0)
+        bbc_parser = open_parser("bbc", paths)
+        tasty_parser = open_parser("tasty", paths)
+        self.assertEqual(len(bbc_parser.handler.recipe_db), 100)
+        self.assertEqual(len(tasty_parser.handler.recipe_names()), 100)
+        self.assertTrue(bbc_parser.find_matching_recipes(["egg", "milk"], limit=5))
+        self.assertTrue(tasty_parser.get_matches(["egg", "milk"], limit=5))
+        self.assertTrue(os.path.exists(os.path.join(catalog_dir, "snapshots", "bbc.pickle")))
+
+    def test_results_of_every_benchmark(self):
+        results = run_suite([100], queries=3, work_dir=self.temp_dir.name, saved_counts=[5, 10])
+        self.assertEqual(results["meta"]["sizes"], [100])
+        for source in ("bbc", "tasty"):
+            stats = results["catalogs"]["100"][source]
+            for name in ("search_1_ingredients", "search_10_ingredients", "substitution_lookup", "name_search"):
+                self.assertEqual(stats[name]["count"], 3)
+            self.assertIn("load_snapshot_s", stats)
+        self.assertEqual(results["saved_recipes"]["10"]["save"]["count"], 3)
+        timings = flatten_timings(results)
+        self.assertIn("catalogs.100.bbc.search_3_ingredients.p50_ms", timings)
+        self.assertNotIn("catalogs.100.bbc.search_3_ingredients.count", timings)
+
+
+    @unittest.skipUnless(numpy_available(), "numpy is not installed")
+    def test_matrix_build_is_timed_with_the_numpy_engine(self):
+        results = run_suite([100], queries=1, engine="numpy", work_dir=self.temp_dir.name, saved_counts=[5])
+        for source in ("bbc", "tasty"):
+            self.assertIn("matrix_build_s", results["catalogs"]["100"][source])
+        results = run_suite([100], queries=1, engine="python", work_dir=self.temp_dir.name, saved_counts=[5])
+        self.assertNotIn("matrix_build_s", results["catalogs"]["100"]["bbc"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import os
+import json
+import tempfile
+from models_common.catalog import CatalogRegistry, catalog_registry
+from models_bbc.bbc_handler import BBCFileHandler
+from models_tasty.tasty_handler import TastyHandler
+
+
+class TestCatalogRegistry(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, "recipes.json")
+        with open(self.file_path, "w", encoding="utf-8") as file:
+            json.dump([{"name": "pizza"}], file)
+        self.registry = CatalogRegistry()
+        self.load_count = 0
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def load(self):
+        self.load_count += 1
+        with open(self.file_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def test_get_loads_once(self):
+        first = self.registry.get("recipes", self.file_path, self.load)
+        second = self.registry.get("recipes", self.file_path, self.load)
+        self.assertIs(first, second)
+        self.assertEqual(self.load_count, 1)
+
+    def test_invalidate_reloads(self):
+        self.registry.get("recipes", self.file_path, self.load)
+        self.registry.invalidate(self.file_path)
+        self.registry.get("recipes", self.file_path, self.load)
+        self.assertEqual(self.load_count, 2)
+
+    def test_handlers_share_catalog(self):
+        # The in-memory catalogs, whatever storage RECIPE_FINDER_STORAGE selects
+        first_bbc = BBCFileHandler("bbc.json", "subs.json", storage="json")
+        second_bbc = BBCFileHandler("bbc.json", "subs.json", storage="json")
+        tasty = TastyHandler("tasty.json", "url.json", "subs.json", storage="json")
+        self.assertIs(first_bbc.recipe_db, second_bbc.recipe_db)
+        self.assertIs(first_bbc.load_bbc_recipes(), first_bbc.recipe_db)
+        self.assertIs(first_bbc.substitutions_db, tasty.substitutions_db)
+        self.assertIs(tasty.load_tasty_recipes(), tasty.load_tasty_recipes())
+        self.assertIs(
+            catalog_registry.get("bbc_catalog", first_bbc.bbc_file_path, dict)["recipes"],
+            first_bbc.recipe_db,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
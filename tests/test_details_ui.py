@@ -0,0 +1,68 @@
+import unittest
+from unittest.mock import MagicMock
+from models_bbc.bbc_index import BBCIngredientIndex
+from models_bbc.bbc_parser import BBCParser
+from models_common.query_cache import QueryCache
+from models_common.substitutions import SubstitutionMatcher
+from views.details_ui import DetailsUI
+
+
+class RecordingDisplay:
+    """Stands in for the SearchUI, records the details it is asked to show."""
+
+    def __init__(self, bbc_parser, tasty_parser):
+        self.bbc_parser = bbc_parser
+        self.tasty_parser = tasty_parser
+        self.shown = []
+
+    def show_details(self, details):
+        self.shown.append(details)
+
+
+class TestDetailsCache(unittest.TestCase):
+    def setUp(self):
+        self.parser = BBCParser(MagicMock())
+        self.parser.query_cache = QueryCache()
+        self.parser.handler.catalog_version = 1
+        self.parser.handler.recipe_db = [
+            {
+                "name": "Ham hock pie",
+                "url": "http://pie",
+                "ingredients": ["2 eggs", "1 sheet of tin foil"],
+            }
+        ]
+        self.parser.handler.ingredient_index = BBCIngredientIndex(self.parser.handler.recipe_db)
+        self.parser.handler.substitution_matcher = SubstitutionMatcher(
+            {"foil": ["baking paper"]}
+        )
+        tasty_parser = MagicMock()
+        tasty_parser.handler.catalog_version = 1
+        self.display = RecordingDisplay(self.parser, tasty_parser)
+        self.details_ui = DetailsUI(None, self.display)
+
+    def show(self, query):
+        recipe = self.parser.find_matching_recipes(query)[0]
+        self.details_ui.populate_recipe_details_bbc(recipe)
+        return "".join(text for text, _ in self.display.shown[-1])
+
+    def test_same_recipe_for_two_queries(self):
+        # "oil" matches nothing but is close to "tin foil", which then needs no substitution
+        with_foil = self.show(["egg"])
+        without_foil = self.show(["egg", "oil"])
+        self.assertIn("baking paper", with_foil.lower())
+        self.assertNotIn("baking paper", without_foil.lower())
+        self.assertEqual(len(self.details_ui.details_cache), 2)
+
+    def test_details_are_dropped_when_the_catalog_is_reloaded(self):
+        recipe = self.parser.find_matching_recipes(["egg"])[0]
+        self.details_ui.populate_recipe_details_bbc(recipe)
+        self.details_ui.populate_recipe_details_bbc(recipe)
+        self.assertIs(self.display.shown[0], self.display.shown[1])
+        self.parser.handler.catalog_version = 2
+        self.details_ui.populate_recipe_details_bbc(recipe)
+        self.assertIsNot(self.display.shown[2], self.display.shown[1])
+        self.assertEqual(len(self.details_ui.details_cache), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
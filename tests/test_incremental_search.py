@@ -0,0 +1,72 @@
+import unittest
+from unittest.mock import MagicMock
+from models_bbc.bbc_parser import BBCParser
+from models_bbc.bbc_index import BBCIngredientIndex
+from models_common.substitutions import SubstitutionMatcher
+from models_common.query_cache import QueryCache
+
+
+class TestIncrementalSearch(unittest.TestCase):
+    def setUp(self):
+        self.bbc_parser = BBCParser()
+        self.bbc_parser.handler = MagicMock()
+        self.bbc_parser.query_cache = QueryCache()
+        self.bbc_parser.handler.recipe_db = [
+            {"name": "pancakes", "ingredients": ["200g plain flour", "2 eggs", "milk"]},
+            {"name": "salad", "ingredients": ["2 tomatoes", "olive oil"]},
+            {"name": "omelette", "ingredients": ["3 eggs", "salt", "olive oil"]},
+        ]
+        self.bbc_parser.handler.substitution_matcher = SubstitutionMatcher({})
+        self.bbc_parser.handler.ingredient_index = BBCIngredientIndex(
+            self.bbc_parser.handler.recipe_db
+        )
+        self.search = self.bbc_parser.start_incremental_search()
+
+    def names(self, results):
+        return [result["name"] for result in results]
+
+    def assert_same_as_full_search(self, user_ingredients):
+        self.assertListEqual(
+            self.names(self.search.search(user_ingredients)),
+            self.names(self.bbc_parser.find_matching_recipes(user_ingredients)),
+        )
+
+    def test_adding_ingredients_refines_results(self):
+        self.assert_same_as_full_search(["egg"])
+        self.assert_same_as_full_search(["egg", "olive oil"])
+        self.assert_same_as_full_search(["egg", "olive oil", "tomato"])
+        self.assertSetEqual(set(self.search.matched_by_recipe), {0, 1, 2})
+
+    def test_removing_ingredient_undoes_its_contribution(self):
+        self.search.update(["egg", "tomato"])
+        self.search.update(["egg"])
+        self.assertDictEqual(self.search.matched_by_recipe, {0: {"egg"}, 2: {"egg"}})
+        self.assert_same_as_full_search(["salt", "egg"])
+
+    def test_only_new_ingredients_are_looked_up(self):
+        self.bbc_parser.match_ingredient = MagicMock(wraps=self.bbc_parser.match_ingredient)
+        self.search.update(["egg", "milk"])
+        self.search.update(["egg", "milk", "salt"])
+        looked_up = [call.args[0] for call in self.bbc_parser.match_ingredient.call_args_list]
+        self.assertListEqual(looked_up, ["egg", "milk", "salt"])
+
+    def test_ranking_does_not_copy_the_candidates(self):
+        self.search.search(["egg", "olive oil"])
+        ranking = self.bbc_parser.query_cache.get("bbc_goodfood", self.search.catalog_version, ("egg", "olive oil"), None)
+        self.search.update(["egg"])
+        # Still the matches of the query it was ranked for
+        self.assertEqual(ranking.matched_by_recipe[2], {"egg", "olive oil"})
+        self.assertEqual(ranking.matched_by_recipe.match_counts(), {0: 1, 1: 1, 2: 2})
+        self.assert_same_as_full_search(["olive oil", "egg"])
+
+    def test_results_page(self):
+        results = self.search.search(["egg", "olive oil"], limit=1, offset=1)
+        self.assertListEqual(self.names(results), ["salad"])
+        self.assertListEqual(
+            self.search.search(["olive oil", "egg"], limit=1)[0]["matched_ingredients"],
+            ["olive oil", "egg"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
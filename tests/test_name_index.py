@@ -0,0 +1,41 @@
+import unittest
+from models_common.name_index import TrigramNameIndex
+
+NAMES = [
+    "Chocolate Cake",
+    "Carrot cake",
+    "Lemon drizzle",
+    "Chocolate chip cookies",
+    "Cake pops",
+    "Ox",
+]
+
+
+class TestTrigramNameIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = TrigramNameIndex(NAMES)
+
+    def linear_search(self, query):
+        return [i for i, name in enumerate(NAMES) if query.lower() in name.lower()]
+
+    def test_search_matches_linear_scan(self):
+        for query in ["", "c", "ox", "cake", "CHOC", "late ch", "cookie", "zzz", "e p"]:
+            self.assertListEqual(self.index.search(query), self.linear_search(query), query)
+
+    def test_refined_query_filters_previous_results(self):
+        self.assertListEqual(self.index.search("ca"), [0, 1, 4])
+        self.assertListEqual(self.index.search("cak"), [0, 1, 4])
+        self.assertListEqual(self.index.search("cake p"), [4])
+        # Going back to a shorter query searches the whole index again
+        self.assertListEqual(self.index.search("co"), [0, 3])
+
+    def test_update_indexes_added_names(self):
+        index = TrigramNameIndex(NAMES[:2])
+        self.assertListEqual(index.search("choc"), [0])
+        index.update(NAMES)
+        self.assertEqual(len(index), len(NAMES))
+        self.assertListEqual(index.search("choc"), [0, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import os
+import json
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import patch
+from users import persistence
+from users.persistence import FileLock, atomic_write, file_version
+from users.saved_recipes import BBC_SOURCE, SavedRecipeStore
+from users.user_store import UserAccountStore
+
+WRITERS = 4
+WRITES = 25
+
+
+def write_concurrently(base_dir, writer):
+    saved_recipes = SavedRecipeStore(base_dir)
+    saved_recipes.compaction_threshold = 8
+    accounts = UserAccountStore(os.path.join(base_dir, "user_data.json"))
+    accounts.checkpoint_threshold = 8
+    for i in range(WRITES):
+        saved_recipes.save("jd", BBC_SOURCE, f"kept {writer} {i}")
+        saved_recipes.save("jd", BBC_SOURCE, f"deleted {writer} {i}")
+        saved_recipes.delete("jd", BBC_SOURCE, f"deleted {writer} {i}")
+        accounts.add(f"user {writer} {i}", "pass")
+        accounts.add("taken", str(writer))
+
+
+class TestPersistence(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_atomic_write_replaces_the_file(self):
+        path = os.path.join(self.base_dir, "data.json")
+        atomic_write(path, lambda file: json.dump([1], file))
+        version = file_version(path)
+        with FileLock(path):
+            atomic_write(path, lambda file: json.dump([1, 2], file))
+        self.assertNotEqual(file_version(path), version)
+        with open(path, "r", encoding="utf-8") as file:
+            self.assertListEqual(json.load(file), [1, 2])
+        self.assertListEqual(sorted(os.listdir(self.base_dir)), ["data.json", "data.json.lock"])
+
+    def test_windows_lock_gives_up_after_its_timeout(self):
+        attempts = []
+
+        def locking(fileno, mode, size):
+            attempts.append(mode)
+            if mode == "try" and len(attempts) < 3:
+                raise OSError("locked")
+
+        msvcrt = SimpleNamespace(locking=locking, LK_NBLCK="try", LK_UNLCK="unlock")
+        path = os.path.join(self.base_dir, "data.json")
+        with patch.object(persistence, "fcntl", None), patch.object(persistence, "msvcrt", msvcrt, create=True):
+            lock = FileLock(path)
+            lock.retry_delay = 0
+            with lock:
+                self.assertListEqual(attempts, ["try"] * 3)
+            self.assertEqual(attempts[-1], "unlock")
+
+            def always_locked(fileno, mode, size):
+                raise OSError("locked")
+
+            msvcrt.locking = always_locked
+            lock = FileLock(path)
+            lock.timeout = 0.05
+            lock.retry_delay = 0.01
+            with self.assertRaises(TimeoutError):
+                with lock:
+                    pass
+            self.assertTrue(lock._file.closed)
+
+    def test_concurrent_writers_lose_nothing(self):
+        with ProcessPoolExecutor(WRITERS) as executor:
+            list(executor.map(write_concurrently, [self.base_dir] * WRITERS, range(WRITERS)))
+
+        names = [recipe["name"] for recipe in SavedRecipeStore(self.base_dir).recipes("jd")]
+        self.assertEqual(len(names), WRITERS * WRITES)
+        self.assertSetEqual(
+            set(names), {f"kept {writer} {i}" for writer in range(WRITERS) for i in range(WRITES)}
+        )
+        accounts = UserAccountStore(os.path.join(self.base_dir, "user_data.json"))
+        accounts.checkpoint()
+        with open(accounts.user_data_file, "r", encoding="utf-8") as file:
+            usernames = [user["username"] for user in json.load(file)]
+        self.assertEqual(len(usernames), WRITERS * WRITES + 1)
+        self.assertEqual(len(set(usernames)), len(usernames))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from models_common.query_cache import CachedRanking, QueryCache, normalize_query
+
+
+class TestQueryCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = QueryCache(max_size=2)
+        self.computed = []
+
+    def compute(self, value):
+        def compute():
+            self.computed.append(value)
+            return value
+        return compute
+
+    def test_repeated_query_is_a_hit(self):
+        self.assertEqual(self.cache.get("bbc", 1, ("egg",), self.compute("a")), "a")
+        self.assertEqual(self.cache.get("bbc", 1, ("egg",), self.compute("b")), "a")
+        self.assertListEqual(self.computed, ["a"])
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_query_key_ignores_order_case_and_duplicates(self):
+        self.assertEqual(
+            normalize_query(["Egg ", "milk", "egg"]), normalize_query(["milk", "egg"])
+        )
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.get("bbc", 1, ("egg",), self.compute("egg"))
+        self.cache.get("bbc", 1, ("milk",), self.compute("milk"))
+        self.cache.get("bbc", 1, ("egg",), self.compute("egg again"))
+        self.cache.get("bbc", 1, ("salt",), self.compute("salt"))
+        self.cache.get("bbc", 1, ("egg",), self.compute("egg again"))
+        self.cache.get("bbc", 1, ("milk",), self.compute("milk again"))
+        self.assertListEqual(self.computed, ["egg", "milk", "salt", "milk again"])
+
+    def test_new_catalog_version_drops_entries_of_its_source(self):
+        self.cache.get("bbc", 1, ("egg",), self.compute("bbc"))
+        self.cache.get("tasty", 1, ("egg",), self.compute("tasty"))
+        self.assertEqual(self.cache.get("bbc", 2, ("egg",), self.compute("bbc 2")), "bbc 2")
+        self.assertEqual(self.cache.get("tasty", 1, ("egg",), self.compute("tasty 2")), "tasty")
+
+    def test_cached_ranking_extends_on_demand(self):
+        ranked_limits = []
+
+        def rank_matches(matched_by_recipe, limit=None, offset=0):
+            ranked_limits.append(limit)
+            return sorted(matched_by_recipe)[:limit]
+
+        ranking = CachedRanking({recipe_id: ["egg"] for recipe_id in range(10)}, rank_matches)
+        self.assertListEqual(ranking.page(2), [0, 1])
+        self.assertListEqual(ranking.page(2, 1), [1, 2])
+        self.assertListEqual(ranking.page(2, 2), [2, 3])
+        self.assertListEqual(ranking.page(), list(range(10)))
+        self.assertListEqual(ranking.page(5, 8), [8, 9])
+        self.assertListEqual(ranked_limits, [2, 4, None])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+import os
+import json
+import tempfile
+from users.saved_recipes import BBC_SOURCE, TASTY_SOURCE, SavedRecipeStore
+from models_bbc.bbc_handler import BBCFileHandler
+
+
+class TestSavedRecipeStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = self.temp_dir.name
+        self.store = SavedRecipeStore(self.base_dir)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def names(self, store, username, source=None):
+        return [recipe["name"] for recipe in store.recipes(username, source)]
+
+    def log_lines(self, username):
+        with open(self.store.log_path(username), "r", encoding="utf-8") as file:
+            return file.readlines()
+
+    def test_save_and_delete_append_to_the_user_log(self):
+        self.store.save("jd", BBC_SOURCE, "Pancakes")
+        self.store.save("jd", TASTY_SOURCE, "Pancakes")
+        self.store.save("jd", BBC_SOURCE, "Omelette")
+        self.store.save("amy", BBC_SOURCE, "Soup")
+        self.assertEqual(self.store.delete("jd", BBC_SOURCE, "Pancakes"), 1)
+        self.assertEqual(self.store.delete("jd", BBC_SOURCE, "Pancakes"), 0)
+
+        self.assertListEqual(self.names(self.store, "jd"), ["Pancakes", "Omelette"])
+        self.assertListEqual(self.names(self.store, "jd", BBC_SOURCE), ["Omelette"])
+        self.assertListEqual(self.names(self.store, "amy"), ["Soup"])
+        self.assertEqual(len(self.log_lines("jd")), 4)
+        # Another instance replays the same logs
+        self.assertListEqual(self.names(SavedRecipeStore(self.base_dir), "jd"), ["Pancakes", "Omelette"])
+
+    def test_delete_first_only(self):
+        for _ in range(3):
+            self.store.save("jd", BBC_SOURCE, "Pancakes")
+        self.assertEqual(self.store.delete("jd", BBC_SOURCE, "Pancakes", first_only=True), 1)
+        self.assertEqual(len(self.store.recipes("jd")), 2)
+        self.assertEqual(self.store.delete("jd", BBC_SOURCE, "Pancakes"), 2)
+
+    def test_changes_by_another_instance_are_read_again(self):
+        other = SavedRecipeStore(self.base_dir)
+        self.store.save("jd", BBC_SOURCE, "Pancakes")
+        self.assertListEqual(self.names(other, "jd"), ["Pancakes"])
+        self.store.save("jd", BBC_SOURCE, "Omelette with a longer name")
+        other.delete("jd", BBC_SOURCE, "Pancakes")
+        self.assertListEqual(self.names(self.store, "jd"), ["Omelette with a longer name"])
+
+    def test_log_is_compacted_once_mostly_deleted(self):
+        self.store.compaction_threshold = 4
+        self.store.save("jd", BBC_SOURCE, "Kept")
+        for i in range(3):
+            self.store.save("jd", BBC_SOURCE, f"Recipe {i}")
+            self.store.delete("jd", BBC_SOURCE, f"Recipe {i}")
+        # The header of the compacted log and the saved recipe
+        self.assertEqual(len(self.log_lines("jd")), 2)
+        self.store.save("jd", BBC_SOURCE, "Added")
+        self.assertListEqual(self.names(SavedRecipeStore(self.base_dir), "jd"), ["Kept", "Added"])
+
+    def test_log_replaced_with_the_same_inode_is_read_again(self):
+        self.store.save("jd", BBC_SOURCE, "Pancakes")
+        self.store.save("jd", BBC_SOURCE, "Omelette")
+        self.assertEqual(len(self.store.recipes("jd")), 2)
+        # As compacted by another instance into a file reusing the inode of the former log
+        with open(self.store.log_path("jd"), "w", encoding="utf-8") as file:
+            file.write('{"log": "other"}\n{"id": 1, "source": "BBC Goodfood", "name": "Omelette"}\n')
+        self.assertListEqual(self.names(self.store, "jd"), ["Omelette"])
+
+    def test_line_cut_by_a_crash_is_skipped(self):
+        self.store.save("jd", BBC_SOURCE, "Pancakes")
+        with open(self.store.log_path("jd"), "a", encoding="utf-8") as file:
+            file.write('{"id": 1, "sour')
+        self.assertListEqual(self.names(SavedRecipeStore(self.base_dir), "jd"), ["Pancakes"])
+        self.store.save("jd", BBC_SOURCE, "Omelette")
+        self.assertListEqual(self.names(SavedRecipeStore(self.base_dir), "jd"), ["Pancakes", "Omelette"])
+
+    def test_recipes_of_the_former_file_are_imported(self):
+        with open(os.path.join(self.base_dir, "saved_recipes.json"), "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "jd": [
+                        {"name": "Pancakes", "ingredients": ["egg"], "source": BBC_SOURCE},
+                        {"name": "Tacos", "instructions": [], "source": TASTY_SOURCE},
+                    ]
+                },
+                file,
+            )
+        self.assertListEqual(self.names(self.store, "jd"), ["Pancakes", "Tacos"])
+        self.store.delete("jd", TASTY_SOURCE, "Tacos")
+        self.assertListEqual(self.names(SavedRecipeStore(self.base_dir), "jd"), ["Pancakes"])
+        self.assertListEqual(self.store.recipes("amy"), [])
+
+
+
+class CatalogNames:
+    """Stands in for a BBCFileHandler holding its catalog in memory."""
+
+    store = None
+
+    def __init__(self, names):
+        self.names = names
+
+    def recipe_names(self):
+        return self.names
+
+
+class TestSavedRecipePositions(unittest.TestCase):
+    def test_saved_recipes_are_found_in_one_pass(self):
+        handler = CatalogNames(["Soup", "Pancakes", "Omelette", "Pancakes"])
+        positions = BBCFileHandler._saved_recipe_positions(handler, ["Pancakes", "Pizza", "Soup", "Pancakes"])
+        self.assertDictEqual(positions, {"Soup": 0, "Pancakes": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
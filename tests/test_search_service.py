@@ -0,0 +1,153 @@
+import unittest
+import base64
+import http.client
+import os
+import json
+import tempfile
+import threading
+from urllib.parse import urlencode
+from search_service import RecipeSearchService, is_loopback, make_server, summarize_latencies
+from users.saved_recipes import SavedRecipeStore
+from users.user_store import UserAccountStore
+
+
+class TestSearchService(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        accounts = UserAccountStore(os.path.join(cls.temp_dir.name, "user_data.json"))
+        accounts.add("jd", "secret")
+        cls.service = RecipeSearchService(saved_recipes=SavedRecipeStore(cls.temp_dir.name), accounts=accounts)
+        cls.server = make_server(cls.service, port=0)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.temp_dir.cleanup()
+
+    def request(self, method, path, params=None, body=None, login=None):
+        connection = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1], timeout=30)
+        try:
+            if params:
+                path += "?" + urlencode(params)
+            data = None if body is None else json.dumps(body)
+            headers = {}
+            if login is not None:
+                headers["Authorization"] = "Basic " + base64.b64encode(":".join(login).encode("utf-8")).decode("ascii")
+            connection.request(method, path, body=data, headers=headers)
+            response = connection.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            connection.close()
+
+    def first_recipe_name(self):
+        status, response = self.request("GET", "/names", {"source": "bbc", "query": "cake", "limit": 1})
+        self.assertEqual(status, 200)
+        return response["names"][0]
+
+    def test_search_ranks_recipes(self):
+        status, response = self.request("GET", "/search", {"source": "bbc", "ingredients": "egg, milk", "limit": 5})
+        self.assertEqual(status, 200)
+        self.assertListEqual(response["ingredients"], ["egg", "milk"])
+        self.assertEqual(len(response["results"]), 5)
+        self.assertTrue(all(result["matched_ingredients"] for result in response["results"]))
+
+    def test_names_contain_the_query(self):
+        status, response = self.request("GET", "/names", {"source": "bbc", "query": "cake", "limit": 3})
+        self.assertEqual(status, 200)
+        self.assertLessEqual(len(response["names"]), 3)
+        self.assertGreaterEqual(response["count"], len(response["names"]))
+        self.assertTrue(all("cake" in name.lower() for name in response["names"]))
+
+    def test_errors(self):
+        self.assertEqual(self.request("GET", "/recipe", {"source": "bbc", "name": "No such recipe"})[0], 404)
+        self.assertEqual(self.request("GET", "/search", {"source": "bbc"})[0], 400)
+        self.assertEqual(self.request("GET", "/search", {"source": "other", "ingredients": "egg"})[0], 400)
+        self.assertEqual(self.request("GET", "/nowhere")[0], 404)
+
+    def test_save_list_and_delete(self):
+        name = self.first_recipe_name()
+        login = ("jd", "secret")
+        status, response = self.request("POST", "/saved", body={"source": "bbc", "name": name}, login=login)
+        self.assertEqual(status, 200)
+        status, response = self.request("GET", "/saved", login=login)
+        self.assertEqual(response["user"], "jd")
+        self.assertListEqual(response["recipes"], [{"source": "bbc", "name": name}])
+        status, response = self.request("DELETE", "/saved", {"source": "bbc", "name": name}, login=login)
+        self.assertEqual(status, 200)
+        self.assertEqual(self.request("DELETE", "/saved", {"source": "bbc", "name": name}, login=login)[0], 404)
+        self.assertListEqual(self.request("GET", "/saved", login=login)[1]["recipes"], [])
+
+    def test_saved_recipes_need_a_login(self):
+        name = self.first_recipe_name()
+        self.assertEqual(self.request("GET", "/saved", {"user": "jd"})[0], 401)
+        self.assertEqual(self.request("GET", "/saved", login=("jd", "wrong"))[0], 401)
+        self.assertEqual(self.request("GET", "/saved", login=("nobody", "secret"))[0], 401)
+        status, _ = self.request("POST", "/saved", body={"user": "jd", "source": "bbc", "name": name})
+        self.assertEqual(status, 401)
+        self.assertListEqual(self.service.saved_recipes.recipes("jd"), [])
+
+    def test_connection_is_reused_after_a_refused_request(self):
+        connection = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1], timeout=30)
+        wrong_login = "Basic " + base64.b64encode(b"jd:wrong").decode("ascii")
+        try:
+            for method, path, headers in (
+                ("POST", "/saved", {"Authorization": wrong_login}),
+                ("POST", "/nowhere", {}),
+            ):
+                connection.request(method, path, body=json.dumps({"source": "bbc", "name": "x"}), headers=headers)
+                response = connection.getresponse()
+                self.assertIn(response.status, (401, 404))
+                response.read()
+                connection.request("GET", "/names?" + urlencode({"source": "bbc", "query": "cake", "limit": 1}))
+                response = connection.getresponse()
+                self.assertEqual(response.status, 200)
+                self.assertEqual(len(json.loads(response.read())["names"]), 1)
+        finally:
+            connection.close()
+
+    def test_invalid_content_length(self):
+        connection = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1], timeout=30)
+        try:
+            connection.putrequest("POST", "/saved")
+            connection.putheader("Content-Length", "many")
+            connection.endheaders()
+            response = connection.getresponse()
+            self.assertEqual(response.status, 400)
+            self.assertIn("Content-Length", json.loads(response.read())["error"])
+        finally:
+            connection.close()
+
+    def test_only_loopback_addresses_are_bound_by_default(self):
+        self.assertTrue(is_loopback("127.0.0.1"))
+        self.assertTrue(is_loopback("::1"))
+        self.assertTrue(is_loopback("localhost"))
+        self.assertFalse(is_loopback("0.0.0.0"))
+        self.assertFalse(is_loopback(""))
+        with self.assertRaises(ValueError):
+            make_server(self.service, host="0.0.0.0", port=0)
+
+    def test_stats_count_the_requests(self):
+        self.request("GET", "/names", {"source": "bbc", "query": "pie"})
+        status, response = self.request("GET", "/stats")
+        self.assertEqual(status, 200)
+        self.assertGreaterEqual(response["endpoints"]["GET /names"]["count"], 1)
+        self.assertNotIn("GET /stats", response["endpoints"])
+
+
+class TestSummarizeLatencies(unittest.TestCase):
+    def test_percentiles_in_milliseconds(self):
+        stats = summarize_latencies([i / 1000 for i in range(1, 101)], errors=2)
+        self.assertEqual(stats["count"], 100)
+        self.assertEqual(stats["errors"], 2)
+        self.assertEqual(stats["p50_ms"], 51.0)
+        self.assertEqual(stats["p99_ms"], 100.0)
+        self.assertEqual(stats["max_ms"], 100.0)
+        self.assertEqual(summarize_latencies([]), {"count": 0, "errors": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import threading
+from views.search_worker import SearchWorker
+
+
+class ImmediateRoot:
+    """Stands in for the Tk root, runs the callbacks of after() synchronously when flushed."""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, delay_ms, callback):
+        self.callbacks.append(callback)
+
+    def flush(self):
+        # Polls until the worker has nothing left to deliver, as the Tk event loop would
+        while self.callbacks:
+            self.callbacks.pop(0)()
+
+
+class TestSearchWorker(unittest.TestCase):
+    def setUp(self):
+        self.root = ImmediateRoot()
+        self.worker = SearchWorker(self.root)
+        self.worker.poll_interval_ms = 0
+        self.delivered = []
+        self.errors = []
+
+    def tearDown(self):
+        self.worker.shutdown()
+
+    def blocking_search(self, result):
+        started = threading.Event()
+        release = threading.Event()
+
+        def search():
+            started.set()
+            release.wait(5)
+            return result
+
+        return search, started, release
+
+    def test_only_the_latest_search_is_delivered(self):
+        first, started, release = self.blocking_search("first")
+        self.worker.submit(first, self.delivered.append)
+        self.assertTrue(started.wait(5))
+        # Waits for the worker behind the first one, then superseded before it starts
+        self.worker.submit(lambda: "second", self.delivered.append)
+        self.worker.submit(lambda: "third", self.delivered.append)
+        release.set()
+        self.root.flush()
+        self.assertFalse(self.worker.busy)
+        self.assertListEqual(self.delivered, ["third"])
+
+    def test_cancel_drops_the_running_search(self):
+        search, started, release = self.blocking_search("dropped")
+        self.worker.submit(search, self.delivered.append)
+        self.assertTrue(started.wait(5))
+        self.worker.cancel()
+        self.assertFalse(self.worker.busy)
+        release.set()
+        self.worker._future.result(5)
+        self.root.flush()
+        self.assertFalse(self.worker.busy)
+        self.assertListEqual(self.delivered, [])
+
+    def test_errors_are_delivered_to_on_error(self):
+        error = ValueError("broken index")
+
+        def search():
+            raise error
+
+        self.worker.submit(search, self.delivered.append, self.errors.append)
+        self.root.flush()
+        self.assertFalse(self.worker.busy)
+        self.assertListEqual(self.delivered, [])
+        self.assertListEqual(self.errors, [error])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+import os
+import json
+import tempfile
+from users.session import Session
+from users.user_data import User
+
+
+class TestSession(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.current_user_file = os.path.join(self.temp_dir.name, "current_user.json")
+        with open(self.current_user_file, "w", encoding="utf-8") as file:
+            json.dump({"username": "jd"}, file)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_current_user_is_read_once(self):
+        session = Session(self.current_user_file)
+        self.assertEqual(session.username, "jd")
+        os.remove(self.current_user_file)
+        self.assertEqual(session.username, "jd")
+
+    def test_login_writes_only_a_new_user(self):
+        session = Session(self.current_user_file)
+        session.login("amy")
+        with open(self.current_user_file, "r", encoding="utf-8") as file:
+            self.assertDictEqual(json.load(file), {"username": "amy"})
+        os.remove(self.current_user_file)
+        session.login("amy")
+        self.assertFalse(os.path.exists(self.current_user_file))
+        self.assertEqual(Session(self.current_user_file).username, None)
+
+    def test_users_share_the_session(self):
+        first, second = User(self.temp_dir.name), User(self.temp_dir.name)
+        self.assertIs(first.session, second.session)
+        first.save_current_user("amy")
+        self.assertEqual(second.get_current_user(), "amy")
+
+
+if __name__ == "__main__":
+    unittest.main()
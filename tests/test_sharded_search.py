@@ -0,0 +1,248 @@
+import json
+import os
+import tempfile
+import unittest
+from models_common import sharded_search
+from models_common.catalog import catalog_registry
+from models_bbc.bbc_handler import BBCFileHandler
+from models_bbc.bbc_index import BBCIngredientIndex
+from models_bbc.bbc_parser import BBCParser
+from models_tasty.tasty_handler import TastyHandler
+from models_tasty.tasty_index import TastyIngredientIndex
+from models_tasty.tasty_parser import TastyParser
+from models_common.query_cache import QueryCache
+from models_common.sharded_search import shard_bounds
+from models_common.snapshot import CatalogSnapshot
+from models_common.substitutions import SubstitutionMatcher
+from synthetic_catalog import SyntheticCatalog
+
+QUERIES = [
+    ["egg"],
+    ["Eggs", "olive oil"],
+    ["salt", "flour", "milk", "tomato"],
+    ["olive oil", "oil", "plain flour"],
+    [],
+]
+PAGES = [(None, 0), (2, 0), (1, 1), (2, 3), (5, 10)]
+
+
+class ShardedTestHandler:
+    """Handler of an in-memory catalog whose shard snapshots are written to a temporary folder."""
+
+    loader = None
+
+    def __init__(self, name, recipe_db, ingredient_index, snapshot_dir):
+        self.name = name
+        self.catalog = (name, recipe_db, ingredient_index, snapshot_dir)
+        self.recipe_db = recipe_db
+        self.ingredient_index = ingredient_index
+        self.substitution_matcher = SubstitutionMatcher({})
+        self.snapshot_dir = snapshot_dir
+        self.source_path = os.path.join(snapshot_dir, f"{name}.json")
+        with open(self.source_path, "w", encoding="utf-8") as file:
+            json.dump(recipe_db, file)
+
+    def refresh_catalog(self):
+        return 1
+
+    def shard_snapshot(self, start, end):
+        return CatalogSnapshot(f"{self.name}_shard_{start}_{end}", [self.source_path], self.snapshot_dir)
+
+    def catalog_arguments(self):
+        return self.catalog
+
+
+class BBCTestHandler(ShardedTestHandler):
+    def build_shard(self, start, end):
+        return BBCFileHandler.build_shard(self, start, end)
+
+
+class TastyTestHandler(ShardedTestHandler):
+    def build_shard(self, start, end):
+        return TastyHandler.build_shard(self, start, end)
+
+
+class TestShardBounds(unittest.TestCase):
+    def test_bounds_cover_the_catalog(self):
+        self.assertListEqual(shard_bounds(10, 3), [(0, 3), (3, 6), (6, 10)])
+        self.assertListEqual(shard_bounds(2, 3), [(0, 0), (0, 1), (1, 2)])
+
+
+class TestOutdatedShard(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.paths = SyntheticCatalog(20).write(self.temp_dir.name)
+
+    def tearDown(self):
+        sharded_search._shard = None
+        catalog_registry.invalidate()
+        self.temp_dir.cleanup()
+
+    def test_shard_is_built_again_from_the_files_of_the_handler(self):
+        handler = BBCFileHandler(self.paths["bbc.json"], self.paths["subs.json"], storage="json")
+        snapshot = handler.shard_snapshot(5, 12)
+        self.assertFalse(snapshot.is_current())
+        sharded_search._start_shard(
+            BBCParser, snapshot, 5, 12, "python", BBCFileHandler, handler.catalog_arguments()
+        )
+        parser, start = sharded_search._shard
+        self.assertEqual(start, 5)
+        self.assertListEqual(parser.handler.recipe_db, list(SyntheticCatalog(20).bbc_recipes())[5:12])
+        self.assertTrue(snapshot.is_current())
+
+    def test_tasty_shard_is_built_again_from_the_files_of_the_handler(self):
+        handler = TastyHandler(
+            self.paths["tasty.json"], self.paths["url.json"], self.paths["subs.json"], storage="json"
+        )
+        sharded_search._start_shard(
+            TastyParser, handler.shard_snapshot(0, 4), 0, 4, "python", TastyHandler, handler.catalog_arguments()
+        )
+        parser, _ = sharded_search._shard
+        self.assertListEqual(parser.handler.ingredient_index.recipe_names, handler.recipe_names()[:4])
+
+
+class TestBBCShardedSearch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        recipe_db = [
+            {"name": "pancakes", "ingredients": ["200g plain flour", "2 eggs", "milk"]},
+            {"name": "salad", "ingredients": ["2 tomatoes", "olive oil"]},
+            {"name": "omelette", "ingredients": ["3 eggs", "salt", "olive oil"]},
+            {"name": "flatbread", "ingredients": ["flour", "oil", "salt"]},
+            {"name": "boiled egg", "ingredients": ["1 egg"]},
+            {"name": "water", "ingredients": []},
+            {"name": "scrambled eggs", "ingredients": ["2 eggs", "milk", "salt"]},
+        ]
+        handler = BBCTestHandler("bbc", recipe_db, BBCIngredientIndex(recipe_db), cls.temp_dir.name)
+        cls.parser = BBCParser(handler)
+        cls.parser.query_cache = QueryCache()
+        cls.sharded_parser = BBCParser(handler)
+        cls.sharded_parser.query_cache = QueryCache()
+        cls.sharded_parser.start_shards(3)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.sharded_parser.stop_shards()
+        cls.temp_dir.cleanup()
+
+    def results(self, matches):
+        return [(match["name"], match["matched_ingredients"], match["total_ingredients"]) for match in matches]
+
+    def test_same_ranking_as_a_single_process(self):
+        for query in QUERIES:
+            for limit, offset in PAGES:
+                self.assertListEqual(
+                    self.results(self.sharded_parser.find_matching_recipes(query, limit, offset)),
+                    self.results(self.parser.find_matching_recipes(query, limit, offset)),
+                )
+
+    def test_same_batch_as_a_single_process(self):
+        for limit, offset in PAGES:
+            self.assertListEqual(
+                [self.results(matches) for matches in self.sharded_parser.find_matching_recipes_batch(QUERIES, limit, offset)],
+                [self.results(matches) for matches in self.parser.find_matching_recipes_batch(QUERIES, limit, offset)],
+            )
+
+    def test_every_shard_has_a_current_snapshot(self):
+        handler = self.parser.handler
+        for start, end in shard_bounds(len(handler.recipe_db), 3):
+            self.assertTrue(handler.shard_snapshot(start, end).is_current())
+
+
+class TestTastyShardedSearch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        recipe_db = {
+            "pancakes": {
+                "ingredient_sections": [
+                    {"ingredients": [{"name": "Flour"}, {"name": "eggs"}, {"name": "milk"}]}
+                ]
+            },
+            "omelette": {"ingredient_sections": [{"ingredients": [{"name": "egg"}, {"name": "salt"}]}]},
+            "salad": {"ingredient_sections": [{"ingredients": [{"name": "tomato"}, {"name": "olive oil"}]}]},
+            "dressing": {"ingredient_sections": [{"ingredients": [{"name": "oil"}, {"name": "salt"}]}]},
+            "crepes": {"ingredient_sections": [{"ingredients": [{"name": "flour"}, {"name": "milk"}]}]},
+        }
+        handler = TastyTestHandler("tasty", recipe_db, TastyIngredientIndex(recipe_db), cls.temp_dir.name)
+        cls.parser = TastyParser(handler)
+        cls.parser.query_cache = QueryCache()
+        cls.sharded_parser = TastyParser(handler)
+        cls.sharded_parser.query_cache = QueryCache()
+        cls.sharded_parser.start_shards(2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.sharded_parser.stop_shards()
+        cls.temp_dir.cleanup()
+
+    def results(self, matches):
+        return [(match[0], match[1], match[2], match[4]) for match in matches]
+
+    def test_same_ranking_as_a_single_process(self):
+        for query in QUERIES:
+            for limit, offset in PAGES:
+                self.assertListEqual(
+                    self.results(self.sharded_parser.get_matches(query, limit, offset)),
+                    self.results(self.parser.get_matches(query, limit, offset)),
+                )
+        for limit, offset in PAGES:
+            self.assertListEqual(
+                [self.results(matches) for matches in self.sharded_parser.get_matches_batch(QUERIES, limit, offset)],
+                [self.results(matches) for matches in self.parser.get_matches_batch(QUERIES, limit, offset)],
+            )
+
+
+
+class TestTastyShardedSearchWithDuplicateNames(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        rows = [
+            ("A", ["egg", "milk"]),
+            ("Dup", ["egg"]),
+            ("B", ["flour", "egg", "salt"]),
+            ("Dup", ["tomato", "olive oil"]),
+            ("C", ["egg", "oil"]),
+            ("D", ["milk"]),
+        ]
+        # Streamed, the duplicated name keeps both its rows
+        paths = {name: os.path.join(cls.temp_dir.name, name) for name in ("tasty.jsonl", "url.json", "subs.json")}
+        with open(paths["tasty.jsonl"], "w", encoding="utf-8") as file:
+            for name, ingredients in rows:
+                sections = [{"ingredients": [{"name": ingredient} for ingredient in ingredients]}]
+                file.write(json.dumps({"name": name, "ingredient_sections": sections}) + "\n")
+        for name in ("url.json", "subs.json"):
+            with open(paths[name], "w", encoding="utf-8") as file:
+                json.dump([], file)
+        handler = TastyHandler(paths["tasty.jsonl"], paths["url.json"], paths["subs.json"], storage="stream")
+        handler.loader.wait()
+        cls.parser = TastyParser(handler)
+        cls.parser.query_cache = QueryCache()
+        cls.sharded_parser = TastyParser(handler)
+        cls.sharded_parser.query_cache = QueryCache()
+        cls.sharded_parser.start_shards(2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.sharded_parser.stop_shards()
+        cls.parser.handler.recipe_db.records.close()
+        catalog_registry.invalidate()
+        cls.temp_dir.cleanup()
+
+    def results(self, matches):
+        return [(match[0], match[2], match[4]) for match in matches]
+
+    def test_same_ranking_as_a_single_process(self):
+        self.assertEqual(self.results(self.parser.get_matches(["egg"], 1))[0][0], "Dup")
+        for query in QUERIES + [["olive oil", "tomato"]]:
+            for limit, offset in PAGES:
+                self.assertListEqual(
+                    self.results(self.sharded_parser.get_matches(query, limit, offset)),
+                    self.results(self.parser.get_matches(query, limit, offset)),
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
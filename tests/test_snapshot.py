@@ -0,0 +1,69 @@
+import unittest
+import os
+import json
+import tempfile
+from models_common.snapshot import CatalogSnapshot
+from models_bbc.bbc_index import BBCIngredientIndex
+
+
+class TestCatalogSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source_path = os.path.join(self.temp_dir.name, "bbc.json")
+        self.write_source([{"name": "pancakes", "ingredients": ["2 eggs", "milk"]}])
+        self.snapshot = CatalogSnapshot(
+            "bbc", [self.source_path], os.path.join(self.temp_dir.name, "snapshots")
+        )
+        self.build_count = 0
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_source(self, recipes):
+        with open(self.source_path, "w", encoding="utf-8") as file:
+            json.dump(recipes, file)
+
+    def build(self):
+        self.build_count += 1
+        with open(self.source_path, "r", encoding="utf-8") as file:
+            recipes = json.load(file)
+        return {"recipes": recipes, "ingredient_index": BBCIngredientIndex(recipes)}
+
+    def test_snapshot_is_loaded_instead_of_rebuilt(self):
+        built = self.snapshot.load_or_build(self.build)
+        loaded = self.snapshot.load_or_build(self.build)
+        self.assertEqual(self.build_count, 1)
+        self.assertListEqual(loaded["recipes"], built["recipes"])
+        self.assertSetEqual(loaded["ingredient_index"].candidates("egg"), {0})
+
+    def test_changed_source_invalidates_snapshot(self):
+        self.snapshot.load_or_build(self.build)
+        self.write_source([{"name": "salad", "ingredients": ["olive oil"]}])
+        catalog = self.snapshot.load_or_build(self.build)
+        self.assertEqual(self.build_count, 2)
+        self.assertEqual(catalog["recipes"][0]["name"], "salad")
+
+    def test_touched_source_with_same_content_is_still_valid(self):
+        self.snapshot.load_or_build(self.build)
+        stat = os.stat(self.source_path)
+        os.utime(self.source_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertIsNotNone(self.snapshot.load())
+
+    def test_is_current_follows_the_sources(self):
+        self.assertFalse(self.snapshot.is_current())
+        self.snapshot.load_or_build(self.build)
+        self.assertTrue(self.snapshot.is_current())
+        self.write_source([{"name": "salad", "ingredients": ["olive oil"]}])
+        self.assertFalse(self.snapshot.is_current())
+
+    def test_corrupted_snapshot_is_rebuilt(self):
+        self.snapshot.load_or_build(self.build)
+        with open(self.snapshot.path, "wb") as file:
+            file.write(b"not a pickle")
+        self.assertIsNone(self.snapshot.load())
+        self.snapshot.load_or_build(self.build)
+        self.assertEqual(self.build_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
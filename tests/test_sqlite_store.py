@@ -0,0 +1,102 @@
+import unittest
+import os
+import json
+import tempfile
+from models_common.snapshot import describe_sources
+from models_common.sqlite_store import SQLiteCatalogStore, catalog_source, StoredRecipeList, StoredRecipeMapping
+from models_tasty.tasty_index import TastyIngredientIndex
+
+
+class TestSQLiteCatalogStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source_path = os.path.join(self.temp_dir.name, "bbc.json")
+        self.recipes = [
+            {"name": "Classic pancakes", "ingredients": ["200g plain flour", "2 eggs"]},
+            {"name": "Tomato salad", "ingredients": ["2 tomatoes"]},
+            {"name": "Pancake stack", "ingredients": ["flour", "milk"]},
+        ]
+        with open(self.source_path, "w", encoding="utf-8") as file:
+            json.dump(self.recipes, file)
+        self.store = SQLiteCatalogStore(os.path.join(self.temp_dir.name, "catalog.sqlite3"))
+        self.store.import_recipes(
+            "bbc",
+            describe_sources([self.source_path]),
+            ((recipe["name"], recipe) for recipe in self.recipes),
+        )
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_import_is_current_until_source_changes(self):
+        self.assertTrue(self.store.is_current("bbc", [self.source_path]))
+        self.assertFalse(self.store.is_current("tasty", [self.source_path]))
+        with open(self.source_path, "w", encoding="utf-8") as file:
+            json.dump(self.recipes[:1], file)
+        self.assertFalse(self.store.is_current("bbc", [self.source_path]))
+
+    def test_catalogs_of_other_files_are_kept_apart(self):
+        other_path = os.path.join(self.temp_dir.name, "other", "bbc.json")
+        os.makedirs(os.path.dirname(other_path))
+        with open(other_path, "w", encoding="utf-8") as file:
+            json.dump(self.recipes[:1], file)
+        source = catalog_source("bbc", self.source_path)
+        other_source = catalog_source("bbc", other_path)
+        self.assertNotEqual(source, other_source)
+        self.assertEqual(source, catalog_source("bbc", os.path.join(self.temp_dir.name, ".", "bbc.json")))
+        for path, recipes in ((self.source_path, self.recipes), (other_path, self.recipes[:1])):
+            self.store.import_recipes(
+                catalog_source("bbc", path),
+                describe_sources([path]),
+                ((recipe["name"], recipe) for recipe in recipes),
+            )
+        self.assertTrue(self.store.is_current(source, [self.source_path]))
+        self.assertTrue(self.store.is_current(other_source, [other_path]))
+        self.assertEqual(len(StoredRecipeList(self.store, source)), 3)
+        self.assertEqual(len(StoredRecipeList(self.store, other_source)), 1)
+
+    def test_recipes_are_read_on_access(self):
+        recipes = StoredRecipeList(self.store, "bbc")
+        self.assertEqual(len(recipes), 3)
+        self.assertDictEqual(recipes[1], self.recipes[1])
+        self.assertDictEqual(recipes[-1], self.recipes[2])
+        self.assertListEqual(list(recipes), self.recipes)
+        self.assertListEqual(
+            [recipe["name"] for recipe in StoredRecipeList(self.store, "bbc", with_name=True)],
+            [recipe["name"] for recipe in self.recipes],
+        )
+        with self.assertRaises(IndexError):
+            recipes[3]
+
+    def test_find_position(self):
+        self.assertEqual(self.store.find_position_by_key("bbc", "  tomato SALAD "), 1)
+        self.assertIsNone(self.store.find_position_by_key("bbc", "tomato"))
+        self.assertEqual(self.store.find_position("bbc", "Tomato salad"), 1)
+        self.assertIsNone(self.store.find_position("bbc", "tomato salad"))
+
+    def test_search_names_matches_substrings(self):
+        self.assertListEqual(self.store.search_names("bbc", "PANCAKE"), [0, 2])
+        self.assertListEqual(self.store.search_names("bbc", "to"), [1])
+        self.assertListEqual(self.store.search_names("bbc", "e s"), [2])
+        self.assertListEqual(self.store.search_names("bbc", "%"), [])
+        self.assertListEqual(self.store.search_names("bbc", ""), [0, 1, 2])
+
+    def test_mapping_builds_tasty_index(self):
+        self.store.import_recipes(
+            "tasty",
+            {},
+            [
+                ("Omelette", {"ingredient_sections": [{"ingredients": [{"name": "Eggs"}]}]}),
+                ("Toast", {"ingredient_sections": [{"ingredients": [{"name": "bread"}]}]}),
+            ],
+        )
+        recipes = StoredRecipeMapping(self.store, "tasty")
+        self.assertListEqual(list(recipes), ["Omelette", "Toast"])
+        self.assertIsNone(recipes.get("Pizza"))
+        index = TastyIngredientIndex(recipes)
+        self.assertListEqual(index.ingredient_names, [["eggs"], ["bread"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
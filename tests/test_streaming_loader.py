@@ -0,0 +1,119 @@
+import unittest
+import os
+import json
+import tempfile
+from models_common.streaming_loader import (
+    FileRecordList,
+    FileRecordMapping,
+    NamedRecordList,
+    StreamingCatalogLoader,
+    iter_json_records,
+    read_json_record,
+)
+from models_bbc.bbc_index import BBCIngredientIndex
+from models_common.catalog import catalog_registry
+from models_tasty.tasty_handler import TastyHandler
+from synthetic_catalog import SyntheticCatalog
+
+
+class TestStreamingLoader(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.recipes = [
+            {"name": "Crème brûlée", "ingredients": ["4 egg yolks", "double cream"]},
+            {"name": "Tomato salad", "ingredients": ["2 tomatoes", "olive oil"], "servings": 2.5},
+            {"name": "Omelette", "ingredients": ["3 eggs"], "steps": ["Whisk", "Fry"]},
+        ]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, file_name, text):
+        path = os.path.join(self.temp_dir.name, file_name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+        return path
+
+    def test_array_is_parsed_across_chunks(self):
+        path = self.write("bbc.json", json.dumps(self.recipes, indent=4, ensure_ascii=False))
+        records = list(iter_json_records(path, chunk_size=7))
+        self.assertListEqual([value for _, value, _, _ in records], self.recipes)
+        with open(path, "rb") as file:
+            for key, value, offset, length in records:
+                self.assertIsNone(key)
+                self.assertDictEqual(read_json_record(file, offset, length), value)
+
+    def test_object_members_and_json_lines(self):
+        by_name = {recipe["name"]: recipe for recipe in self.recipes}
+        path = self.write("tasty.json", json.dumps(by_name, ensure_ascii=False))
+        records = list(iter_json_records(path, chunk_size=5))
+        self.assertListEqual([(key, value) for key, value, _, _ in records], list(by_name.items()))
+
+        lines = "\n".join(json.dumps(recipe, ensure_ascii=False) for recipe in self.recipes)
+        path = self.write("bbc.jsonl", lines + "\n\n")
+        self.assertListEqual([value for _, value, _, _ in iter_json_records(path)], self.recipes)
+        self.assertListEqual(list(iter_json_records(self.write("empty.json", " [ ] "))), [])
+
+    def test_invalid_catalog_raises(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_records(self.write("broken.json", '[{"name": "a"} {"name": "b"}]')))
+        with self.assertRaises(ValueError):
+            list(iter_json_records(self.write("truncated.json", '[{"name": "a"}, {"na')))
+
+    def test_loader_feeds_index_and_lazy_records(self):
+        path = self.write("bbc.json", json.dumps(self.recipes))
+        recipes = FileRecordList(path)
+        index = BBCIngredientIndex()
+
+        def add_recipe(_, recipe, offset, length):
+            recipes.append(offset, length)
+            index.add(recipe)
+
+        loader = StreamingCatalogLoader(path, add_recipe).start()
+        self.assertTrue(loader.wait(5))
+        self.assertEqual(loader.count, 3)
+        self.assertSetEqual(index.candidates("egg"), {0, 2})
+        self.assertDictEqual(recipes[1], self.recipes[1])
+        self.assertListEqual(list(recipes), self.recipes)
+        recipes.close()
+
+    def test_record_mapping(self):
+        path = self.write("tasty.json", json.dumps({r["name"]: r for r in self.recipes}))
+        recipes = FileRecordMapping(path)
+        for name, recipe, offset, length in iter_json_records(path):
+            recipes.add(name, offset, length)
+        self.assertListEqual(list(recipes), [recipe["name"] for recipe in self.recipes])
+        self.assertDictEqual(recipes["Omelette"], self.recipes[2])
+        self.assertIsNone(recipes.get("Pizza"))
+        rows = NamedRecordList(recipes)
+        self.assertDictEqual(rows[-1], {**self.recipes[2], "name": "Omelette"})
+        self.assertListEqual([row["name"] for row in rows], list(recipes))
+        recipes.records.close()
+
+    def test_streamed_tasty_recipes_list(self):
+        paths = SyntheticCatalog(30).write(self.temp_dir.name)
+        handler = TastyHandler(paths["tasty.json"], paths["url.json"], paths["subs.json"], storage="stream")
+        try:
+            # Registered before the catalog is loaded, the list still sees every recipe
+            recipes = handler.load_tasty_recipes()
+            self.assertTrue(handler.loader.wait(5))
+            self.assertIs(handler.load_tasty_recipes(), recipes)
+            self.assertEqual(len(recipes), 30)
+            names = handler.recipe_names()
+            query = names[12].split()[-1].lower()
+            positions = handler.search_recipe_names(query)
+            self.assertIn(12, positions)
+            # The lookup of the All Recipes window
+            expected = dict(SyntheticCatalog(30).tasty_recipes())
+            for position in positions:
+                self.assertEqual(recipes[position]["name"], names[position])
+                self.assertListEqual(
+                    recipes[position]["instructions"], expected[names[position]]["instructions"]
+                )
+        finally:
+            handler.recipe_db.records.close()
+            catalog_registry.invalidate()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import random
+from models_common.substitutions import SubstitutionMatcher, LazySubstitutions
+
+
+class TestSubstitutionMatcher(unittest.TestCase):
+    def setUp(self):
+        self.substitutions_db = {
+            "brown sugar": ["white sugar", "honey"],
+            "sugar": ["honey"],
+            "butter": ["margarine"],
+            "cream cheese": ["ricotta"],
+        }
+        self.matcher = SubstitutionMatcher(self.substitutions_db)
+
+    def scan(self, substitutions_db, ingredient):
+        for sub, sub_list in substitutions_db.items():
+            if sub in ingredient or ingredient in sub:
+                return sub_list
+
+    def test_item_inside_ingredient(self):
+        self.assertListEqual(self.matcher.lookup("100g light brown sugar"), ["white sugar", "honey"])
+        self.assertListEqual(self.matcher.lookup("caster sugar"), ["honey"])
+        self.assertListEqual(self.matcher.lookup("50g unsalted butter, softened"), ["margarine"])
+
+    def test_ingredient_inside_item(self):
+        self.assertListEqual(self.matcher.lookup("cream"), ["ricotta"])
+        self.assertListEqual(self.matcher.lookup("brown"), ["white sugar", "honey"])
+
+    def test_ingredients_inside_long_items(self):
+        item = "".join(chr(ord("a") + i % 26) for i in range(5000))
+        other = "".join(chr(ord("z") - i % 26) for i in range(5000))
+        substitutions_db = {"sugar": ["honey"], item: ["long"], other: ["other"]}
+        matcher = SubstitutionMatcher(substitutions_db)
+        for ingredient in (item[1234:2345], other[10:3000], "zyx", "abc", "sug", "qz", item):
+            self.assertEqual(matcher.lookup(ingredient), self.scan(substitutions_db, ingredient))
+        self.assertListEqual(matcher.lookup(item[1234:2345]), ["long"])
+        self.assertIsNone(matcher.lookup("zz"))
+
+    def test_no_match(self):
+        self.assertIsNone(self.matcher.lookup("2 eggs"))
+        self.assertIsNone(SubstitutionMatcher({}).lookup("2 eggs"))
+
+    def test_first_match_matches_scan(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            items = ["".join(rng.choice("abc") for _ in range(rng.randint(0, 4))) for _ in range(6)]
+            substitutions_db = {item: [item] for item in items}
+            matcher = SubstitutionMatcher(substitutions_db)
+            for _ in range(20):
+                ingredient = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 6)))
+                self.assertEqual(
+                    matcher.lookup(ingredient), self.scan(substitutions_db, ingredient)
+                )
+
+
+class TestLazySubstitutions(unittest.TestCase):
+    def test_resolved_once_on_first_read(self):
+        calls = []
+
+        def compute(ingredients):
+            calls.append(ingredients)
+            return {ingredient: ["honey"] for ingredient in ingredients}
+
+        substitutions = LazySubstitutions(compute, ["sugar"])
+        self.assertFalse(substitutions.resolved)
+        self.assertListEqual(calls, [])
+
+        self.assertDictEqual(dict(substitutions), {"sugar": ["honey"]})
+        self.assertListEqual(substitutions["sugar"], ["honey"])
+        self.assertIs(substitutions.resolve(), substitutions.resolve())
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
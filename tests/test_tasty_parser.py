@@ -1,12 +1,15 @@
 import unittest
 from unittest.mock import patch
 from models_tasty.tasty_parser import TastyParser
+from models_tasty.tasty_index import TastyIngredientIndex
+from models_common.query_cache import QueryCache
 import re
 
 
 class TestRecipeFinder(unittest.TestCase):
     def setUp(self):
         self.tasty_parser = TastyParser()
+        self.tasty_parser.query_cache = QueryCache()
 
     def test_parse_ingredients(self):
         result = self.tasty_parser.parse_ingredients("flour, tomato", "cheese")
@@ -58,6 +61,35 @@ class TestRecipeFinder(unittest.TestCase):
         self.assertEqual(matches_count, 2)
         self.assertListEqual(matched_ingredients, ["flour", "sugar"])
 
+    def test_get_matches(self):
+        recipe_db = {
+            "pancakes": {
+                "ingredient_sections": [
+                    {"ingredients": [{"name": "Flour"}, {"name": "eggs"}, {"name": "milk"}]}
+                ]
+            },
+            "omelette": {
+                "ingredient_sections": [{"ingredients": [{"name": "egg"}, {"name": "salt"}]}]
+            },
+            "salad": {"ingredient_sections": [{"ingredients": [{"name": "lettuce"}]}]},
+        }
+        self.tasty_parser.handler.recipe_db = recipe_db
+        self.tasty_parser.handler.ingredient_index = TastyIngredientIndex(recipe_db)
+
+        matches = self.tasty_parser.get_matches(["milk", "eggs", "flour"])
+        self.assertListEqual([match[0] for match in matches], ["pancakes", "omelette"])
+        name, ratio, matched_ingredients, substitutions, total = matches[0]
+        self.assertEqual(ratio, 1.0)
+        self.assertListEqual(matched_ingredients, ["milk", "eggs", "flour"])
+        self.assertDictEqual(dict(substitutions), {})
+        self.assertEqual(total, 3)
+        self.assertEqual(matches[1][1], 0.5)
+        self.assertListEqual(
+            [match[0] for match in self.tasty_parser.get_matches(["eggs"], limit=1, offset=1)],
+            ["pancakes"],
+        )
+        self.assertListEqual(self.tasty_parser.get_matches(["rice"]), [])
+
     def test_extract_ingredient_names(self):
         recipe_data = {
             "ingredient_sections": [
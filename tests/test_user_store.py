@@ -0,0 +1,73 @@
+import unittest
+import os
+import json
+import tempfile
+from users.user_store import UserAccountStore
+
+
+class TestUserAccountStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.user_data_file = os.path.join(self.temp_dir.name, "user_data.json")
+        with open(self.user_data_file, "w", encoding="utf-8") as file:
+            json.dump([{"username": "jd", "password": "1234"}], file)
+        self.store = UserAccountStore(self.user_data_file)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read_user_data(self):
+        with open(self.user_data_file, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def test_added_users_are_journaled(self):
+        self.store.add("amy", "secret")
+        self.assertTrue(self.store.exists("amy"))
+        self.assertTrue(self.store.check_login("jd", "1234"))
+        self.assertTrue(self.store.check_login("amy", "secret"))
+        self.assertFalse(self.store.check_login("amy", "1234"))
+        self.assertEqual(len(self.read_user_data()), 1)
+        # Another instance reads the journal too
+        self.assertTrue(UserAccountStore(self.user_data_file).check_login("amy", "secret"))
+
+    def test_journal_is_checkpointed_into_user_data(self):
+        self.store.checkpoint_threshold = 3
+        for i in range(3):
+            self.store.add(f"user {i}", "pass")
+        self.assertFalse(os.path.exists(self.store.journal_file))
+        self.assertListEqual(
+            [user["username"] for user in self.read_user_data()], ["jd", "user 0", "user 1", "user 2"]
+        )
+        self.store.add("amy", "secret")
+        self.assertTrue(UserAccountStore(self.user_data_file).exists("user 1"))
+        self.assertTrue(UserAccountStore(self.user_data_file).exists("amy"))
+
+    def test_changes_by_another_instance_are_read_again(self):
+        other = UserAccountStore(self.user_data_file)
+        self.assertFalse(other.exists("amy"))
+        self.store.add("amy", "secret")
+        self.assertTrue(other.exists("amy"))
+
+    def test_journal_started_over_with_the_same_inode_is_read_again(self):
+        self.store.add("amy", "secret")
+        self.store.add("bob", "secret")
+        # As checkpointed by another instance, read before its journal was emptied
+        with open(self.user_data_file, "w", encoding="utf-8") as file:
+            json.dump([{"username": name, "password": "1234"} for name in ("jd", "amy", "bob")], file)
+        self.assertTrue(self.store.exists("bob"))
+        # The new journal reuses the inode of the former one
+        with open(self.store.journal_file, "w", encoding="utf-8") as file:
+            file.write(json.dumps({"username": "cy", "password": "1234"}) + "\n")
+        self.assertTrue(self.store.exists("cy"))
+
+    def test_accounts_in_user_data_and_journal_count_once(self):
+        # As left by a crash between writing user_data.json and emptying the journal
+        with open(self.store.journal_file, "w", encoding="utf-8") as file:
+            file.write(json.dumps({"username": "jd", "password": "1234"}) + "\n")
+            file.write('{"username": "cut')
+        self.store.checkpoint()
+        self.assertListEqual(self.read_user_data(), [{"username": "jd", "password": "1234"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
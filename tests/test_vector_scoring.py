@@ -0,0 +1,154 @@
+import unittest
+from unittest.mock import MagicMock
+from models_bbc.bbc_parser import BBCParser
+from models_bbc.bbc_index import BBCIngredientIndex
+from models_tasty.tasty_parser import TastyParser
+from models_tasty.tasty_index import TastyIngredientIndex
+from models_common.substitutions import SubstitutionMatcher
+from models_common.query_cache import QueryCache
+from models_common.vector_scoring import IncidenceMatrix, numpy_available, shared_matrix
+
+QUERIES = [
+    ["egg"],
+    ["Eggs", "olive oil"],
+    ["salt", "flour", "milk", "tomato"],
+    ["olive oil", "oil", "plain flour"],
+    ["rice"],
+    [],
+]
+PAGES = [(None, 0), (2, 0), (1, 1), (2, 3), (5, 10)]
+
+
+@unittest.skipIf(not numpy_available(), "numpy is not installed")
+class TestIncidenceMatrix(unittest.TestCase):
+    def setUp(self):
+        postings = {"egg": [0, 1, 3], "milk": [1, 2, 3], "salt": [3]}
+        self.matrix = IncidenceMatrix(postings, [2, 2, 1, 4], count_breaks_ties=True)
+
+    def test_rows_are_the_union_of_the_columns(self):
+        self.assertListEqual(self.matrix.rows(["egg", "milk", "unknown"]).tolist(), [0, 1, 2, 3])
+        self.assertListEqual(self.matrix.rows(["salt"]).tolist(), [3])
+        self.assertListEqual(self.matrix.rows(["unknown"]).tolist(), [])
+
+    def test_rank_matches_the_python_order(self):
+        recipe_ids, counts = self.matrix.score([self.matrix.column("egg"), self.matrix.column("milk")])
+        self.assertListEqual(counts.tolist(), [1, 2, 1, 2])
+        # 1.0 for recipes 1 and 2, tied on proportion and ordered by count, then 0.5 for 0 and 3
+        self.assertListEqual(self.matrix.rank(recipe_ids, counts), [1, 2, 3, 0])
+        self.assertListEqual(self.matrix.rank(recipe_ids, counts, limit=1), [1])
+        self.assertListEqual(self.matrix.rank(recipe_ids, counts, limit=2, offset=2), [3, 0])
+        self.assertListEqual(self.matrix.rank(recipe_ids, counts, limit=2, offset=4), [])
+        self.matrix.count_breaks_ties = False
+        self.assertListEqual(self.matrix.rank(recipe_ids, counts, limit=3), [1, 2, 0])
+
+    def test_score_batch_is_score_of_every_query(self):
+        queries = [[self.matrix.column("egg")], [], [self.matrix.column("milk"), self.matrix.column("salt")]]
+        self.matrix.batch_cells = 8
+        for (recipe_ids, counts), term_rows in zip(self.matrix.score_batch(queries), queries):
+            expected_ids, expected_counts = self.matrix.score(term_rows)
+            self.assertListEqual(recipe_ids.tolist(), expected_ids.tolist())
+            self.assertListEqual(counts.tolist(), expected_counts.tolist())
+
+    def test_shared_matrix_is_built_again_once_the_index_grew(self):
+        index = BBCIngredientIndex([{"ingredients": ["egg"]}])
+        build = MagicMock(side_effect=lambda: IncidenceMatrix(index.postings, index.total_ingredients))
+        first = shared_matrix(index, 1, build)
+        self.assertIs(shared_matrix(index, 1, build), first)
+        self.assertIsNot(shared_matrix(index, 2, build), first)
+        self.assertEqual(build.call_count, 2)
+
+
+@unittest.skipIf(not numpy_available(), "numpy is not installed")
+class TestBBCNumpyEngine(unittest.TestCase):
+    def setUp(self):
+        recipe_db = [
+            {"name": "pancakes", "ingredients": ["200g plain flour", "2 eggs", "milk"]},
+            {"name": "salad", "ingredients": ["2 tomatoes", "olive oil"]},
+            {"name": "omelette", "ingredients": ["3 eggs", "salt", "olive oil"]},
+            {"name": "flatbread", "ingredients": ["flour", "oil", "salt"]},
+            {"name": "boiled egg", "ingredients": ["1 egg"]},
+            {"name": "water", "ingredients": []},
+        ]
+        index = BBCIngredientIndex(recipe_db)
+        self.parsers = {}
+        for engine in ("python", "numpy"):
+            parser = BBCParser()
+            parser.handler = MagicMock()
+            parser.handler.recipe_db = recipe_db
+            parser.handler.ingredient_index = index
+            parser.handler.substitution_matcher = SubstitutionMatcher({})
+            parser.handler.loader = None
+            parser.query_cache = QueryCache()
+            parser.engine = engine
+            self.parsers[engine] = parser
+
+    def results(self, matches):
+        return [(match["name"], match["matched_ingredients"], match["total_ingredients"]) for match in matches]
+
+    def test_same_ranking_as_the_python_engine(self):
+        self.assertIsNotNone(self.parsers["numpy"].incidence_matrix())
+        for query in QUERIES:
+            for limit, offset in PAGES:
+                self.assertListEqual(
+                    self.results(self.parsers["numpy"].find_matching_recipes(query, limit, offset)),
+                    self.results(self.parsers["python"].find_matching_recipes(query, limit, offset)),
+                )
+
+    def test_same_batch_as_the_python_engine(self):
+        for limit, offset in PAGES:
+            numpy_batch = self.parsers["numpy"].find_matching_recipes_batch(QUERIES, limit, offset)
+            python_batch = self.parsers["python"].find_matching_recipes_batch(QUERIES, limit, offset)
+            self.assertListEqual(
+                [self.results(matches) for matches in numpy_batch],
+                [self.results(matches) for matches in python_batch],
+            )
+
+    def test_python_engine_while_the_catalog_loads(self):
+        self.parsers["numpy"].handler.loader = MagicMock(loading=True)
+        self.assertIsNone(self.parsers["numpy"].incidence_matrix())
+
+
+@unittest.skipIf(not numpy_available(), "numpy is not installed")
+class TestTastyNumpyEngine(unittest.TestCase):
+    def setUp(self):
+        recipe_db = {
+            "pancakes": {
+                "ingredient_sections": [
+                    {"ingredients": [{"name": "Flour"}, {"name": "eggs"}, {"name": "milk"}]}
+                ]
+            },
+            "omelette": {"ingredient_sections": [{"ingredients": [{"name": "egg"}, {"name": "salt"}]}]},
+            "salad": {"ingredient_sections": [{"ingredients": [{"name": "tomato"}, {"name": "olive oil"}]}]},
+            "dressing": {"ingredient_sections": [{"ingredients": [{"name": "oil"}, {"name": "salt"}]}]},
+        }
+        index = TastyIngredientIndex(recipe_db)
+        self.parsers = {}
+        for engine in ("python", "numpy"):
+            parser = TastyParser()
+            parser.handler = MagicMock()
+            parser.handler.recipe_db = recipe_db
+            parser.handler.ingredient_index = index
+            parser.handler.loader = None
+            parser.query_cache = QueryCache()
+            parser.engine = engine
+            self.parsers[engine] = parser
+
+    def results(self, matches):
+        return [(match[0], match[1], match[2], match[4]) for match in matches]
+
+    def test_same_ranking_as_the_python_engine(self):
+        for query in QUERIES:
+            for limit, offset in PAGES:
+                self.assertListEqual(
+                    self.results(self.parsers["numpy"].get_matches(query, limit, offset)),
+                    self.results(self.parsers["python"].get_matches(query, limit, offset)),
+                )
+                numpy_batch = self.parsers["numpy"].get_matches_batch([query], limit, offset)[0]
+                self.assertListEqual(
+                    self.results(numpy_batch),
+                    self.results(self.parsers["python"].get_matches(query, limit, offset)),
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
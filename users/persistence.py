@@ -0,0 +1,133 @@
+import os
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """
+    Advisory lock of a users file, held by one writer at a time across processes.
+
+    The lock is taken on a separate path + ".lock" file, so the file itself can be
+    replaced while the lock is held. Writers of every instance of the application
+    sharing the users directory must take it, readers do not need to: files are only
+    ever appended to or replaced whole.
+    """
+
+    # Seconds a writer waits for the lock on Windows before giving up
+    timeout = 10
+    retry_delay = 0.05
+
+    def __init__(self, path):
+        self.lock_path = path + ".lock"
+        self._file = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.lock_path)), exist_ok=True)
+        self._file = open(self.lock_path, "a+b")
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            else:
+                self._lock_windows()
+        except BaseException:
+            self._file.close()
+            raise
+        return self
+
+    def _lock_windows(self):
+        self._file.seek(0)
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                # Not blocking, LK_LOCK would wait about 10 seconds on every attempt
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+                return
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(
+                        f"Could not lock {self.lock_path} within {self.timeout} seconds, "
+                        "another writer is holding it"
+                    ) from None
+                time.sleep(self.retry_delay)
+
+    def __exit__(self, *exc_info):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+
+def file_version(path):
+    """Version of a file, which changes whenever it is appended to or replaced, None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def atomic_write(path, write, encoding="utf-8"):
+    """
+    Replaces the content of path by what write(file) writes.
+
+    The content is written to a temporary file in the same directory and swapped in,
+    so a reader or a crash only ever sees the old or the new content.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        # mkstemp creates the file readable by its owner only
+        os.chmod(temp_path, 0o644)
+        with os.fdopen(descriptor, "w", encoding=encoding) as file:
+            write(file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def append_text(path, text, encoding="utf-8"):
+    """Appends text to path with a single write, to be called under its FileLock."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a", encoding=encoding) as file:
+        file.write(text)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def read_lines(path, offset=0, first_line=None):
+    """
+    Reads the complete lines written to path past offset.
+
+    Returns (first_line, offset, lines), offset being the end of the last complete line: a
+    last line without its newline is still being appended, or was cut by a crash. A file
+    replaced since it was read may reuse the inode of the former one, so files are told
+    apart by their first line: when it is no longer first_line, path is read from the start.
+    Returns (None, 0, []) if path does not exist.
+    """
+    try:
+        with open(path, "rb") as file:
+            current_first_line = file.readline()
+            if current_first_line != first_line:
+                offset = 0
+            file.seek(offset)
+            data = file.read()
+    except FileNotFoundError:
+        return None, 0, []
+    end = data.rfind(b"\n") + 1
+    return current_first_line, offset + end, data[:end].splitlines()
@@ -0,0 +1,194 @@
+import json
+import os
+import threading
+import uuid
+from urllib.parse import quote
+from users.persistence import FileLock, append_text, atomic_write, file_version, read_lines
+
+BBC_SOURCE = "BBC Goodfood"
+TASTY_SOURCE = "Tasty"
+
+
+class SavedRecipeStore:
+    """
+    Recipes saved by each user, kept as one append-only log per user.
+
+    A log is a JSON Lines file in base_dir/saved_recipes holding references to catalog
+    recipes: {"id", "source", "name"} when a recipe is saved and {"id", "deleted": true}
+    when it is deleted, so saving or deleting appends one line whatever the number of
+    users and saved recipes. A log that is mostly deleted lines is rewritten with its
+    saved recipes only, after a {"log"} line telling it apart from the log it replaces.
+    Logs are replayed once and read again when changed on disk.
+
+    Several instances of the application may share base_dir: changes are appended under
+    the FileLock of the log, provided the log did not change since it was last read.
+
+    Recipes of a user found in the former users/saved_recipes.json, which held full
+    copies of the recipes of every user, are imported the first time their log is read.
+    """
+
+    # Deleted lines kept before a log is compacted, as long as they outnumber the saved recipes
+    compaction_threshold = 64
+
+    def __init__(self, base_dir="users"):
+        self.log_dir = os.path.join(base_dir, "saved_recipes")
+        self.legacy_file = os.path.join(base_dir, "saved_recipes.json")
+        self._logs = {}
+        self._lock = threading.Lock()
+
+    def log_path(self, username):
+        return os.path.join(self.log_dir, quote(username, safe="") + ".jsonl")
+
+    def recipes(self, username, source=None):
+        """Saved recipes of a user as {"id", "source", "name"} dicts, in the order they were saved."""
+        with self._lock:
+            recipes = self._load(username)["recipes"].values()
+            return [dict(recipe) for recipe in recipes if source is None or recipe["source"] == source]
+
+    def save(self, username, source, name):
+        def add_recipe(log):
+            recipe = {"id": log["next_id"], "source": source, "name": name}
+            return [recipe], recipe
+
+        return dict(self._update(username, add_recipe))
+
+    def delete(self, username, source, name, first_only=False):
+        """Deletes the saved recipes of source with this name and returns how many were deleted."""
+
+        def delete_recipes(log):
+            deleted = [
+                recipe_id
+                for recipe_id, recipe in log["recipes"].items()
+                if recipe["source"] == source and recipe["name"] == name
+            ]
+            if first_only:
+                deleted = deleted[:1]
+            return [{"id": recipe_id, "deleted": True} for recipe_id in deleted], len(deleted)
+
+        return self._update(username, delete_recipes)
+
+    def compact(self, username):
+        """Rewrites the log of a user with the recipes still saved only."""
+        with self._lock, FileLock(self.log_path(username)):
+            self._compact(username, self._load(username))
+
+    def _update(self, username, change):
+        """
+        Appends the entries returned by change(log) to the log of a user and returns its result.
+
+        change runs on the log as last read, without holding the lock of the log file. If
+        the file changed by the time the lock is taken, the log is read again and change
+        runs again.
+        """
+        path = self.log_path(username)
+        with self._lock:
+            while True:
+                log = self._load(username)
+                entries, result = change(log)
+                if not entries:
+                    return result
+                with FileLock(path):
+                    if file_version(path) != log["version"]:
+                        # Changed by another instance since it was read
+                        continue
+                    self._append(path, log, entries)
+                    if log["dead_lines"] > max(self.compaction_threshold, len(log["recipes"])):
+                        self._compact(username, log)
+                return result
+
+    def _load(self, username):
+        path = self.log_path(username)
+        version = file_version(path)
+        log = self._logs.get(username)
+        if log is not None and log["version"] == version:
+            return log
+        if version is None:
+            log = self._import_legacy(username)
+        else:
+            if log is None or log["version"] is None:
+                log = self._new_log()
+            first_line, offset, lines = read_lines(path, log["offset"], log["first_line"])
+            if first_line != log["first_line"]:
+                # New or replaced by a compaction, the lines are those of the whole log
+                log = self._new_log()
+                log["first_line"] = first_line
+            # Otherwise only the lines appended since the last read are read
+            self._apply_lines(log, lines)
+            log["offset"] = offset
+        log["version"] = version
+        self._logs[username] = log
+        return log
+
+    def _apply_lines(self, log, lines):
+        for line in lines:
+            try:
+                entry = json.loads(line)
+                if "log" in entry:
+                    continue
+                entry["id"]
+            except (json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError):
+                log["dead_lines"] += 1
+                continue
+            self._apply(log, entry)
+
+    def _import_legacy(self, username):
+        log = self._new_log()
+        try:
+            with open(self.legacy_file, "r", encoding="utf-8") as file:
+                legacy_recipes = json.load(file).get(username, [])
+        except (OSError, json.JSONDecodeError, AttributeError):
+            return log
+        for recipe_id, recipe in enumerate(legacy_recipes):
+            self._apply(log, {"id": recipe_id, "source": recipe.get("source"), "name": recipe.get("name")})
+        # Written with the first change of the user, when the log file is created
+        log["unwritten"] = list(log["recipes"].values())
+        return log
+
+    @staticmethod
+    def _new_log():
+        return {"recipes": {}, "next_id": 0, "dead_lines": 0, "unwritten": [], "offset": 0, "first_line": None}
+
+    @staticmethod
+    def _apply(log, entry):
+        recipe_id = entry["id"]
+        if entry.get("deleted"):
+            if log["recipes"].pop(recipe_id, None) is not None:
+                # Both the saved line and this one are dead
+                log["dead_lines"] += 1
+            log["dead_lines"] += 1
+        else:
+            log["recipes"][recipe_id] = {
+                "id": recipe_id, "source": entry.get("source"), "name": entry.get("name")
+            }
+        log["next_id"] = max(log["next_id"], recipe_id + 1)
+
+    def _append(self, path, log, entries):
+        entries = log["unwritten"] + entries
+        text = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+        if log["version"] is not None and log["version"][2] > log["offset"]:
+            # Ends the line cut by a crash, which would otherwise swallow the first entry
+            text = "\n" + text
+        append_text(path, text)
+        if log["version"] is None:
+            log["first_line"] = text[:text.index("\n") + 1].encode("utf-8")
+        log["unwritten"] = []
+        for entry in entries:
+            self._apply(log, entry)
+        log["version"] = file_version(path)
+        log["offset"] = log["version"][2]
+
+    def _compact(self, username, log):
+        path = self.log_path(username)
+        header = json.dumps({"log": uuid.uuid4().hex}) + "\n"
+
+        def write_log(file):
+            file.write(header)
+            for recipe in log["recipes"].values():
+                file.write(json.dumps(recipe, ensure_ascii=False) + "\n")
+
+        atomic_write(path, write_log)
+        log["unwritten"] = []
+        log["dead_lines"] = 0
+        log["first_line"] = header.encode("utf-8")
+        log["version"] = file_version(path)
+        log["offset"] = log["version"][2]
@@ -0,0 +1,59 @@
+import json
+import os
+import threading
+from users.persistence import FileLock, atomic_write
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def open_session(current_user_file):
+    """Returns the session kept in current_user_file, shared by every User of the process."""
+    path = os.path.realpath(current_user_file)
+    with _sessions_lock:
+        if path not in _sessions:
+            _sessions[path] = Session(current_user_file)
+        return _sessions[path]
+
+
+class Session:
+    """
+    User logged in to the application.
+
+    current_user_file is read the first time the user is asked for, the user is then
+    held in memory and the file is only written when another user logs in, so that the
+    next start knows who logged in last.
+    """
+
+    def __init__(self, current_user_file):
+        self.current_user_file = current_user_file
+        self._username = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def username(self):
+        with self._lock:
+            if not self._loaded:
+                self._username = self._read_username()
+                self._loaded = True
+            return self._username
+
+    def login(self, username):
+        with self._lock:
+            if self._loaded and username == self._username:
+                return
+            with FileLock(self.current_user_file):
+                atomic_write(
+                    self.current_user_file,
+                    lambda file: json.dump({"username": username}, file, indent=4),
+                )
+            self._username = username
+            self._loaded = True
+
+    def _read_username(self):
+        try:
+            with open(self.current_user_file, "r", encoding="utf-8") as file:
+                return json.load(file).get("username")
+        except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+            return None
@@ -1,53 +1,29 @@
 import os
-import json
+from users.session import open_session
+from users.user_store import open_user_store
 
 
 class User:
     def __init__(self, base_dir="users"):
         self.user_data_file = os.path.join(base_dir, "user_data.json")
         self.current_user_file = os.path.join(base_dir, "current_user.json")
+        # Accounts are indexed once per process and shared by every User
+        self.accounts = open_user_store(self.user_data_file)
+        # The logged in user is held in memory, current_user.json is only written when it changes
+        self.session = open_session(self.current_user_file)
 
     def check_if_username_exists(self, username):
-        try:
-            with open(self.user_data_file, "r", encoding="utf-8") as file:
-                users = json.load(file)
-                return any(user["username"] == username for user in users)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return False
+        return self.accounts.exists(username)
 
     def add_user(self, username, password):
-        new_user = {"username": username, "password": password}
-        users = []
-        try:
-            with open(self.user_data_file, "r", encoding="utf-8") as file:
-                users = json.load(file)
-        except (FileNotFoundError, json.JSONDecodeError):
-            pass
-
-        users.append(new_user)
-        with open(self.user_data_file, "w", encoding="utf-8") as file:
-            json.dump(users, file, indent=4)
+        """Adds a user, returns False if the username was taken meanwhile, e.g. by another instance."""
+        return self.accounts.add(username, password)
 
     def check_login(self, username, password):
-        try:
-            with open(self.user_data_file, "r", encoding="utf-8") as file:
-                users = json.load(file)
-                return any(
-                    user["username"] == username and user["password"] == password
-                    for user in users
-                )
-        except FileNotFoundError:
-            return False
+        return self.accounts.check_login(username, password)
 
     def save_current_user(self, username):
-        user_data = {"username": username}
-        with open(self.current_user_file, "w", encoding="utf-8") as file:
-            json.dump(user_data, file, indent=4)
+        self.session.login(username)
 
     def get_current_user(self):
-        try:
-            with open(self.current_user_file, "r", encoding="utf-8") as file:
-                user_data = json.load(file)
-                return user_data.get("username")
-        except (FileNotFoundError, json.JSONDecodeError):
-            return None
+        return self.session.username
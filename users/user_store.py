@@ -0,0 +1,154 @@
+import json
+import os
+import threading
+from users.persistence import FileLock, append_text, atomic_write, file_version, read_lines
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_user_store(user_data_file):
+    """Returns the store of user_data_file, shared by every User of the process."""
+    path = os.path.realpath(user_data_file)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = UserAccountStore(user_data_file)
+        return _stores[path]
+
+
+class UserAccountStore:
+    """
+    User accounts indexed by username.
+
+    The accounts are those of user_data_file, a JSON list of {"username", "password"},
+    followed by the accounts appended since to its journal, user_data_file + ".journal",
+    one JSON object per line. Both are loaded once into a dict and loaded again only when
+    either changed on disk, e.g. because another instance added a user.
+
+    Adding a user appends a line to the journal. Once the journal holds checkpoint_threshold
+    accounts, or a quarter of all the accounts, they are written into user_data_file, through a
+    temporary file swapped in so the file is never seen half written, and the journal
+    is emptied. Accounts found in both after a crash are only counted once. As usernames
+    are never added twice, a journal started over has a first line of its own.
+
+    Several instances of the application may share the files: accounts are added under
+    the FileLock of user_data_file, provided neither file changed since they were read.
+    """
+
+    checkpoint_threshold = 256
+
+    def __init__(self, user_data_file):
+        self.user_data_file = user_data_file
+        self.journal_file = user_data_file + ".journal"
+        self._users = None
+        self._journal_size = 0
+        self._journal_offset = 0
+        self._journal_first_line = None
+        self._versions = None
+        self._lock = threading.Lock()
+
+    def exists(self, username):
+        with self._lock:
+            return username in self._load()
+
+    def check_login(self, username, password):
+        with self._lock:
+            user = self._load().get(username)
+            return user is not None and user["password"] == password
+
+    def add(self, username, password):
+        """Adds a user, returns False if the username was taken, possibly by another instance."""
+        user = {"username": username, "password": password}
+        with self._lock:
+            while True:
+                users = self._load()
+                if username in users:
+                    return False
+                with FileLock(self.user_data_file):
+                    if self._files_versions() != self._versions:
+                        # Changed by another instance since it was read
+                        continue
+                    line = json.dumps(user, ensure_ascii=False) + "\n"
+                    journal_version = self._versions[1]
+                    if journal_version is not None and journal_version[2] > self._journal_offset:
+                        # Ends the line cut by a crash, which would otherwise swallow this one
+                        line = "\n" + line
+                    append_text(self.journal_file, line)
+                    if journal_version is None:
+                        self._journal_first_line = line.encode("utf-8")
+                    users[username] = user
+                    self._journal_size += 1
+                    self._versions = self._files_versions()
+                    self._journal_offset = self._versions[1][2]
+                    # Growing with the accounts, so the rewrites cost a constant time per account added
+                    if self._journal_size >= max(self.checkpoint_threshold, len(users) // 4):
+                        self._checkpoint(users)
+                return True
+
+    def checkpoint(self):
+        """Writes the journaled accounts into user_data_file and empties the journal."""
+        with self._lock, FileLock(self.user_data_file):
+            self._checkpoint(self._load())
+
+    def _load(self):
+        versions = self._files_versions()
+        if self._users is not None and versions == self._versions:
+            return self._users
+        if self._users is None or versions[0] != self._versions[0]:
+            # user_data_file was checkpointed, read both from the start
+            self._users = {}
+            for user in self._read_user_data():
+                self._users.setdefault(user["username"], user)
+            self._journal_size = 0
+            self._journal_offset = 0
+            self._journal_first_line = None
+        # Otherwise only the accounts appended to the journal since the last read are read
+        for user in self._read_journal():
+            self._users.setdefault(user["username"], user)
+            self._journal_size += 1
+        self._versions = versions
+        return self._users
+
+    def _read_user_data(self):
+        try:
+            with open(self.user_data_file, "r", encoding="utf-8") as file:
+                users = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+        return [user for user in users if isinstance(user, dict) and "username" in user]
+
+    def _read_journal(self):
+        first_line, self._journal_offset, lines = read_lines(
+            self.journal_file, self._journal_offset, self._journal_first_line
+        )
+        if first_line != self._journal_first_line:
+            # Started over since it was read, possibly while user_data_file was read
+            self._journal_first_line = first_line
+            self._journal_size = 0
+        users = []
+        for line in lines:
+            try:
+                user = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue
+            if isinstance(user, dict) and "username" in user:
+                users.append(user)
+        return users
+
+    def _checkpoint(self, users):
+        atomic_write(
+            self.user_data_file,
+            lambda file: json.dump(list(users.values()), file, indent=4, ensure_ascii=False),
+        )
+        # Only emptied once the accounts are in user_data_file
+        try:
+            os.remove(self.journal_file)
+        except FileNotFoundError:
+            pass
+        self._journal_size = 0
+        self._journal_offset = 0
+        self._journal_first_line = None
+        self._versions = self._files_versions()
+
+    def _files_versions(self):
+        return (file_version(self.user_data_file), file_version(self.journal_file))
@@ -2,12 +2,15 @@ import tkinter as tk
 from tkinter import Toplevel
 from models_tasty.tasty_handler import TastyHandler
 from models_bbc.bbc_handler import BBCFileHandler
+from virtual_list import VirtualListbox
 
 class AllRecipeUI:
-    def __init__(self, root):
+    def __init__(self, root, file_handler_tasty=None, file_handler_bbc=None):
         self.root = root
-        self.file_handler_tasty = TastyHandler("tasty.json", "url.json", "subs.json")
-        self.file_handler_bbc = BBCFileHandler("bbc.json", "subs.json")
+        self.file_handler_tasty = file_handler_tasty or TastyHandler(
+            "tasty.json", "url.json", "subs.json"
+        )
+        self.file_handler_bbc = file_handler_bbc or BBCFileHandler("bbc.json", "subs.json")
         
     def create_view_recipes_buttons(self):
         button_x_position = 10
@@ -37,15 +40,15 @@ class AllRecipeUI:
         bbc_recipes = self.file_handler_bbc.load_bbc_recipes()
         # Stores recipes in a class instance
         self.recipes = bbc_recipes
-        self.create_recipe_display_window(bbc_recipes, "BBC Good Food")
+        self.create_recipe_display_window(bbc_recipes, "BBC Good Food", self.file_handler_bbc)
 
     def display_tasty_recipes(self):
         self.selected_database = "tasty"
         tasty_recipes = self.file_handler_tasty.load_tasty_recipes()
         self.recipes = tasty_recipes
-        self.create_recipe_display_window(tasty_recipes, "Tasty")
+        self.create_recipe_display_window(tasty_recipes, "Tasty", self.file_handler_tasty)
         
-    def create_recipe_display_window(self, recipes, source):
+    def create_recipe_display_window(self, recipes, source, file_handler):
         recipe_window = Toplevel(self.root)
         recipe_window.title(f"{source} Recipes")
 
@@ -61,22 +64,24 @@ class AllRecipeUI:
         listbox_frame = tk.Frame(recipe_window)
         listbox_frame.pack(fill="both", expand=True, pady=(0, 10))
 
-        names_listbox = tk.Listbox(listbox_frame, width=40, height=20)
-        names_listbox.pack(side="left", fill="y")
-
-        names_scrollbar = tk.Scrollbar(
-            listbox_frame, orient="vertical", command=names_listbox.yview
+        # Positions in recipes of the listed recipes, whose bodies are only read once selected
+        filtered_recipes = []
+        recipe_names = file_handler.recipe_names()
+
+        # Only the names in view are rendered, whatever the size of the catalog
+        names_listbox = VirtualListbox(
+            listbox_frame,
+            get_row=lambda index: recipe_names[filtered_recipes[index]],
+            width=40,
+            height=20,
         )
-        names_scrollbar.pack(side="left", fill="y")
-        names_listbox.config(yscrollcommand=names_scrollbar.set)
+        names_listbox.pack(side="left", fill="y")
 
         details_text = tk.Text(
             listbox_frame, wrap="word", width=80, height=20, state="disabled"
         )
         details_text.pack(side="left", fill="both", expand=True)
 
-        filtered_recipes = []
-
         def filter_recipes(event=None):
             """
             Filters recipes based on a user's search query and updates the listbox.
@@ -89,14 +94,8 @@ class AllRecipeUI:
             # Referencing the list in create_recipe_display_window
             nonlocal filtered_recipes
             search_query = search_entry.get().strip().lower()
-            filtered_recipes = [
-                recipe
-                for recipe in recipes
-                if search_query in recipe.get("name", "No Name").lower()
-            ]
-            names_listbox.delete(0, tk.END)
-            for recipe in filtered_recipes:
-                names_listbox.insert(tk.END, recipe.get("name", "No Name"))
+            filtered_recipes = file_handler.search_recipe_names(search_query)
+            names_listbox.set_rows(len(filtered_recipes))
 
         def on_recipe_selected(event):
             """
@@ -111,7 +110,7 @@ class AllRecipeUI:
             selection = event.widget.curselection()
             if selection:
                 index = selection[0]
-                selected_recipe = filtered_recipes[index]
+                selected_recipe = recipes[filtered_recipes[index]]
                 details_text.config(state="normal")
                 details_text.delete(1.0, tk.END)
                 if source == "BBC Good Food":
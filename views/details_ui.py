@@ -1,11 +1,23 @@
-import tkinter as tk
+from collections import OrderedDict
 from models_tasty.tasty_handler import TastyHandler
+from models_common.substitutions import LazySubstitutions
 
 class DetailsUI:
+    # Number of recipes whose formatted details are kept
+    details_cache_size = 64
+
     def __init__(self, root, display):
         self.root = root
-        self.handler = TastyHandler("tasty.json", "url.json", "subs.json")
+        tasty_parser = getattr(display, "tasty_parser", None)
+        self.handler = (
+            tasty_parser.handler
+            if tasty_parser
+            else TastyHandler("tasty.json", "url.json", "subs.json")
+        )
         self.display = display
+        # Formatted details of the recently displayed search results, for the catalogs of details_version
+        self.details_cache = OrderedDict()
+        self.details_version = None
 
     def process_selected_recipe(self, index):
         from search_ui import SearchUI
@@ -53,124 +65,131 @@ class DetailsUI:
         self.process_recipe_details(recipe_name, recipe_data, matched_ingredients, substitutions, video_url)
 
     def process_recipe_details(self, recipe_name, recipe_data, matched_ingredients, substitutions, video_url):
-        self.display.clear_details_frame()
-        
         if recipe_name is None or recipe_data is None:
+            self.clear_details_frame()
             print("Recipe name or data is missing")
             return
-        self.populate_recipe_details_tasty(recipe_name, recipe_data, matched_ingredients, video_url)
-        self.print_substitutions_tasty(substitutions)
-        self.print_ingredients_and_instructions_tasty(recipe_name, recipe_data)
+
+        def format_details():
+            details = self.populate_recipe_details_tasty(
+                recipe_name, recipe_data, matched_ingredients, video_url
+            )
+            details += self.print_substitutions_tasty(substitutions)
+            details += self.print_ingredients_and_instructions_tasty(recipe_name, recipe_data)
+            return details
+
+        key = self.details_key("tasty", recipe_name, matched_ingredients, substitutions)
+        self.show_details(key, format_details, substitutions)
     
     def populate_recipe_details_bbc(self, recipe):
-        self.clear_details_frame()
-        self.display_recipe_name(recipe)
-        self.display_recipe_url(recipe)
-        self.display_matched_ingredients(recipe)
-        self.display_ingredients_list(recipe)
-        self.display_substitutions(recipe)
-        self.display_instructions(recipe)
-        self.display_preparation_and_cooking_time(recipe)
+        def format_details():
+            return (
+                self.display_recipe_name(recipe)
+                + self.display_recipe_url(recipe)
+                + self.display_matched_ingredients(recipe)
+                + self.display_ingredients_list(recipe)
+                + self.display_substitutions(recipe)
+                + self.display_steps(recipe)
+                + self.display_preparation_and_cooking_time(recipe)
+            )
+
+        key = self.details_key(
+            "bbc_goodfood",
+            recipe.get("name"),
+            recipe.get("matched_ingredients", []),
+            recipe.get("substitutions", {}),
+        )
+        self.show_details(key, format_details, recipe.get("substitutions"))
+
+    def details_key(self, source, recipe_name, matched_ingredients, substitutions):
+        """
+        Key of the formatted details of a search result.
+
+        Substitutions depend on every ingredient of the query, not only on the matched ones,
+        so the key holds the id of the LazySubstitutions of the result, new for every search.
+        """
+        if isinstance(substitutions, LazySubstitutions):
+            substitutions_key = id(substitutions)
+        else:
+            substitutions_key = tuple(
+                (ingredient, tuple(subs)) for ingredient, subs in substitutions.items()
+            )
+        return (source, recipe_name, tuple(matched_ingredients), substitutions_key)
+
+    def catalog_versions(self):
+        """Versions of the catalogs on display, refresh_catalog changes them when it reloads a catalog."""
+        bbc_parser = getattr(self.display, "bbc_parser", None)
+        bbc_version = bbc_parser.handler.catalog_version if bbc_parser else None
+        return (bbc_version, self.handler.catalog_version)
+
+    def show_details(self, key, format_details, substitutions=None):
+        """
+        Displays the details formatted by format_details(), a list of (text, tag) pairs.
+
+        Formatted details are kept per key, so going back to a recipe only replaces the
+        text of the details widget. They are dropped once a catalog is reloaded. The
+        substitutions of the result are kept with them, so that their id in key is not reused.
+        """
+        version = self.catalog_versions()
+        if version != self.details_version:
+            self.details_cache.clear()
+            self.details_version = version
+        entry = self.details_cache.get(key)
+        if entry is None:
+            entry = (format_details(), substitutions)
+            self.details_cache[key] = entry
+            if len(self.details_cache) > self.details_cache_size:
+                self.details_cache.popitem(last=False)
+        else:
+            self.details_cache.move_to_end(key)
+        self.display.show_details(entry[0])
 
     def clear_details_frame(self):
         self.display.clear_details_frame()
 
     def display_recipe_name(self, recipe):
-        tk.Label(
-            self.display.details_container,
-            text=recipe["name"],
-            font=("Helvetica", 14, "bold"),
-            anchor="w",
-            bg="white",
-        ).pack(fill="x")
+        return [(f"{recipe['name']}\n", "title")]
 
     def display_recipe_url(self, recipe):
-        tk.Label(
-            self.display.details_container,
-            text=f"URL: {recipe['url']}",
-            anchor="w",
-            bg="white",
-            font=("Helvetica", 12),
-        ).pack(fill="x")
+        return [(f"URL: {recipe['url']}\n", "body")]
 
     def display_matched_ingredients(self, recipe):
         matched_ingredients = recipe.get("matched_ingredients", [])
         matched_ingredients_text = f"Matched Ingredients: {len(matched_ingredients)}/{recipe.get('total_ingredients', 0)}"
-        tk.Label(
-            self.display.details_container,
-            text=matched_ingredients_text,
-            font=("Helvetica", 12, "bold"),
-            anchor="w",
-            bg="white",
-        ).pack(fill="x")
-        for matched_ingredient in matched_ingredients:
-            tk.Label(
-                self.display.details_container,
-                text=f"- {matched_ingredient}",
-                anchor="w",
-                bg="white",
-                font=("Helvetica", 12),
-            ).pack(fill="x")
+        return [(f"{matched_ingredients_text}\n", "heading")] + [
+            (f"- {matched_ingredient}\n", "body") for matched_ingredient in matched_ingredients
+        ]
 
     def display_ingredients_list(self, recipe):
-        tk.Label(
-            self.display.details_container,
-            text="Ingredients:",
-            font=("Helvetica", 12, "bold"),
-            anchor="w",
-            bg="white",
-        ).pack(fill="x")
-        for ingredient in recipe.get("ingredients", []):
-            tk.Label(
-                self.display.details_container,
-                text=f"- {ingredient}",
-                anchor="w",
-                bg="white",
-                font=("Helvetica", 12),
-            ).pack(fill="x")
+        return [("Ingredients:\n", "heading")] + [
+            (f"- {ingredient}\n", "body") for ingredient in recipe.get("ingredients", [])
+        ]
 
     def display_substitutions(self, recipe):
-        substitutions = recipe.get("substitutions", {})
-        self.print_substitutions_bbc(substitutions)
-
-    def display_instructions(self, recipe):
-        tk.Label(
-            self.display.details_container,
-            text="Instructions:",
-            font=("Helvetica", 12, "bold"),
-            anchor="w",
-            bg="white",
-        ).pack(fill="x")
+        substitutions = self.resolve_substitutions(recipe.get("substitutions", {}))
+        return self.print_substitutions_bbc(substitutions)
+
+    def resolve_substitutions(self, substitutions):
+        # Search results carry lazy substitutions, they are only looked up for the recipe on display
+        if isinstance(substitutions, LazySubstitutions):
+            return substitutions.resolve()
+        return substitutions
+
+    def display_steps(self, recipe):
+        details = [("Instructions:\n", "heading")]
         for step in recipe.get("steps", []):
             sentences = [sentence.strip() for sentence in step.split(". ") if sentence.strip()]
-            for sentence in sentences:
-                tk.Label(
-                    self.display.details_container,
-                    text=sentence,
-                    font=("Helvetica", 12),
-                    anchor="w",
-                    bg="white",
-                    justify="left",
-                ).pack(fill="x")
+            details += [(f"{sentence}\n", "body") for sentence in sentences]
+        return details
 
     def display_preparation_and_cooking_time(self, recipe):
         prep_time = recipe.get("times", {}).get("Preparation", "N/A")
         cooking_time = recipe.get("times", {}).get("Cooking", "N/A")
-        tk.Label(
-            self.display.details_container,
-            text=f"Preparation Time: {prep_time}",
-            anchor="w",
-            bg="white",
-            font=("Helvetica", 12),
-        ).pack(fill="x")
-        tk.Label(
-            self.display.details_container,
-            text=f"Cooking Time: {cooking_time}",
-            anchor="w",
-            bg="white",
-            font=("Helvetica", 12),
-        ).pack(fill="x")
-    
+        return [
+            (f"Preparation Time: {prep_time}\n", "body"),
+            (f"Cooking Time: {cooking_time}\n", "body"),
+        ]
+
     def populate_recipe_details_tasty(
         self, recipe_name, recipe_data, matched_ingredients, video_url=None
     ):
@@ -183,122 +202,56 @@ class DetailsUI:
             self.handler.normalize_name(recipe_name)
         )
 
-        tk.Label(
-            self.display.details_container,
-            text=f"Recipe Name: {recipe_name}",
-            font=("Helvetica", 14, "bold"),
-            anchor="w",
-            bg="white",
-        ).pack(fill="x")
+        details = [(f"Recipe Name: {recipe_name}\n", "title")]
         if video_url:
-            tk.Label(
-                self.display.details_container,
-                text=f"Video URL: {video_url}",
-                font=("Helvetica", 12),
-                anchor="w",
-                bg="white",
-            ).pack(fill="x")
-
-        tk.Label(
-            self.display.details_container,
-            text=f"Matched ingredients: ({matched_count}/{total_ingredients}):",
-            font=("Helvetica", 12, "bold"),
-            anchor="w",
-            bg="white",
-        ).pack(fill="x")
-
-        for matched_ingredient in matched_ingredients:
-            tk.Label(
-                self.display.details_container,
-                text=f"- {matched_ingredient}",
-                font=("Helvetica", 12),
-                anchor="w",
-                bg="white",
-            ).pack(fill="x")
-
+            details.append((f"Video URL: {video_url}\n", "body"))
+        details.append(
+            (f"Matched ingredients: ({matched_count}/{total_ingredients}):\n", "heading")
+        )
+        details += [
+            (f"- {matched_ingredient}\n", "body") for matched_ingredient in matched_ingredients
+        ]
+        return details
 
     def print_substitutions_bbc(self, substitutions):
-        if substitutions:
-            tk.Label(
-                self.display.details_container,
-                text="Substitutions for missing ingredients:",
-                font=("Helvetica", 12, "bold"),
-                anchor="w",
-                bg="white",
-            ).pack(fill="x")
-
-            for ingredient, subs in substitutions.items():
-                tk.Label(
-                    self.display.details_container,
-                    text=f"{ingredient.capitalize()}: {', '.join(subs)}",
-                    font=("Helvetica", 12),
-                    anchor="w",
-                    bg="white",
-                ).pack(fill="x")
+        if not substitutions:
+            return []
+        return [("Substitutions for missing ingredients:\n", "heading")] + [
+            (f"{ingredient.capitalize()}: {', '.join(subs)}\n", "body")
+            for ingredient, subs in substitutions.items()
+        ]
 
     def print_ingredients_and_instructions_tasty(self, recipe_name, recipe_data):
-        self.display_ingredients(recipe_data)
-        self.display_instructions(recipe_data)
+        return self.display_ingredients(recipe_data) + self.display_instructions(recipe_data)
 
     def display_ingredients(self, recipe_data):
-        tk.Label(
-            self.display.details_container,
-            text="Ingredients:",
-            font=("Helvetica", 12, "bold"),
-            anchor="w",
-            bg="white",
-        ).pack(fill="x")
+        details = [("Ingredients:\n", "heading")]
         for section in recipe_data.get("ingredient_sections", []):
             for ingredient_data in section.get("ingredients", []):
-                self.pack_ingredient_label(ingredient_data)
+                details.append(self.format_ingredient(ingredient_data))
+        return details
 
-    def pack_ingredient_label(self, ingredient_data):
+    def format_ingredient(self, ingredient_data):
         name = ingredient_data.get("name", "No name")
         primary_unit = ingredient_data.get("primary_unit", {})
         quantity = primary_unit.get("quantity") if primary_unit and "quantity" in primary_unit else ""
         display = primary_unit.get("display") if primary_unit and "display" in primary_unit else ""
         ingredient_parts = [part for part in [quantity, name, display] if part]
         ingredient_text = " - " + " ".join(ingredient_parts)
-        tk.Label(
-            self.display.details_container,
-            text=ingredient_text,
-            font=("Helvetica", 12),
-            anchor="w",
-            bg="white",
-        ).pack(fill="x")
+        return (f"{ingredient_text}\n", "body")
 
     def display_instructions(self, recipe_data):
-        tk.Label(
-            self.display.details_container,
-            text="Instructions:",
-            font=("Helvetica", 12, "bold"),
-            anchor="w",
-            bg="white",
-        ).pack(fill="x")
-        for instruction in recipe_data.get("instructions", []):
-            tk.Label(
-                self.display.details_container,
-                text=f" - {instruction['display_text']}",
-                font=("Helvetica", 12),
-                anchor="w",
-                bg="white",
-            ).pack(fill="x")
+        return [("Instructions:\n", "heading")] + [
+            (f" - {instruction['display_text']}\n", "body")
+            for instruction in recipe_data.get("instructions", [])
+        ]
 
     def print_substitutions_tasty(self, substitutions):
-        if any(substitutions.values()):
-            tk.Label(
-                self.display.details_container,
-                text="Substitutions for missing ingredients:",
-                font=("Helvetica", 12, "bold"),
-                anchor="w",
-                bg="white",
-            ).pack(fill="x")
-            for ingredient, subs in substitutions.items():
-                if subs:
-                    tk.Label(
-                        self.display.details_container,
-                        text=f"{ingredient.capitalize()}: {', '.join(subs)}",
-                        font=("Helvetica", 12),
-                        anchor="w",
-                        bg="white",
-                    ).pack(fill="x")
\ No newline at end of file
+        substitutions = self.resolve_substitutions(substitutions)
+        if not any(substitutions.values()):
+            return []
+        return [("Substitutions for missing ingredients:\n", "heading")] + [
+            (f"{ingredient.capitalize()}: {', '.join(subs)}\n", "body")
+            for ingredient, subs in substitutions.items()
+            if subs
+        ]
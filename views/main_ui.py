@@ -18,8 +18,9 @@ class MainUI:
             messagebox.showerror("Error", "Username already exists")
         elif password != confirm_password:
             messagebox.showerror("Error", "Passwords do not match")
+        elif not self.user.add_user(username, password):
+            messagebox.showerror("Error", "Username already exists")
         else:
-            self.user.add_user(username, password)
             messagebox.showinfo(
                 "Success", "Account created successfully. You can now log in."
             )
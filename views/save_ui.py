@@ -2,20 +2,18 @@ import tkinter as tk
 from tkinter import messagebox, Toplevel, Scrollbar, Text, END
 from users.user_data import User
 from models_tasty.tasty_parser import TastyParser
-from models_tasty.tasty_handler import TastyHandler
 from models_bbc.bbc_parser import BBCParser
-from models_bbc.bbc_handler import BBCFileHandler
 
 
 
 class SaveUI:
-    def __init__(self, root, tasty_parser=None):
+    def __init__(self, root, tasty_parser=None, bbc_parser=None):
         self.root = root
         self.user = User()
-        self.tasty_parser = TastyParser()
-        self.bbc_parser = BBCParser()
-        self.file_handler_bbc = BBCFileHandler("bbc.json", "subs.json")
-        self.file_handler_tasty = TastyHandler("tasty.json", "url.json", "subs.json")
+        self.tasty_parser = tasty_parser or TastyParser()
+        self.bbc_parser = bbc_parser or BBCParser()
+        self.file_handler_bbc = self.bbc_parser.handler
+        self.file_handler_tasty = self.tasty_parser.handler
         self.selected_database = None
     
     def bbc_goodfood(self):
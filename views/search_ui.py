@@ -7,19 +7,37 @@ from models_bbc.bbc_parser import BBCParser
 from models_tasty.tasty_handler import TastyHandler
 from details_ui import DetailsUI
 from save_ui import SaveUI
+from search_worker import SearchWorker
+from virtual_list import VirtualListbox
 
 
 class SearchUI(MainUI):
+    # Number of results fetched from a parser each time the list is scrolled to its end
+    results_page_size = 50
+    # Delay after the last keystroke before the live search runs
+    live_search_delay_ms = 300
+
     def __init__(self, root, tasty_parser=None):
         # Refering to super class MainUI, which contains the main window parameters
         super().__init__(root)
         self.recipes = []
+        self.fetch_results_page = None
+        self.has_more_results = False
         self.selected_database = None
+        self.search_worker = SearchWorker(root)
+        self.live_search_job = None
+        self.displayed_search = None
         self.bbc_parser = BBCParser()
-        self.tasty_parser = TastyParser()
+        self.tasty_parser = tasty_parser or TastyParser()
+        # Search sessions refine the previous results as ingredients are typed or removed
+        self.bbc_search = self.bbc_parser.start_incremental_search()
+        self.tasty_search = self.tasty_parser.start_incremental_search()
         self.user = User()
-        self.save_ui = SaveUI(root)
-        self.all_recipes = AllRecipeUI(root)
+        # Parsers and their handlers are shared with the other widgets instead of being rebuilt
+        self.save_ui = SaveUI(root, self.tasty_parser, self.bbc_parser)
+        self.all_recipes = AllRecipeUI(
+            root, self.tasty_parser.handler, self.bbc_parser.handler
+        )
         self.setup_search_ui()
         self.create_details_frame()
         self.save_ui.create_save_recipe_button()
@@ -36,7 +54,7 @@ class SearchUI(MainUI):
             fill="both", expand=True, side="right", padx=10, pady=10
         )
         self.details_frame.pack_propagate(False)
-        self.setup_details_canvas()
+        self.setup_details_text()
 
     def display_recipe_search_fields(self):
         """Sets up the UI for recipe search with various components."""
@@ -114,26 +132,47 @@ class SearchUI(MainUI):
         self.spice_input_entry = tk.Entry(container)
         self.spice_input_entry.pack(pady=5)
 
+        self.ingredient_input_entry.bind("<KeyRelease>", self.schedule_live_search)
+        self.spice_input_entry.bind("<KeyRelease>", self.schedule_live_search)
+
+    def schedule_live_search(self, event=None):
+        '''Searches as the user types, once no key has been pressed for live_search_delay_ms.'''
+        if self.live_search_job is not None:
+            self.root.after_cancel(self.live_search_job)
+        self.live_search_job = self.root.after(self.live_search_delay_ms, self.run_live_search)
+
+    def run_live_search(self):
+        self.live_search_job = None
+        # Incomplete input is expected while typing, so no message boxes
+        self.handle_recipe_search(show_messages=False)
+
     def add_search_button(self, container):
         """Add the search button."""
         search_btn = tk.Button(
             container, text="Search", command=self.handle_recipe_search
         )
         search_btn.pack(pady=10)
+        self.search_status_label = tk.Label(container, text="")
+        self.search_status_label.pack()
 
     def add_results_display(self, container):
-        """Setup the listbox and scrollbar for displaying search results."""
-        results_frame = tk.Frame(container)
-        results_frame.pack(fill="both", expand=True)
-        self.result_listbox = tk.Listbox(results_frame, width=1, height=15)
-        self.result_listbox.pack(side="left", fill="both", expand=True)
-        scrollbar = tk.Scrollbar(
-            results_frame, orient="vertical", command=self.result_listbox.yview
+        """Setup the list displaying search results, which only holds the rows in view."""
+        self.result_listbox = VirtualListbox(
+            container,
+            get_row=lambda index: self.get_result_name(self.recipes[index]),
+            on_end_reached=self.on_results_end_reached,
+            width=1,
+            height=15,
         )
-        scrollbar.pack(side="right", fill="y")
-        self.result_listbox.config(yscrollcommand=scrollbar.set)
+        self.result_listbox.pack(fill="both", expand=True)
         self.result_listbox.bind("<<ListboxSelect>>", self.views.on_recipe_selected)
 
+    def on_results_end_reached(self):
+        """Requests the next page of results once the end of the list is visible."""
+        if self.has_more_results:
+            self.has_more_results = False
+            self.request_results_page()
+
     def create_back_button_frame(self):
         self.back_button_frame = tk.Frame(self.root)
         self.back_button_frame.pack(fill="x", pady=10)
@@ -143,58 +182,55 @@ class SearchUI(MainUI):
         back_btn.pack()
 
     def clear_details_frame(self):
-        for widget in self.details_frame.winfo_children():
-            widget.destroy()
-        self.setup_details_canvas()
+        self.show_details([])
 
-    def setup_details_canvas(self):
+    def setup_details_text(self):
         '''
-        Sets up a canvas with vertical and horizontal scrollbars in the details frame. 
-        Canvas displays a container frame for additional UI components.
-        '''        
-        
-        self.details_canvas = tk.Canvas(self.details_frame, bg="white")
-        self.vertical_scrollbar = tk.Scrollbar(
-            self.details_frame, orient="vertical", command=self.details_canvas.yview
-        )
-        self.horizontal_scrollbar = tk.Scrollbar(
-            self.details_frame, orient="horizontal", command=self.details_canvas.xview
+        Sets up the text widget, with a vertical scrollbar, displaying the details of the selected recipe.
+        Every kind of line is styled by a tag, so a whole recipe is displayed by a single insert.
+        '''
+
+        self.details_text = tk.Text(
+            self.details_frame, bg="white", bd=0, wrap="word", padx=5, pady=5, state="disabled"
         )
-        self.details_canvas.configure(
-            yscrollcommand=self.vertical_scrollbar.set,
-            xscrollcommand=self.horizontal_scrollbar.set,
+        self.vertical_scrollbar = tk.Scrollbar(
+            self.details_frame, orient="vertical", command=self.details_text.yview
         )
+        self.details_text.configure(yscrollcommand=self.vertical_scrollbar.set)
+        self.details_text.tag_configure("title", font=("Helvetica", 14, "bold"))
+        self.details_text.tag_configure("heading", font=("Helvetica", 12, "bold"))
+        self.details_text.tag_configure("body", font=("Helvetica", 12))
         self.vertical_scrollbar.pack(side="right", fill="y")
-        self.horizontal_scrollbar.pack(side="bottom", fill="x")
-        self.details_canvas.pack(side="left", fill="both", expand=True)
-        self.details_container = tk.Frame(self.details_canvas, bg="white")
-        self.details_canvas.create_window(
-            (0, 0), window=self.details_container, anchor="nw"
-        )
-        self.details_container.bind(
-            "<Configure>",
-            lambda e: self.details_canvas.configure(
-                scrollregion=self.details_canvas.bbox("all")
-            ),
-        )
-
-    def handle_recipe_search(self):
+        self.details_text.pack(side="left", fill="both", expand=True)
+
+    def show_details(self, details):
+        '''Replaces the details displayed by details, a list of (text, tag) pairs.'''
+        self.details_text.config(state="normal")
+        self.details_text.delete("1.0", tk.END)
+        if details:
+            self.details_text.insert("1.0", *[part for text_and_tag in details for part in text_and_tag])
+        self.details_text.config(state="disabled")
+        self.details_text.yview_moveto(0)
+
+    def handle_recipe_search(self, show_messages=True):
         '''
         Handles the recipe search based on the selected database.
 
         Checks for database selection and initializes parsers. 
         Retrieves user input for ingredients and spices, processes them and displays matching recipes.
+        Live searches pass show_messages=False and are skipped when the ingredients did not change.
         '''
         
         if not self.is_database_selected():
-            self.show_database_selection_required_message()
+            if show_messages:
+                self.show_database_selection_required_message()
             return
 
         database_type = self.save_ui.selected_database.lower()
         if database_type == "tasty":
-            self.process_search_tasty()
+            self.process_search_tasty(show_messages)
         elif database_type == "bbc_goodfood":
-            self.process_search_bbc_goodfood()
+            self.process_search_bbc_goodfood(show_messages)
         else:
             print("No database selected.")
 
@@ -204,7 +240,7 @@ class SearchUI(MainUI):
     def show_database_selection_required_message(self):
         tk.messagebox.showinfo("Database Selection Required", "Please select a database first.")
 
-    def process_search_tasty(self):
+    def process_search_tasty(self, show_messages=True):
         if not hasattr(self, 'tasty_parser'):
             self.tasty_parser = TastyParser()
 
@@ -212,12 +248,15 @@ class SearchUI(MainUI):
         user_ingredients = self.tasty_parser.parse_ingredients(food_input, spice_input)
 
         if user_ingredients is False:
-            self.show_invalid_format_message("dot")
+            if show_messages:
+                self.show_invalid_format_message("dot")
+            return
+        if not show_messages and self.displayed_search == ("tasty", user_ingredients):
             return
 
         self.clear_and_display_results_tasty(user_ingredients)
 
-    def process_search_bbc_goodfood(self):
+    def process_search_bbc_goodfood(self, show_messages=True):
         if not hasattr(self, 'bbc_parser'):
             self.bbc_parser = BBCParser()
 
@@ -225,7 +264,10 @@ class SearchUI(MainUI):
         user_ingredients = self.bbc_parser.parse_ingredients(food_input, spice_input)
 
         if user_ingredients is False:
-            self.show_invalid_format_message("comma and space")
+            if show_messages:
+                self.show_invalid_format_message("comma and space")
+            return
+        if not show_messages and self.displayed_search == ("bbc_goodfood", user_ingredients):
             return
 
         self.clear_and_display_results_bbc(user_ingredients)
@@ -241,24 +283,69 @@ class SearchUI(MainUI):
 
     def clear_and_display_results_tasty(self, user_ingredients):
         ''' Clears and displays results using the TastyParser '''
-        matches = self.tasty_parser.find_matching_recipes(user_ingredients)
-        self.result_listbox.delete(0, tk.END)
-        self.recipes = []
-        for match in matches:
-            self.result_listbox.insert(tk.END, match[0])
-            self.recipes.append(match)
+        self.displayed_search = ("tasty", user_ingredients)
+        self.display_results_pages(
+            lambda offset, limit: self.tasty_search.search(user_ingredients, limit, offset),
+            lambda match: match[0],
+        )
 
     def clear_and_display_results_bbc(self, user_ingredients):
         ''' Clears and displays results using the BBCParser '''
-        matches = self.bbc_parser.find_matching_recipes(user_ingredients)
-        self.result_listbox.delete(0, tk.END)
-        self.recipes = matches
-        for recipe in matches:
-            self.result_listbox.insert(tk.END, recipe["name"])
+        self.displayed_search = ("bbc_goodfood", user_ingredients)
+        self.display_results_pages(
+            lambda offset, limit: self.bbc_search.search(user_ingredients, limit, offset),
+            lambda recipe: recipe["name"],
+        )
+
+    def display_results_pages(self, fetch_page, get_result_name):
+        '''
+        Clears the results and displays the first page of a new search.
+
+        fetch_page(offset, limit) returns a page of the ranking, further pages are fetched as the user scrolls.
+        '''
+        self.fetch_results_page = fetch_page
+        self.get_result_name = get_result_name
+        self.recipes = []
+        self.has_more_results = False
+        self.result_listbox.set_rows(0)
+        self.request_results_page()
+
+    def request_results_page(self):
+        '''
+        Fetches the next page of results on the search worker.
+
+        A newer search supersedes a page that is still being fetched, its results are never displayed.
+        '''
+        fetch_page = self.fetch_results_page
+        offset = len(self.recipes)
+        self.show_search_busy(True)
+        self.search_worker.submit(
+            lambda: fetch_page(offset, self.results_page_size),
+            self.display_results_page,
+            self.show_search_error,
+        )
+
+    def display_results_page(self, page):
+        self.show_search_busy(False)
+        self.has_more_results = len(page) == self.results_page_size
+        self.recipes.extend(page)
+        # Only the rows in view are rendered, the next page is requested if the end is still in view
+        self.result_listbox.set_row_count(len(self.recipes))
+
+    def show_search_busy(self, busy):
+        self.search_status_label.config(text="Searching..." if busy else "")
+        self.root.config(cursor="watch" if busy else "")
+
+    def show_search_error(self, error):
+        self.show_search_busy(False)
+        tk.messagebox.showerror("Search failed", f"The search could not be completed: {error}")
 
     def reset_to_initial_ui(self):
         from auth_ui import AuthUI
 
+        if self.live_search_job is not None:
+            self.root.after_cancel(self.live_search_job)
+        self.search_worker.shutdown()
         self.clear_window()
         login_instance = AuthUI(self.root)
         login_instance.create_initial_ui()
@@ -272,6 +359,6 @@ if __name__ == "__main__":
     root = tk.Tk()
     display_instance = SearchUI(root)
     views_instance = DetailsUI(root, display_instance)
-    finder = TastyHandler("tasty.json", "dishes.json", "subs.json")
+    finder = TastyHandler("tasty.json", "url.json", "subs.json")
     matcher = TastyParser()
     root.mainloop()
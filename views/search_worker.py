@@ -0,0 +1,85 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SearchWorker:
+    """
+    Runs searches on a worker thread so the window stays responsive.
+
+    Only the latest submitted search is delivered: submitting a new one cancels a search that
+    has not started yet and discards the result of one that is still running. Results are
+    handed back on the Tk main thread by polling a queue with root.after, since widgets must
+    not be touched from the worker thread.
+    """
+
+    poll_interval_ms = 20
+
+    def __init__(self, root):
+        self.root = root
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recipe-search")
+        self._results = queue.Queue()
+        self._generation = 0
+        self._delivered_generation = 0
+        self._future = None
+        self._polling = False
+
+    @property
+    def busy(self):
+        return self._delivered_generation != self._generation
+
+    def submit(self, search, on_done, on_error=None):
+        """
+        Runs search() on the worker thread, then on_done(result) or on_error(exception) on the main thread.
+
+        Supersedes any search submitted before.
+        """
+        self._generation += 1
+        if self._future is not None:
+            self._future.cancel()
+        self._future = self._executor.submit(
+            self._run, self._generation, search, on_done, on_error
+        )
+        self._schedule_poll()
+        return self._generation
+
+    def cancel(self):
+        """Drops the result of the current search, if any."""
+        if self._future is not None:
+            self._future.cancel()
+        self._generation += 1
+        self._delivered_generation = self._generation
+
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, generation, search, on_done, on_error):
+        if generation != self._generation:
+            # Superseded while waiting for the worker
+            return
+        try:
+            result = search()
+        except Exception as error:
+            self._results.put((generation, on_error, error))
+        else:
+            self._results.put((generation, on_done, result))
+
+    def _schedule_poll(self):
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_interval_ms, self._poll)
+
+    def _poll(self):
+        self._polling = False
+        while True:
+            try:
+                generation, callback, value = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self._generation:
+                continue
+            self._delivered_generation = generation
+            if callback:
+                callback(value)
+        if self.busy:
+            self._schedule_poll()
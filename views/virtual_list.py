@@ -0,0 +1,141 @@
+import tkinter as tk
+import tkinter.font as tkfont
+
+
+class VirtualListbox(tk.Frame):
+    """
+    Listbox that only holds the rows in view, for lists of any length.
+
+    Rows are read with get_row(index) when they scroll into view, so showing or
+    scrolling the list costs the number of visible rows instead of the number of rows.
+    The scrollbar, the mouse wheel and the arrow keys move over all row_count rows.
+
+    Like tk.Listbox, selecting a row generates <<ListboxSelect>> on this widget and
+    curselection() returns the selected index among all the rows. on_end_reached() is
+    called whenever the last rows come into view, e.g. to fetch the next page of results.
+    """
+
+    # Rows rendered past the bottom of the view, which may show part of the next row
+    buffer_rows = 2
+
+    def __init__(self, master, get_row=None, row_count=0, on_end_reached=None, **listbox_options):
+        super().__init__(master)
+        self.get_row = get_row
+        self.row_count = row_count
+        self.on_end_reached = on_end_reached
+        self.top = 0
+        self.selected = None
+        self.visible_rows = max(1, int(listbox_options.get("height", 10)))
+
+        self.listbox = tk.Listbox(self, exportselection=False, **listbox_options)
+        self.listbox.pack(side="left", fill="both", expand=True)
+        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.scrollbar.pack(side="right", fill="y")
+        self._row_height = tkfont.Font(font=self.listbox.cget("font")).metrics("linespace") + 1
+
+        self.listbox.bind("<Configure>", self._on_resize)
+        self.listbox.bind("<<ListboxSelect>>", self._on_listbox_select)
+        self.listbox.bind("<MouseWheel>", self._on_mouse_wheel)
+        self.listbox.bind("<Button-4>", lambda event: self._scroll_by(-3))
+        self.listbox.bind("<Button-5>", lambda event: self._scroll_by(3))
+        for key, move in (
+            ("<Up>", lambda: self.selected - 1),
+            ("<Down>", lambda: self.selected + 1),
+            ("<Prior>", lambda: self.selected - self.visible_rows),
+            ("<Next>", lambda: self.selected + self.visible_rows),
+            ("<Home>", lambda: 0),
+            ("<End>", lambda: self.row_count - 1),
+        ):
+            self.listbox.bind(key, lambda event, move=move: self._on_key(move))
+        self.render()
+
+    def set_rows(self, row_count, get_row=None):
+        """Shows other rows, from the top and with nothing selected."""
+        if get_row is not None:
+            self.get_row = get_row
+        self.row_count = row_count
+        self.top = 0
+        self.selected = None
+        self.render()
+
+    def set_row_count(self, row_count):
+        """Shows rows added at the end, keeping the position and the selection."""
+        self.row_count = row_count
+        self.render()
+
+    def curselection(self):
+        return () if self.selected is None else (self.selected,)
+
+    def yview(self, *args):
+        """Scrollbar command, in the same terms as tk.Listbox.yview."""
+        if not args:
+            return self._view_fractions()
+        if args[0] == "moveto":
+            self._scroll_to(round(float(args[1]) * self.row_count))
+        elif args[0] == "scroll":
+            count = int(args[1])
+            self._scroll_by(count * self.visible_rows if args[2] == "pages" else count)
+
+    def see(self, index):
+        self._scroll_to(self._top_showing(index))
+
+    def _top_showing(self, index):
+        if index < self.top:
+            return index
+        if index >= self.top + self.visible_rows:
+            return index - self.visible_rows + 1
+        return self.top
+
+    def render(self):
+        """Replaces the rows of the listbox by the rows in view."""
+        self.top = max(0, min(self.top, self.row_count - self.visible_rows))
+        end = min(self.row_count, self.top + self.visible_rows + self.buffer_rows)
+        self.listbox.delete(0, tk.END)
+        if end > self.top:
+            self.listbox.insert(0, *[self.get_row(index) for index in range(self.top, end)])
+        if self.selected is not None and self.top <= self.selected < end:
+            self.listbox.selection_set(self.selected - self.top)
+        self.listbox.yview_moveto(0)
+        self.scrollbar.set(*self._view_fractions())
+        if self.on_end_reached is not None and end >= self.row_count:
+            self.on_end_reached()
+
+    def _view_fractions(self):
+        if not self.row_count:
+            return 0.0, 1.0
+        return self.top / self.row_count, min(1.0, (self.top + self.visible_rows) / self.row_count)
+
+    def _scroll_to(self, top):
+        top = max(0, min(top, self.row_count - self.visible_rows))
+        if top != self.top:
+            self.top = top
+            self.render()
+
+    def _scroll_by(self, count):
+        self._scroll_to(self.top + count)
+        return "break"
+
+    def _on_resize(self, event):
+        visible_rows = max(1, event.height // self._row_height)
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.render()
+
+    def _on_mouse_wheel(self, event):
+        # Windows reports multiples of 120 per notch, macOS the number of notches
+        notches = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self._scroll_by(-3 * notches)
+
+    def _on_listbox_select(self, event):
+        selection = self.listbox.curselection()
+        if selection:
+            self.selected = self.top + selection[0]
+            self.event_generate("<<ListboxSelect>>")
+
+    def _on_key(self, move):
+        if self.row_count:
+            self.selected = 0 if self.selected is None else max(0, min(move(), self.row_count - 1))
+            self.top = self._top_showing(self.selected)
+            self.render()
+            self.event_generate("<<ListboxSelect>>")
+        return "break"